@@ -0,0 +1,228 @@
+"""
+Ghost Protocol - Adversary Model
+Trained real-vs-decoy classifier for the validator's observer
+
+An RPC provider sees, per call: gas estimate, function, contract, arrival
+time and endpoint. This module turns columns of such observations into a
+NumPy feature matrix and trains a class-weighted, L2-regularized logistic
+regression (Newton / IRLS) under stratified k-fold cross-validation, so
+FPR, FNR and AUC are measured on held-out observations.
+
+Feature extraction is vectorized (time-neighbourhood counts use sorted
+arrays and searchsorted), each Newton step costs O(n·d²) with d of a few
+dozen, and the decoy majority is subsampled to VALIDATION_CONFIG
+["observer_max_train_rows"] for training, so millions of observations
+train in seconds. Scoring always covers every held-out row.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Categorical columns keep their most frequent values; the rest share one bucket
+MAX_CATEGORIES = 16
+# Seconds either side of a call used for the local traffic-density features
+DENSITY_WINDOWS = (1.0, 10.0)
+
+
+@dataclass
+class Observations:
+    """Columnar observations; categorical columns hold integer codes"""
+    gas: np.ndarray
+    function: np.ndarray
+    contract: np.ndarray
+    endpoint: np.ndarray
+    timestamp: np.ndarray
+    is_real: np.ndarray
+    # Code -> value per categorical column, for readable feature names
+    labels: Dict[str, List[str]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.is_real)
+
+
+def _one_hot(codes: np.ndarray, prefix: str, names: List[str],
+             labels: Optional[List[str]] = None) -> np.ndarray:
+    """One-hot of the most frequent codes plus an 'other' column"""
+    counts = np.bincount(codes)
+    top = np.argsort(counts)[::-1][:MAX_CATEGORIES]
+    top = top[counts[top] > 0]
+    column = np.full(counts.shape[0], len(top))
+    column[top] = np.arange(len(top))
+    matrix = np.zeros((len(codes), len(top) + 1))
+    matrix[np.arange(len(codes)), column[codes]] = 1.0
+    names.extend(f"{prefix}={labels[code] if labels else code}" for code in top)
+    names.append(f"{prefix}=other")
+    return matrix
+
+
+def extract_features(obs: Observations,
+                     rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, List[str]]:
+    """
+    Feature matrix (one row per selected observation) and column names
+
+    'rows' picks the observations to featurize (default: all); contract
+    popularity and the timing neighbourhood still use every observation.
+    Labels are never used, so features may be computed over the full set.
+    """
+    n = len(obs)
+    rows = np.arange(n) if rows is None else rows
+    names: List[str] = []
+    blocks = []
+
+    blocks.append(np.log1p(obs.gas[rows].astype(float))[:, None])
+    names.append("log_gas")
+
+    blocks.append(_one_hot(obs.function[rows], "function", names, obs.labels.get("function")))
+    blocks.append(_one_hot(obs.endpoint[rows], "endpoint", names, obs.labels.get("endpoint")))
+
+    # How common the contract is in the traffic (frequency encoding)
+    contract_counts = np.bincount(obs.contract)
+    blocks.append(np.log(contract_counts[obs.contract[rows]] / n)[:, None])
+    names.append("log_contract_share")
+
+    # Timing: gaps to neighbouring calls and local density. Traces are
+    # already sorted, which saves the argsort
+    times = obs.timestamp
+    if np.all(times[1:] >= times[:-1]):
+        position = rows
+    else:
+        order = np.argsort(times, kind="stable")
+        times = times[order]
+        position = np.empty(n, dtype=np.int64)
+        position[order] = np.arange(n)
+        position = position[rows]
+    own = times[position]
+    fill = float(np.median(np.diff(times[:100_000]))) if n > 1 else 0.0
+    gap_before = np.where(position > 0, own - times[np.maximum(position - 1, 0)], fill)
+    gap_after = np.where(position < n - 1, times[np.minimum(position + 1, n - 1)] - own, fill)
+    blocks.append(np.log1p(np.column_stack((gap_before, gap_after))))
+    names.extend(["log_gap_before", "log_gap_after"])
+
+    for window in DENSITY_WINDOWS:
+        neighbours = (np.searchsorted(times, own + window, side="right") -
+                      np.searchsorted(times, own - window, side="left") - 1)
+        blocks.append(np.log1p(neighbours)[:, None])
+        names.append(f"log_calls_within_{window:g}s")
+
+    return np.hstack(blocks), names
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -35, 35)))
+
+
+def fit_logistic(X: np.ndarray, y: np.ndarray, sample_weight: np.ndarray,
+                 l2: float = 1.0, max_iter: int = 25, tol: float = 1e-6) -> np.ndarray:
+    """
+    Weighted L2 logistic regression by Newton's method
+
+    X should be standardized; returns weights with the intercept last.
+    """
+    Xb = np.hstack((X, np.ones((X.shape[0], 1))))
+    reg = np.full(Xb.shape[1], l2)
+    reg[-1] = 0.0                                   # Do not shrink the intercept
+    w = np.zeros(Xb.shape[1])
+    for _ in range(max_iter):
+        p = _sigmoid(Xb @ w)
+        grad = Xb.T @ (sample_weight * (p - y)) + reg * w
+        curvature = sample_weight * p * (1 - p)
+        hessian = (Xb * curvature[:, None]).T @ Xb + np.diag(reg + 1e-9)
+        step = np.linalg.solve(hessian, grad)
+        w -= step
+        if np.max(np.abs(step)) < tol:
+            break
+    return w
+
+
+def roc_auc(scores: np.ndarray, y: np.ndarray) -> float:
+    """Area under the ROC curve (Mann-Whitney U, ties share their mean rank)"""
+    positives = int(y.sum())
+    negatives = len(y) - positives
+    if positives == 0 or negatives == 0:
+        return 0.5
+    order = np.argsort(scores, kind="mergesort")
+    _, first, counts = np.unique(scores[order], return_index=True, return_counts=True)
+    ranks = np.empty(len(scores))
+    ranks[order] = np.repeat(first + (counts + 1) / 2.0, counts)
+    return float((ranks[y == 1].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def _balanced_weights(y: np.ndarray) -> np.ndarray:
+    positives = max(1, int(y.sum()))
+    negatives = max(1, len(y) - positives)
+    return np.where(y == 1, len(y) / (2.0 * positives), len(y) / (2.0 * negatives))
+
+
+def _train_rows(y: np.ndarray, rows: np.ndarray, max_rows: int,
+                rng: np.random.Generator) -> np.ndarray:
+    """Keep every real row and subsample decoys so at most 'max_rows' train"""
+    if len(rows) <= max_rows:
+        return rows
+    real = rows[y[rows] == 1]
+    decoys = rows[y[rows] == 0]
+    keep = max(1, max_rows - len(real))
+    return np.concatenate((real, rng.choice(decoys, size=min(keep, len(decoys)), replace=False)))
+
+
+def _standardize(X: np.ndarray, rows: np.ndarray):
+    mean = X[rows].mean(axis=0)
+    std = X[rows].std(axis=0)
+    std[std == 0] = 1.0
+    return mean, std
+
+
+def cross_validate(obs: Observations, folds: int = 5, max_train_rows: int = 200_000,
+                   l2: float = 1.0, seed: Optional[int] = None,
+                   rows: Optional[np.ndarray] = None) -> Dict:
+    """
+    Stratified k-fold evaluation of the adversary
+
+    Every selected observation ('rows', default all) is scored by a model
+    that never saw it; FPR / FNR use the 0.5 threshold of the
+    class-balanced model.
+    """
+    rng = np.random.default_rng(seed)
+    X, names = extract_features(obs, rows)
+    y = (obs.is_real if rows is None else obs.is_real[rows]).astype(float)
+    real_rows = np.flatnonzero(y == 1)
+    decoy_rows = np.flatnonzero(y == 0)
+    k = max(2, min(folds, len(real_rows), len(decoy_rows)))
+
+    fold_of = np.empty(len(y), dtype=np.int64)
+    for class_rows in (real_rows, decoy_rows):
+        fold_of[rng.permutation(class_rows)] = np.arange(len(class_rows)) % k
+
+    scores = np.empty(len(y))
+    for fold in range(k):
+        test = np.flatnonzero(fold_of == fold)
+        train = _train_rows(y, np.flatnonzero(fold_of != fold), max_train_rows, rng)
+        mean, std = _standardize(X, train)
+        w = fit_logistic((X[train] - mean) / std, y[train], _balanced_weights(y[train]), l2)
+        scores[test] = _sigmoid(((X[test] - mean) / std) @ w[:-1] + w[-1])
+
+    predicted = scores >= 0.5
+    real = y == 1
+    fpr = float(np.mean(predicted[~real]))
+    fnr = float(np.mean(~predicted[real]))
+
+    # Coefficients of a model on all data show which features leak
+    train = _train_rows(y, np.arange(len(y)), max_train_rows, rng)
+    mean, std = _standardize(X, train)
+    w = fit_logistic((X[train] - mean) / std, y[train], _balanced_weights(y[train]), l2)
+    strongest = np.argsort(np.abs(w[:-1]))[::-1][:5]
+
+    return {
+        "observations": len(y),
+        "real_observations": int(real.sum()),
+        "folds": k,
+        "features": len(names),
+        "false_positive_rate": fpr,
+        "false_negative_rate": fnr,
+        "accuracy": float(np.mean(predicted == real)),
+        "balanced_accuracy": 1.0 - (fpr + fnr) / 2,
+        "auc": roc_auc(scores, y),
+        "strongest_features": {names[i]: round(float(w[i]), 4) for i in strongest},
+    }
+
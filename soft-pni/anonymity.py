@@ -0,0 +1,136 @@
+"""
+Ghost Protocol - Anonymity Sets
+How many decoys an observer cannot tell apart from each real transaction
+
+For every real call, counts the decoys within +-w seconds for each window w
+in VALIDATION_CONFIG["anonymity_windows"], at two levels:
+  - time: any decoy in the window
+  - neighbourhood: decoys that also match it on every feature in
+    VALIDATION_CONFIG["anonymity_features"] (function, endpoint, contract,
+    gas bucket: quarter-octave bins of the gas estimate), i.e. the ones an
+    observer at that endpoint sees as the same kind of call
+
+Decoy times are sorted once, and the decoys sharing a neighbourhood with
+some real call once more by (neighbourhood, time). Every real call is then
+two binary searches per window over all groups at once, O(n log n)
+overall with memory linear in the decoys.
+"""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from adversary import Observations
+from config import VALIDATION_CONFIG
+
+
+NEIGHBOURHOOD_FEATURES = ("function", "endpoint", "contract", "gas")
+GAS_BUCKETS = 256  # quarter-octave bins cover any 64-bit gas value
+
+
+def neighbourhood_keys(obs: Observations, rows: np.ndarray,
+                       features: Optional[Sequence[str]] = None) -> np.ndarray:
+    """One integer per row identifying its values of 'features'"""
+    if features is None:
+        features = VALIDATION_CONFIG["anonymity_features"]
+    keys = np.zeros(len(rows), dtype=np.int64)
+    key_space = 1
+    for feature in features:
+        if feature == "gas":
+            values = np.round(np.log2(obs.gas[rows].astype(float) + 1) * 4)
+            values = np.clip(values, 0, GAS_BUCKETS - 1).astype(np.int64)
+            radix = GAS_BUCKETS
+        elif feature in NEIGHBOURHOOD_FEATURES:
+            # Radix from the whole column so real and decoy keys agree
+            column = getattr(obs, feature)
+            values = column[rows].astype(np.int64)
+            radix = int(column.max()) + 1 if len(column) else 1
+        else:
+            raise ValueError(f"Unknown neighbourhood feature {feature!r}; "
+                             f"expected one of {NEIGHBOURHOOD_FEATURES}")
+        key_space *= radix
+        if key_space > np.iinfo(np.int64).max:
+            raise ValueError(f"Neighbourhood features {tuple(features)} do not fit a 64-bit key")
+        keys = keys * radix + values
+    return keys
+
+
+def _sorted_by_time(times: np.ndarray) -> Optional[np.ndarray]:
+    """Permutation sorting 'times', or None if already sorted"""
+    if np.all(times[1:] >= times[:-1]):
+        return None
+    return np.argsort(times, kind="stable")
+
+
+def _counts_within(sorted_times: np.ndarray, at: np.ndarray, window: float) -> np.ndarray:
+    return (np.searchsorted(sorted_times, at + window, side="right") -
+            np.searchsorted(sorted_times, at - window, side="left"))
+
+
+def _summary(sizes: np.ndarray, minimum: int) -> Dict:
+    return {
+        "min": int(sizes.min()),
+        "p10": float(np.percentile(sizes, 10)),
+        "median": float(np.median(sizes)),
+        "mean": float(sizes.mean()),
+        "below_minimum": int(np.count_nonzero(sizes < minimum)),
+    }
+
+
+def analyze(obs: Observations, features: Optional[Sequence[str]] = None) -> Dict:
+    """
+    Anonymity-set sizes of every real observation, per window and level
+
+    'features' overrides VALIDATION_CONFIG["anonymity_features"] as the
+    observations a neighbourhood must share.
+    """
+    if features is None:
+        features = VALIDATION_CONFIG["anonymity_features"]
+    real_rows = np.flatnonzero(obs.is_real)
+    decoy_rows = np.flatnonzero(obs.is_real == 0)
+    minimum = VALIDATION_CONFIG["anonymity_set_minimum"]
+    if len(real_rows) == 0 or len(decoy_rows) == 0:
+        return {"real_transactions": len(real_rows), "passed": True}
+
+    decoy_times = np.asarray(obs.timestamp[decoy_rows], dtype=np.float64)
+    order = _sorted_by_time(decoy_times)
+    if order is not None:
+        decoy_rows, decoy_times = decoy_rows[order], decoy_times[order]
+    real_times = np.asarray(obs.timestamp[real_rows], dtype=np.float64)
+
+    # Only decoys sharing some real call's neighbourhood can be counted. Give
+    # each such neighbourhood a rank g and place its decoys at g * span + time,
+    # with span wider than the trace plus both window edges: one sort then
+    # orders them by (neighbourhood, time), and a search around a real call's
+    # own g * span + time can never reach into another group.
+    real_keys = neighbourhood_keys(obs, real_rows, features)
+    decoy_keys = neighbourhood_keys(obs, decoy_rows, features)
+    shared_keys = np.unique(real_keys)
+    decoy_rank = np.searchsorted(shared_keys, decoy_keys)
+    shared = decoy_rank < len(shared_keys)
+    shared[shared] = shared_keys[decoy_rank[shared]] == decoy_keys[shared]
+
+    origin = min(decoy_times[0], real_times.min())
+    widest = max(VALIDATION_CONFIG["anonymity_windows"])
+    span = 2.0 ** np.ceil(np.log2(max(decoy_times[-1], real_times.max()) - origin + 2 * widest + 1))
+    grouped_times = np.sort(decoy_rank[shared] * span + (decoy_times[shared] - origin))
+    real_positions = np.searchsorted(shared_keys, real_keys) * span + (real_times - origin)
+
+    windows = {}
+    for window in VALIDATION_CONFIG["anonymity_windows"]:
+        in_time = _counts_within(decoy_times, real_times, window)
+        in_neighbourhood = _counts_within(grouped_times, real_positions, window)
+        windows[f"{window:g}s"] = {
+            "time": _summary(in_time, minimum),
+            "neighbourhood": _summary(in_neighbourhood, minimum),
+        }
+
+    checked = windows[f"{VALIDATION_CONFIG['anonymity_check_window']:g}s"]["neighbourhood"]
+    return {
+        "real_transactions": len(real_rows),
+        "decoys": len(decoy_rows),
+        "minimum_set": minimum,
+        "features": list(features),
+        "windows": windows,
+        "passed": checked["below_minimum"] == 0,
+    }
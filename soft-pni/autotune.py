@@ -0,0 +1,310 @@
+"""
+Ghost Protocol - Mimicry Autotuner
+Parallel search over MIMICRY_CONFIG / CATEGORY_WEIGHTS for privacy per decoy
+
+Every candidate configuration is scored by virtual-time validator runs
+(GhostProtocolValidator.run_simulation with the scheduler's own heartbeat)
+in a process pool, over several seeds. Each configuration gets four
+objectives, all minimized:
+  - cost:      decoys sent per simulated hour (upstream capacity)
+  - leakage:   |adversary AUC - 0.5| * 2 (0 = the classifier is guessing)
+  - timing:    real/decoy cross-correlation
+  - exposure:  -(smallest anonymity set around a real transaction)
+
+The search is a random sweep of the space followed by refinement rounds
+that mutate members of the current Pareto front. The result is the Pareto
+front ranked by privacy score per thousand decoys an hour.
+
+Category weights only matter with live contract data (the offline fallback
+contracts are all ERC20), so they are tuned with --live only.
+
+Usage:
+    python autotune.py --trials 48 --refine 2 --duration 3600 --seeds 2 --workers 8
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Network, DEFAULT_NETWORK, MIMICRY_CONFIG, CATEGORY_WEIGHTS, VALIDATION_CONFIG
+from monte_carlo import run_metrics
+
+# (low, high) per tuned MIMICRY_CONFIG range; each min/max pair is sampled as a sorted pair
+SEARCH_SPACE = {
+    "storm_intensity": (20, 200),
+    "storm_duration": (1.0, 12.0),
+    "heartbeat_interval": (1.0, 60.0),
+}
+INTEGER_PARAMS = {"storm_intensity"}
+
+OBJECTIVES = ("cost", "leakage", "timing", "exposure")
+
+
+def baseline_params(tune_weights: bool) -> Dict:
+    """The configuration currently in config.py"""
+    params = {f"{name}_{bound}": MIMICRY_CONFIG[f"{name}_{bound}"]
+              for name in SEARCH_SPACE for bound in ("min", "max")}
+    if tune_weights:
+        params["category_weights"] = dict(CATEGORY_WEIGHTS)
+    return params
+
+
+def _sample_range(name: str, rng: random.Random) -> Tuple[float, float]:
+    low, high = SEARCH_SPACE[name]
+    a, b = sorted((rng.uniform(low, high), rng.uniform(low, high)))
+    if name in INTEGER_PARAMS:
+        return int(round(a)), max(int(round(b)), int(round(a)))
+    return round(a, 2), round(b, 2)
+
+
+def random_params(rng: random.Random, tune_weights: bool) -> Dict:
+    params = {}
+    for name in SEARCH_SPACE:
+        params[f"{name}_min"], params[f"{name}_max"] = _sample_range(name, rng)
+    if tune_weights:
+        draws = [rng.gammavariate(1.0, 1.0) for _ in CATEGORY_WEIGHTS]
+        params["category_weights"] = {
+            category: round(draw / sum(draws), 3) for category, draw in zip(CATEGORY_WEIGHTS, draws)
+        }
+    return params
+
+
+def mutate(params: Dict, rng: random.Random, scale: float = 0.15) -> Dict:
+    """A nearby configuration: each range end moves by up to 'scale' of its span"""
+    child = dict(params)
+    for name, (low, high) in SEARCH_SPACE.items():
+        ends = []
+        for bound in ("min", "max"):
+            value = params[f"{name}_{bound}"] + rng.gauss(0, scale * (high - low))
+            ends.append(min(high, max(low, value)))
+        a, b = sorted(ends)
+        if name in INTEGER_PARAMS:
+            a, b = int(round(a)), int(round(b))
+        else:
+            a, b = round(a, 2), round(b, 2)
+        child[f"{name}_min"], child[f"{name}_max"] = a, b
+    if "category_weights" in params:
+        weights = {c: max(0.01, w * rng.lognormvariate(0, scale * 2))
+                   for c, w in params["category_weights"].items()}
+        total = sum(weights.values())
+        child["category_weights"] = {c: round(w / total, 3) for c, w in weights.items()}
+    return child
+
+
+def _apply(params: Dict):
+    for key, value in params.items():
+        if key == "category_weights":
+            CATEGORY_WEIGHTS.update(value)
+        else:
+            MIMICRY_CONFIG[key] = value
+
+
+def evaluate(task: Tuple[int, Dict, int, float, int, str, bool]) -> Dict:
+    """Run one seeded simulation under 'params' (in a worker process)"""
+    index, params, seed, duration, num_real_tx, network_value, offline = task
+    from validator import GhostProtocolValidator
+
+    saved = (dict(MIMICRY_CONFIG), dict(CATEGORY_WEIGHTS))
+    try:
+        _apply(params)
+        with contextlib.redirect_stdout(io.StringIO()):
+            validator = GhostProtocolValidator(Network(network_value))
+            report = validator.run_simulation(
+                duration_seconds=duration, num_real_tx=num_real_tx, seed=seed,
+                offline=offline, verbose=False, config_heartbeat=True
+            )
+    finally:
+        # Inline runs (one worker) share the parent's config
+        MIMICRY_CONFIG.update(saved[0])
+        CATEGORY_WEIGHTS.update(saved[1])
+    return dict(run_metrics(report), index=index, seed=seed)
+
+
+def _mean(runs: List[Dict], key: str, default: float) -> float:
+    values = [r[key] for r in runs if r.get(key) is not None]
+    return float(np.mean(values)) if values else default
+
+
+def score(params: Dict, runs: List[Dict], duration: float) -> Dict:
+    """Objectives and privacy score of one configuration over its seeded runs"""
+    auc = _mean(runs, "classifier_auc", 0.5)
+    timing = _mean(runs, "timing_correlation", 0.0)
+    anonymity_min = min((r["anonymity_set_min"] for r in runs if r.get("anonymity_set_min") is not None),
+                        default=0)
+    decoys_per_hour = _mean(runs, "decoys", 0.0) * 3600 / duration
+    objectives = {
+        "cost": decoys_per_hour,
+        "leakage": abs(auc - 0.5) * 2,
+        "timing": timing,
+        "exposure": -anonymity_min,
+    }
+    # Each term in [0, 1], 1 = best
+    privacy = np.mean([
+        1.0 - objectives["leakage"],
+        1.0 - min(1.0, timing / VALIDATION_CONFIG["timing_correlation_threshold"] / 2),
+        min(1.0, anonymity_min / VALIDATION_CONFIG["anonymity_set_minimum"]),
+    ])
+    return {
+        "params": params,
+        "objectives": {k: round(v, 4) for k, v in objectives.items()},
+        "adversary_auc": round(auc, 4),
+        "anonymity_set_min": anonymity_min,
+        "privacy_score": round(float(privacy), 4),
+        "privacy_per_kdecoy_hour": round(float(privacy) / max(decoys_per_hour / 1000, 1e-9), 4),
+        "pass_rate": round(_mean(runs, "passed", 0.0), 3),
+        "runs": len(runs),
+    }
+
+
+def pareto_front(candidates: List[Dict]) -> List[Dict]:
+    """Candidates no other candidate beats on every objective"""
+    if not candidates:
+        return []
+    points = np.array([[c["objectives"][o] for o in OBJECTIVES] for c in candidates])
+    front = []
+    for i, point in enumerate(points):
+        dominated = np.any(np.all(points <= point, axis=1) & np.any(points < point, axis=1))
+        if not dominated:
+            front.append(candidates[i])
+    return sorted(front, key=lambda c: c["privacy_per_kdecoy_hour"], reverse=True)
+
+
+class Autotuner:
+    """
+    Sweeps configurations through a process pool and keeps the Pareto front
+    """
+
+    def __init__(self, duration: float = 3600, seeds: int = 2, num_real_tx: int = 10,
+                 workers: Optional[int] = None, network: Network = DEFAULT_NETWORK,
+                 offline: bool = True, seed: int = 0):
+        self.duration = duration
+        self.seeds = seeds
+        self.num_real_tx = num_real_tx
+        self.workers = workers or os.cpu_count() or 1
+        self.network = network
+        self.offline = offline
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.candidates: List[Dict] = []
+        self.simulations = 0
+
+    def _evaluate_all(self, configs: List[Dict], pool: Optional[ProcessPoolExecutor]) -> List[Dict]:
+        offset = len(self.candidates)
+        tasks = [
+            (offset + i, params, self.seed + s, self.duration, self.num_real_tx,
+             self.network.value, self.offline)
+            for i, params in enumerate(configs) for s in range(self.seeds)
+        ]
+        chunksize = max(1, len(tasks) // (self.workers * 4))
+        results = pool.map(evaluate, tasks, chunksize=chunksize) if pool else map(evaluate, tasks)
+        by_config: Dict[int, List[Dict]] = {}
+        for result in results:
+            by_config.setdefault(result["index"], []).append(result)
+        self.simulations += len(tasks)
+
+        scored = [score(params, by_config[offset + i], self.duration) for i, params in enumerate(configs)]
+        self.candidates.extend(scored)
+        return scored
+
+    def run(self, trials: int, refine_rounds: int = 0, verbose: bool = True) -> Dict:
+        """Random sweep of 'trials' configurations, then 'refine_rounds' around the front"""
+        tune_weights = not self.offline
+        started = time.perf_counter()
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            # Same seeds for every configuration: differences come from the parameters
+            configs = [baseline_params(tune_weights)] + \
+                [random_params(self.rng, tune_weights) for _ in range(trials)]
+            self._evaluate_all(configs, pool)
+            if verbose:
+                print(f"[Autotune] Sweep: {len(configs)} configurations, "
+                      f"front of {len(pareto_front(self.candidates))}")
+
+            for round_number in range(refine_rounds):
+                front = pareto_front(self.candidates)
+                children = [mutate(self.rng.choice(front)["params"], self.rng) for _ in range(trials)]
+                self._evaluate_all(children, pool)
+                if verbose:
+                    print(f"[Autotune] Refinement {round_number + 1}: {len(children)} configurations, "
+                          f"front of {len(pareto_front(self.candidates))}")
+        finally:
+            if pool:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - started
+        return {
+            "configurations": len(self.candidates),
+            "simulations": self.simulations,
+            "simulated_seconds_per_run": self.duration,
+            "seeds": self.seeds,
+            "workers": self.workers,
+            "offline": self.offline,
+            "elapsed_seconds": round(elapsed, 2),
+            "simulations_per_second": round(self.simulations / elapsed, 2) if elapsed > 0 else None,
+            "baseline": self.candidates[0],
+            "pareto_front": pareto_front(self.candidates),
+        }
+
+
+def print_front(result: Dict, limit: int = 15):
+    print(f"\n{'='*100}")
+    print("GHOST PROTOCOL - MIMICRY AUTOTUNER (Pareto front, ranked by privacy per 1k decoys/hour)")
+    print(f"{'='*100}")
+    print(f"{result['configurations']} configurations x {result['seeds']} seeds = {result['simulations']} "
+          f"simulations in {result['elapsed_seconds']}s ({result['simulations_per_second']}/s, "
+          f"{result['workers']} workers)")
+    header = (f"  {'intensity':>11} {'duration':>11} {'heartbeat':>11} {'decoys/h':>9} "
+              f"{'AUC':>6} {'timing':>7} {'anon':>5} {'privacy':>8} {'per 1k/h':>9}")
+    print(header)
+
+    def row(c: Dict, marker: str = " "):
+        p = c["params"]
+        o = c["objectives"]
+        print(f"{marker} {p['storm_intensity_min']:>5}-{p['storm_intensity_max']:<5} "
+              f"{p['storm_duration_min']:>5}-{p['storm_duration_max']:<5} "
+              f"{p['heartbeat_interval_min']:>5}-{p['heartbeat_interval_max']:<5} "
+              f"{o['cost']:>9.0f} {c['adversary_auc']:>6.3f} {o['timing']:>7.3f} "
+              f"{c['anonymity_set_min']:>5} {c['privacy_score']:>8.3f} {c['privacy_per_kdecoy_hour']:>9.3f}")
+
+    for candidate in result["pareto_front"][:limit]:
+        row(candidate)
+    print("  baseline (config.py):")
+    row(result["baseline"], "*")
+    print(f"{'='*100}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ghost Protocol mimicry parameter autotuner")
+    parser.add_argument("--trials", type=int, default=32, help="configurations per round")
+    parser.add_argument("--refine", type=int, default=1, help="refinement rounds around the front")
+    parser.add_argument("--duration", type=float, default=3600, help="simulated seconds per run")
+    parser.add_argument("--seeds", type=int, default=2, help="seeded runs per configuration")
+    parser.add_argument("--real-tx", type=int, default=10, help="real transactions per run")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--network", default=DEFAULT_NETWORK.value)
+    parser.add_argument("--live", action="store_true", help="live contract data; also tunes category weights")
+    parser.add_argument("--json", metavar="PATH", help="also write the ranked front as JSON")
+    args = parser.parse_args()
+
+    tuner = Autotuner(duration=args.duration, seeds=args.seeds, num_real_tx=args.real_tx,
+                      workers=args.workers, network=Network(args.network),
+                      offline=not args.live, seed=args.seed)
+    result = tuner.run(trials=args.trials, refine_rounds=args.refine)
+    print_front(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"[Autotune] Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -41,9 +41,31 @@ RPC_ENDPOINTS = {
     ]
 }
 
+# WebSocket RPC endpoints for eth_subscribe passthrough
+WS_RPC_ENDPOINTS = {
+    Network.SEPOLIA: [
+        "wss://ethereum-sepolia-rpc.publicnode.com",
+        "wss://sepolia.gateway.tenderly.co",
+    ],
+    Network.GOERLI: [
+        "wss://ethereum-goerli.publicnode.com",
+    ],
+    Network.MUMBAI: [],
+    Network.BSC_TESTNET: [
+        "wss://bsc-testnet-rpc.publicnode.com",
+    ]
+}
+
 # Private RPC for real transactions (user should configure)
 PRIVATE_RPC_ENDPOINT = os.getenv("GHOST_PRIVATE_RPC", None)
 
+# All private relays: GHOST_PRIVATE_RPC plus the comma-separated GHOST_PRIVATE_RPCS
+PRIVATE_RPC_ENDPOINTS = [
+    url.strip() for url in os.getenv("GHOST_PRIVATE_RPCS", "").split(",") if url.strip()
+]
+if PRIVATE_RPC_ENDPOINT and PRIVATE_RPC_ENDPOINT not in PRIVATE_RPC_ENDPOINTS:
+    PRIVATE_RPC_ENDPOINTS.insert(0, PRIVATE_RPC_ENDPOINT)
+
 # API Keys (optional - for rate limit increases)
 ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY", "YourApiKeyToken")
 ALCHEMY_API_KEY = os.getenv("ALCHEMY_API_KEY", None)
@@ -101,13 +123,121 @@ CATEGORY_WEIGHTS = {
     "erc20": 0.15,
 }
 
+# RPC proxy settings
+PROXY_CONFIG = {
+    "upstream_timeout": 30,           # seconds per upstream HTTP call
+    "raw_passthrough": True,          # forward non-tx bodies without decoding
+    "hub_timeout": 60,                # seconds; covers storm + admission wait
+    "stats_sync_interval": 1.0,       # seconds between worker stats pushes
+    "hub_cache_timeout": 0.5,         # seconds; a slower shared-cache lookup counts as a miss
+    "hub_cache_max_entries": 20000,   # shared read-cache entries kept by the hub (LRU)
+}
+
+# Sampled per-request tracing (GET /traces, optional JSON-lines export)
+TRACE_CONFIG = {
+    "enabled": os.getenv("GHOST_TRACE", "false").lower() == "true",
+    "sample_rate": float(os.getenv("GHOST_TRACE_SAMPLE_RATE", "0.01")),
+    "summary_window": 2000,           # most recent traces kept for the summary
+    "jsonl_path": os.getenv("GHOST_TRACE_FILE") or None,
+}
+
+# Append-only storm journal (disabled unless GHOST_JOURNAL_DIR is set)
+JOURNAL_CONFIG = {
+    "directory": os.getenv("GHOST_JOURNAL_DIR") or None,
+    "max_file_bytes": 8 * 1024 * 1024,  # rotate after this many bytes
+    "max_files": 64,                    # oldest files beyond this are deleted (0 = keep all)
+    "fsync": False,                     # fsync every record (slower, survives power loss)
+}
+
+# Storm coordination (merging and global decoy budget)
+STORM_CONFIG = {
+    "merge_min_remaining": 0.25,      # seconds left for a TX to join a storm
+    "merge_extension_factor": 0.5,    # extend by this share of a fresh storm
+    "decoy_budget_per_second": 25,    # sustained decoys/sec across all storms
+    "decoy_budget_burst": 300,        # decoys available at once
+    "max_admission_wait": 10.0,       # seconds a TX may wait for budget
+}
+
+# Transaction preparation cache (pending nonces, gas answers)
+TX_CACHE_CONFIG = {
+    "enabled": True,
+    "nonce_ttl": 60,                  # seconds before re-asking upstream
+    "gas_ttl": 12,                    # seconds, about one block
+}
+
+# Endpoint routing / health tracking
+ROUTING_CONFIG = {
+    "initial_latency": 1.0,           # seconds, assumed before first sample
+    "latency_ewma_alpha": 0.2,        # weight of newest latency sample
+    "error_ewma_alpha": 0.1,          # weight of newest success/failure
+    "error_penalty": 4.0,             # score multiplier per unit error rate
+    "circuit_failure_threshold": 3,   # consecutive failures to open circuit
+    "circuit_cooldown": 30,           # seconds before a half-open trial
+    "circuit_trial_timeout": 30,      # seconds a half-open trial may run before another is allowed
+    "probe_interval": 15,             # seconds between background probes
+    "probe_timeout": 5,               # seconds
+    "read_pool_size": 2,              # fastest endpoints used for reads
+    "decoy_max_spread": 3.0,          # max decoy share ratio between endpoints
+    "decoy_rate_limit": 8.0,          # decoy calls per second per endpoint
+    "decoy_rate_burst": 20,           # decoy calls an endpoint can absorb at once
+    "decoy_max_defer": 2.0,           # seconds a decoy may wait for a free endpoint
+    "rate_limit_backoff": 5.0,        # seconds after a 429 without Retry-After
+    "rate_limit_max_backoff": 120.0,  # cap for Retry-After / repeated 429 backoff
+}
+
+# Chain head follower (answers head polls locally, drives block-scoped caches)
+HEAD_CONFIG = {
+    "enabled": True,
+    "poll_interval": 2.0,             # seconds between latest-header fetches
+    "max_staleness": 10.0,            # seconds; older heads are not served locally
+}
+
+# eth_getLogs range splitting (parallel chunks, finalized chunk cache)
+LOGS_CONFIG = {
+    "enabled": True,
+    "chunk_size": 2000,               # blocks per chunk (common public RPC cap)
+    "max_concurrency": 4,             # chunks in flight per query
+    "endpoint_fanout": 3,             # healthy endpoints the chunks are spread over
+    "chunk_attempts": 3,              # endpoints tried per chunk before failing
+    "finality_depth": 64,             # blocks below head treated as final (cacheable)
+    "cache_max_chunks": 4096,
+    "max_chunks": 100,                # uncached chunks one query may fetch; wider ones are refused
+}
+
+# Hedged reads (duplicate slow reads to a second endpoint)
+HEDGE_CONFIG = {
+    "enabled": True,
+    "delay_percentile": 95,           # hedge after this latency percentile
+    "min_delay": 0.05,                # seconds
+    "max_delay": 2.0,                 # seconds
+    "default_delay": 0.5,             # seconds, used until min_samples exist
+    "min_samples": 20,
+    "latency_window": 500,            # recent latencies kept
+    "max_hedge_ratio": 0.1,           # long-run cap on hedges per read
+    "hedge_burst": 10,                # hedges allowed back-to-back
+}
+
 # Validation settings
 VALIDATION_CONFIG = {
     "test_duration": 3600,           # 1 hour
     "observer_sample_rate": 0.1,     # 10% of traffic
     "timing_correlation_threshold": 0.1,
+    "periodicity_threshold": 0.3,      # autocorrelation peak height that counts as periodic
+    "spectral_bin_seconds": 1.0,       # event-count bin width for FFT timing analysis
+    "spectral_max_lag_seconds": 60,    # largest lag searched for periods and real/decoy leakage
+    "spectral_max_bins": 1 << 22,      # bins widen beyond this so long traces stay O(B log B)
     "false_positive_threshold": 0.05,
     "false_negative_threshold": 0.05,
+    "classifier_auc_threshold": 0.75,  # adversary AUC at or above this fails validation
+    "clustering_window_seconds": 60,   # IP clustering metrics per window of this length
+    "clustering_windows_kept": 1440,   # closed windows kept (a day of minutes)
+    "anonymity_windows": (1, 10, 60),  # seconds either side of a real TX
+    "anonymity_check_window": 10,      # window whose neighbourhood sets must reach the minimum
+    "anonymity_set_minimum": 10,       # indistinguishable decoys required around every real TX
+    "anonymity_features": ("function", "endpoint", "gas"),  # a neighbourhood shares all of these (+ "contract")
+    "observer_folds": 5,               # cross-validation folds for the adversary
+    "observer_max_train_rows": 200_000,  # decoys are subsampled beyond this per fold
+    "observer_max_rows": 2_000_000,    # trace rows (all real + sampled decoys) the observer featurizes
 }
 
 
@@ -125,6 +255,11 @@ def get_all_rpc_endpoints(network: Network = DEFAULT_NETWORK) -> list:
     return RPC_ENDPOINTS.get(network, [])
 
 
+def get_ws_rpc_endpoints(network: Network = DEFAULT_NETWORK) -> list:
+    """Get all WebSocket RPC endpoints for a network"""
+    return WS_RPC_ENDPOINTS.get(network, [])
+
+
 def get_etherscan_api(network: Network = DEFAULT_NETWORK) -> str:
     """Get Etherscan API endpoint for the network"""
     return ETHERSCAN_APIS.get(network, ETHERSCAN_APIS[Network.SEPOLIA])
@@ -0,0 +1,369 @@
+"""
+Ghost Protocol - Endpoint Manager
+Latency-aware RPC endpoint routing with health tracking and circuit breakers
+
+Keeps an EWMA of latency and error rate for every public RPC endpoint,
+opens a circuit after repeated failures and probes endpoints in the
+background so dead entries stop receiving traffic until they recover.
+Each endpoint also has a token bucket for decoy traffic and backs off
+after a 429 (honouring Retry-After), so storms stay within provider limits.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from config import ROUTING_CONFIG
+
+
+class RateLimitedError(Exception):
+    """Upstream refused a request with HTTP 429 or a JSON-RPC rate-limit error"""
+
+    def __init__(self, url: str, retry_after: Optional[float] = None):
+        super().__init__(f"rate limited by {url}")
+        self.url = url
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitState(Enum):
+    """Circuit breaker states for a single endpoint"""
+    CLOSED = "closed"        # Healthy, receives traffic
+    OPEN = "open"            # Failing, no traffic until cooldown expires
+    HALF_OPEN = "half_open"  # Cooldown expired, waiting for a trial request
+
+
+@dataclass
+class EndpointHealth:
+    """Rolling health statistics for one RPC endpoint"""
+    url: str
+    latency_ewma: float                 # seconds
+    error_rate: float = 0.0             # EWMA of failures, 0.0 to 1.0
+    consecutive_failures: int = 0
+    state: CircuitState = CircuitState.CLOSED
+    opened_at: float = 0.0
+    trial_started: float = 0.0          # monotonic time the half-open trial was handed out
+    total_requests: int = 0
+    total_failures: int = 0
+    tokens: float = float(ROUTING_CONFIG["decoy_rate_burst"])   # decoy token bucket
+    last_refill: float = field(default_factory=time.monotonic)
+    throttled_until: float = 0.0        # monotonic time a 429 backoff ends
+    throttle_streak: int = 0            # consecutive 429s (doubles the default backoff)
+    total_throttled: int = 0
+
+    def refill(self, now: float):
+        self.tokens = min(
+            self.tokens + (now - self.last_refill) * ROUTING_CONFIG["decoy_rate_limit"],
+            float(ROUTING_CONFIG["decoy_rate_burst"])
+        )
+        self.last_refill = now
+
+    def trial_pending(self, now: float) -> bool:
+        """Whether a half-open trial request is already in flight"""
+        return self.state == CircuitState.HALF_OPEN and self.trial_started > 0 and \
+            now - self.trial_started < ROUTING_CONFIG["circuit_trial_timeout"]
+
+    def score(self) -> float:
+        """Lower is better: latency inflated by the recent error rate"""
+        return self.latency_ewma * (1.0 + ROUTING_CONFIG["error_penalty"] * self.error_rate)
+
+
+class EndpointManager:
+    """
+    Tracks endpoint health and picks endpoints for reads and decoys
+    """
+
+    def __init__(self, endpoints: List[str]):
+        self.health: Dict[str, EndpointHealth] = {
+            url: EndpointHealth(url=url, latency_ewma=ROUTING_CONFIG["initial_latency"])
+            for url in endpoints
+        }
+        self._probe_task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Outcome recording
+    # ------------------------------------------------------------------
+
+    def record_success(self, url: str, latency: float):
+        """Record a successful request and its latency"""
+        health = self.health.get(url)
+        if health is None:
+            return  # Private relay or other untracked endpoint
+
+        alpha = ROUTING_CONFIG["latency_ewma_alpha"]
+        health.latency_ewma = (1 - alpha) * health.latency_ewma + alpha * latency
+        health.error_rate *= (1 - ROUTING_CONFIG["error_ewma_alpha"])
+        health.consecutive_failures = 0
+        health.throttle_streak = 0
+        health.total_requests += 1
+        health.trial_started = 0.0
+
+        if health.state != CircuitState.CLOSED:
+            print(f"[EndpointManager] Circuit closed: {url}")
+            health.state = CircuitState.CLOSED
+
+    def record_failure(self, url: str):
+        """Record a failed request, opening the circuit if failures repeat"""
+        health = self.health.get(url)
+        if health is None:
+            return
+
+        alpha = ROUTING_CONFIG["error_ewma_alpha"]
+        health.error_rate = (1 - alpha) * health.error_rate + alpha
+        health.consecutive_failures += 1
+        health.total_requests += 1
+        health.total_failures += 1
+        health.trial_started = 0.0
+
+        threshold = ROUTING_CONFIG["circuit_failure_threshold"]
+        if health.state == CircuitState.HALF_OPEN or \
+                (health.state == CircuitState.CLOSED and health.consecutive_failures >= threshold):
+            if health.state == CircuitState.CLOSED:
+                print(f"[EndpointManager] Circuit opened: {url} "
+                      f"({health.consecutive_failures} consecutive failures)")
+            health.state = CircuitState.OPEN
+            health.opened_at = time.monotonic()
+
+    def record_rate_limited(self, url: str, retry_after: Optional[float] = None):
+        """
+        Back off from an endpoint that answered 429
+
+        Uses Retry-After when given, otherwise 'rate_limit_backoff' doubled
+        for each consecutive 429. Throttling is not a failure, so the
+        circuit breaker and error rate are left alone.
+        """
+        health = self.health.get(url)
+        if health is None:
+            return
+
+        if retry_after is None:
+            retry_after = ROUTING_CONFIG["rate_limit_backoff"] * (2 ** health.throttle_streak)
+        backoff = min(retry_after, ROUTING_CONFIG["rate_limit_max_backoff"])
+        if not self.is_throttled(url):
+            # Only the first 429 of a burst of in-flight calls extends the streak
+            print(f"[EndpointManager] Rate limited: {url} (backing off {backoff:.1f}s)")
+            health.throttle_streak += 1
+        health.total_throttled += 1
+        health.tokens = 0.0
+        health.trial_started = 0.0  # The trial gets another go once the backoff ends
+        health.throttled_until = max(health.throttled_until, time.monotonic() + backoff)
+
+    def is_throttled(self, url: str) -> bool:
+        health = self.health.get(url)
+        return health is not None and time.monotonic() < health.throttled_until
+
+    # ------------------------------------------------------------------
+    # Selection
+    # ------------------------------------------------------------------
+
+    def is_available(self, url: str) -> bool:
+        """
+        Check whether an endpoint may currently receive traffic
+
+        A half-open endpoint is available for exactly one trial request: once
+        a selector has handed it out (see _claim) it is unavailable until the
+        trial is recorded, or 'circuit_trial_timeout' passes without an outcome.
+        """
+        health = self.health.get(url)
+        if health is None:
+            return False
+        now = time.monotonic()
+        if now < health.throttled_until:
+            return False
+        if health.state == CircuitState.OPEN:
+            if now - health.opened_at >= ROUTING_CONFIG["circuit_cooldown"]:
+                health.state = CircuitState.HALF_OPEN
+                health.trial_started = 0.0
+            else:
+                return False
+        return not health.trial_pending(now)
+
+    def _claim(self, url: str) -> str:
+        """Mark 'url' as carrying the trial request if its circuit is half-open"""
+        health = self.health.get(url)
+        if health is not None and health.state == CircuitState.HALF_OPEN:
+            health.trial_started = time.monotonic()
+        return url
+
+    def healthy_endpoints(self) -> List[EndpointHealth]:
+        """Available endpoints, fastest first"""
+        available = [h for h in self.health.values() if self.is_available(h.url)]
+        return sorted(available, key=lambda h: h.score())
+
+    def _ranked_endpoints(self) -> List[EndpointHealth]:
+        """Healthy endpoints, or every endpoint if all circuits are open"""
+        ranked = self.healthy_endpoints()
+        if not ranked:
+            # Never refuse to route: fall back to the least-bad endpoints
+            ranked = sorted(self.health.values(), key=lambda h: h.score())
+        return ranked
+
+    def select_read_endpoints(self, count: int = 1) -> List[str]:
+        """Return up to 'count' distinct endpoints, fastest healthy first"""
+        return [self._claim(h.url) for h in self._ranked_endpoints()[:count]]
+
+    def choose_read_endpoint(self) -> str:
+        """
+        Pick an endpoint for a passthrough read
+
+        Chooses among the fastest healthy endpoints (weighted by inverse
+        score) so reads are fast without pinning every call to one provider.
+        """
+        pool = self._ranked_endpoints()[:ROUTING_CONFIG["read_pool_size"]]
+        weights = [1.0 / max(h.score(), 1e-6) for h in pool]
+        return self._claim(random.choices(pool, weights=weights, k=1)[0].url)
+
+    def decoy_weights(self) -> Dict[str, float]:
+        """
+        Routing weights for decoy traffic
+
+        Faster endpoints get more decoys, but the ratio between the most-
+        and least-used healthy endpoint is capped at 'decoy_max_spread' so
+        decoys stay dispersed across providers.
+        """
+        ranked = self._ranked_endpoints()
+        inverse = {h.url: 1.0 / max(h.score(), 1e-6) for h in ranked}
+        floor = min(inverse.values())
+        spread = ROUTING_CONFIG["decoy_max_spread"]
+        return {url: min(w / floor, spread) for url, w in inverse.items()}
+
+    def choose_decoy_endpoint(self) -> str:
+        """Pick an endpoint for a single decoy call"""
+        weights = self.decoy_weights()
+        urls = list(weights.keys())
+        return self._claim(random.choices(urls, weights=[weights[u] for u in urls], k=1)[0])
+
+    def acquire_decoy_endpoint(self, preferred: str) -> Optional[str]:
+        """
+        Take a decoy token, preferably from 'preferred'
+
+        Falls back to another available endpoint with a free token (chosen
+        by decoy weight); returns None if every endpoint is out of tokens.
+        """
+        now = time.monotonic()
+        candidates = []
+        for health in self.health.values():
+            if not self.is_available(health.url):
+                continue
+            health.refill(now)
+            if health.tokens >= 1.0:
+                if health.url == preferred:
+                    health.tokens -= 1.0
+                    return self._claim(preferred)
+                candidates.append(health.url)
+        if not candidates:
+            return None
+
+        weights = self.decoy_weights()
+        url = random.choices(candidates, weights=[weights.get(u, 1.0) for u in candidates], k=1)[0]
+        self.health[url].tokens -= 1.0
+        return self._claim(url)
+
+    def decoy_token_wait(self) -> float:
+        """Seconds until some endpoint has a decoy token again"""
+        now = time.monotonic()
+        waits = []
+        for health in self.health.values():
+            if health.state == CircuitState.OPEN:
+                continue
+            health.refill(now)
+            throttle_wait = max(0.0, health.throttled_until - now)
+            token_wait = max(0.0, 1.0 - health.tokens) / ROUTING_CONFIG["decoy_rate_limit"]
+            waits.append(max(throttle_wait, token_wait))
+        return min(waits) if waits else ROUTING_CONFIG["decoy_max_defer"]
+
+    # ------------------------------------------------------------------
+    # Background probing
+    # ------------------------------------------------------------------
+
+    async def probe_endpoint(self, session: aiohttp.ClientSession, url: str):
+        """Send a cheap eth_blockNumber call and record the outcome"""
+        health = self.health[url]
+        if health.trial_pending(time.monotonic()):
+            return  # A request is already acting as the half-open trial
+        self._claim(url)
+        probe = {"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 1}
+        started = time.monotonic()
+        try:
+            async with session.post(
+                url,
+                json=probe,
+                timeout=aiohttp.ClientTimeout(total=ROUTING_CONFIG["probe_timeout"])
+            ) as response:
+                if response.status == 429:
+                    raise RateLimitedError(url, parse_retry_after(response.headers.get("Retry-After")))
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+                if "result" not in data:
+                    raise ValueError(data.get("error", "no result"))
+            self.record_success(url, time.monotonic() - started)
+        except RateLimitedError as e:
+            self.record_rate_limited(url, e.retry_after)
+        except Exception:
+            self.record_failure(url)
+
+    async def _probe_loop(self, session: aiohttp.ClientSession):
+        """Probe every endpoint periodically, including open circuits"""
+        while True:
+            for url, health in self.health.items():
+                # Open circuits are moved to half-open so the probe acts as the trial
+                if health.state == CircuitState.OPEN and \
+                        time.monotonic() - health.opened_at >= ROUTING_CONFIG["circuit_cooldown"]:
+                    health.state = CircuitState.HALF_OPEN
+                    health.trial_started = 0.0
+            # Throttled endpoints are left alone until their backoff ends
+            await asyncio.gather(
+                *(self.probe_endpoint(session, url) for url in self.health
+                  if not self.is_throttled(url)),
+                return_exceptions=True
+            )
+            await asyncio.sleep(ROUTING_CONFIG["probe_interval"])
+
+    def start_probing(self, session: aiohttp.ClientSession):
+        """Start the background probe loop on the running event loop"""
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop(session))
+
+    async def stop_probing(self):
+        """Cancel the background probe loop"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Per-endpoint health summary for the /health endpoint"""
+        return {
+            url: {
+                "state": h.state.value,
+                "throttled": self.is_throttled(url),
+                "throttled_total": h.total_throttled,
+                "latency_ms": round(h.latency_ewma * 1000, 1),
+                "error_rate": round(h.error_rate, 4),
+                "requests": h.total_requests,
+                "failures": h.total_failures,
+            }
+            for url, h in self.health.items()
+        }
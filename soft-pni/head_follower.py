@@ -0,0 +1,131 @@
+"""
+Ghost Protocol - Chain Head Follower
+Keeps the latest block header in memory and answers head polls locally
+
+Wallets poll eth_blockNumber and eth_getBlockByNumber("latest", false)
+constantly. One background task per proxy fetches the latest header every
+HEAD_CONFIG["poll_interval"] seconds; while that header is fresh those polls
+are answered from memory. Every new head (or reorg at the same height) is
+announced to registered callbacks, which block-scoped caches use to
+invalidate themselves.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config import HEAD_CONFIG
+
+HEAD_METHODS = frozenset({"eth_blockNumber", "eth_getBlockByNumber"})
+
+
+class HeadFollower:
+    """
+    Polls the chain head and serves it to wallets
+    """
+
+    def __init__(self, fetch_latest: Callable[[], Awaitable[Dict]]):
+        """'fetch_latest()' returns the latest block header (transaction hashes only)"""
+        self.fetch_latest = fetch_latest
+        self.header: Optional[Dict] = None
+        self.number = -1
+        self.updated = 0.0                  # monotonic time of the last successful poll
+        self.blocks_seen = 0
+        self.poll_failures = 0
+        self.behind_headers = 0             # headers ignored for being below the head
+        self._callbacks: List[Callable[[int], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def on_new_block(self, callback: Callable[[int], None]):
+        """Call 'callback(block_number)' whenever the head changes"""
+        self._callbacks.append(callback)
+
+    def is_fresh(self) -> bool:
+        return self.header is not None and \
+            time.monotonic() - self.updated < HEAD_CONFIG["max_staleness"]
+
+    def update(self, header: Dict):
+        """
+        Adopt a newly fetched header, notifying callbacks if the head moved
+
+        Headers below the current head (a lagging or round-robined endpoint)
+        are ignored so local answers never go backwards; a different hash
+        at the same height is a reorg. Once the head is stale any header is
+        adopted again.
+        """
+        number = int(header["number"], 16)
+        if self.is_fresh() and number < self.number:
+            self.behind_headers += 1
+            return
+        changed = self.header is None or number != self.number or \
+            header.get("hash") != self.header.get("hash")
+        self.header = header
+        self.number = number
+        self.updated = time.monotonic()
+        if changed:
+            self.blocks_seen += 1
+            for callback in self._callbacks:
+                callback(number)
+
+    # ------------------------------------------------------------------
+    # Local answers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def handles(method: str, params) -> bool:
+        """Whether a request asks for the current head (header only)"""
+        if method == "eth_blockNumber":
+            return True
+        return method == "eth_getBlockByNumber" and isinstance(params, list) and \
+            len(params) >= 1 and params[0] == "latest" and \
+            (len(params) < 2 or params[1] is False)
+
+    def answer(self, rpc_request: Dict) -> Optional[Dict]:
+        """Response from the in-memory head, or None if it is missing or stale"""
+        if not HEAD_CONFIG["enabled"] or not self.is_fresh():
+            return None
+        method = rpc_request.get("method", "")
+        if not self.handles(method, rpc_request.get("params", [])):
+            return None
+        result = hex(self.number) if method == "eth_blockNumber" else self.header
+        return {"jsonrpc": "2.0", "id": rpc_request.get("id", 1), "result": result}
+
+    # ------------------------------------------------------------------
+    # Background polling
+    # ------------------------------------------------------------------
+
+    async def _follow(self):
+        while True:
+            try:
+                self.update(await self.fetch_latest())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.poll_failures += 1
+                if not self.is_fresh():
+                    print(f"[HeadFollower] Head unavailable: {e}")
+            await asyncio.sleep(HEAD_CONFIG["poll_interval"])
+
+    def start(self):
+        """Start following the head on the running event loop"""
+        if HEAD_CONFIG["enabled"] and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._follow())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict:
+        return {
+            "block": self.number,
+            "fresh": self.is_fresh(),
+            "age_s": round(time.monotonic() - self.updated, 2) if self.header else None,
+            "blocks_seen": self.blocks_seen,
+            "poll_failures": self.poll_failures,
+            "behind_headers": self.behind_headers,
+        }
@@ -0,0 +1,65 @@
+"""
+Ghost Protocol - Hedged Reads
+Percentile-based hedging policy for read requests
+
+If the primary endpoint has not answered within the current latency
+percentile, the proxy sends the same read to a second endpoint and takes
+whichever answers first. A token bucket caps hedges to a fraction of reads
+so a slow network never doubles upstream load.
+"""
+
+from collections import deque
+
+from config import HEDGE_CONFIG
+
+
+class HedgePolicy:
+    """
+    Tracks recent upstream latencies and the hedge budget
+    """
+
+    def __init__(self):
+        self.latencies = deque(maxlen=HEDGE_CONFIG["latency_window"])
+        self.tokens = float(HEDGE_CONFIG["hedge_burst"])
+        self.reads = 0
+        self.hedges = 0
+
+    def record_latency(self, latency: float):
+        """Record the latency of a successful upstream read"""
+        self.latencies.append(latency)
+
+    def hedge_delay(self) -> float:
+        """
+        Seconds to wait on the primary before hedging
+
+        Uses the configured percentile of recent latencies, clamped to
+        [min_delay, max_delay]; falls back to default_delay until enough
+        samples exist.
+        """
+        if len(self.latencies) < HEDGE_CONFIG["min_samples"]:
+            return HEDGE_CONFIG["default_delay"]
+
+        ordered = sorted(self.latencies)
+        index = int(len(ordered) * HEDGE_CONFIG["delay_percentile"] / 100)
+        delay = ordered[min(index, len(ordered) - 1)]
+        return min(max(delay, HEDGE_CONFIG["min_delay"]), HEDGE_CONFIG["max_delay"])
+
+    def on_read(self):
+        """Credit the hedge budget for one read request"""
+        self.reads += 1
+        self.tokens = min(
+            self.tokens + HEDGE_CONFIG["max_hedge_ratio"],
+            float(HEDGE_CONFIG["hedge_burst"])
+        )
+
+    def try_acquire_hedge(self) -> bool:
+        """Spend one hedge token if the budget allows it"""
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        self.hedges += 1
+        return True
+
+    def hedge_rate(self) -> float:
+        """Fraction of reads that were hedged"""
+        return self.hedges / self.reads if self.reads else 0.0
@@ -0,0 +1,430 @@
+"""
+Ghost Protocol - Load Test Harness
+Measures RPCProxy throughput and added latency against local stub RPCs
+
+Starts local stub JSON-RPC servers with configurable latency/error
+profiles in place of the public endpoints (and a stub private relay),
+runs the proxy in-process on a free port, drives it with a mix of reads,
+batches and transactions at a target rate, and reports:
+  - throughput and error counts
+  - latency percentiles, and latency added versus calling the stubs
+    directly with the same per-stub mix of reads the proxy sent upstream
+  - storm fidelity: decoys observed upstream around each real transaction
+
+Everything runs offline; no public endpoint is contacted.
+
+Usage:
+    python loadtest.py --rate 50 --tx-rate 0.2 --duration 15 --profile mixed
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import secrets
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+import numpy as np
+from aiohttp import web
+
+import config
+from config import Network, DEFAULT_NETWORK, MIMICRY_CONFIG
+
+
+@dataclass
+class StubProfile:
+    """Latency and failure behaviour of one stub JSON-RPC server"""
+    name: str
+    latency_ms: float = 20.0          # mean service time
+    jitter_ms: float = 5.0            # gaussian spread
+    tail_prob: float = 0.0            # chance of a slow outlier
+    tail_factor: float = 10.0         # outlier latency multiplier
+    http_error_rate: float = 0.0      # chance of HTTP 500
+    rpc_error_rate: float = 0.0       # chance of a JSON-RPC error body
+
+
+PROFILES = {
+    "healthy": [
+        StubProfile("fast-a", latency_ms=20),
+        StubProfile("fast-b", latency_ms=25),
+        StubProfile("fast-c", latency_ms=30),
+    ],
+    "mixed": [
+        StubProfile("fast", latency_ms=20),
+        StubProfile("slow-tail", latency_ms=120, jitter_ms=40, tail_prob=0.05, tail_factor=15),
+        StubProfile("flaky", latency_ms=50, http_error_rate=0.1, rpc_error_rate=0.02),
+    ],
+    "degraded": [
+        StubProfile("slow", latency_ms=300, jitter_ms=100, tail_prob=0.1),
+        StubProfile("flaky", latency_ms=80, http_error_rate=0.3),
+        StubProfile("dead", latency_ms=10, http_error_rate=1.0),
+    ],
+}
+
+READ_MIX = ["eth_blockNumber", "eth_getBalance", "eth_chainId", "eth_getTransactionCount"]
+
+
+@dataclass
+class StubServer:
+    """A running stub JSON-RPC server and the calls it received"""
+    profile: StubProfile
+    url: str = ""
+    runner: Optional[web.AppRunner] = None
+    log: List[Tuple[float, str]] = field(default_factory=list)  # (monotonic time, method)
+
+
+def _stub_head() -> int:
+    """Block number of the stub chain: one block every 12 seconds"""
+    return 5_000_000 + int(time.time() / 12)
+
+
+def _stub_block_hash(number: int) -> str:
+    return "0x" + hashlib.sha256(number.to_bytes(8, "big")).hexdigest()
+
+
+def _stub_result(method: str, params=None):
+    """Plausible result for a stubbed RPC method"""
+    if method == "eth_blockNumber":
+        return hex(_stub_head())
+    if method == "eth_getBlockByNumber":
+        tag = params[0] if params else "latest"
+        number = int(tag, 16) if isinstance(tag, str) and tag.startswith("0x") else _stub_head()
+        return {"number": hex(number), "hash": _stub_block_hash(number),
+                "parentHash": _stub_block_hash(number - 1),
+                "timestamp": hex(number * 12), "transactions": []}
+    if method == "eth_chainId":
+        return "0xaa36a7"
+    if method == "eth_sendRawTransaction":
+        return f"0x{secrets.token_hex(32)}"
+    if method == "eth_call":
+        return "0x" + "00" * 32
+    return "0x0"
+
+
+async def start_stub(profile: StubProfile) -> StubServer:
+    """Start one stub server on a free local port"""
+    stub = StubServer(profile=profile)
+
+    async def handle(request: web.Request) -> web.Response:
+        body = await request.json()
+        calls = body if isinstance(body, list) else [body]
+        now = time.monotonic()
+        for call in calls:
+            stub.log.append((now, call.get("method", "")))
+
+        delay = max(0.0, random.gauss(profile.latency_ms, profile.jitter_ms)) / 1000
+        if random.random() < profile.tail_prob:
+            delay *= profile.tail_factor
+        await asyncio.sleep(delay)
+
+        if random.random() < profile.http_error_rate:
+            return web.Response(status=500, text="stub failure")
+
+        replies = []
+        for call in calls:
+            if random.random() < profile.rpc_error_rate:
+                replies.append({"jsonrpc": "2.0", "id": call.get("id"),
+                                "error": {"code": -32000, "message": "stub error"}})
+            else:
+                replies.append({"jsonrpc": "2.0", "id": call.get("id"),
+                                "result": _stub_result(call.get("method", ""), call.get("params"))})
+        return web.json_response(replies if isinstance(body, list) else replies[0])
+
+    app = web.Application()
+    app.router.add_post("/", handle)
+    stub.runner = web.AppRunner(app, access_log=None)
+    await stub.runner.setup()
+    site = web.TCPSite(stub.runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = stub.runner.addresses[0][:2]
+    stub.url = f"http://{host}:{port}"
+    return stub
+
+
+def _read_request(request_id: int) -> Dict:
+    method = random.choice(READ_MIX)
+    params = [] if method in ("eth_blockNumber", "eth_chainId") else [f"0x{secrets.token_hex(20)}", "latest"]
+    return {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+
+
+def _tx_request(request_id: int) -> Dict:
+    return {"jsonrpc": "2.0", "id": request_id, "method": "eth_sendRawTransaction",
+            "params": [f"0x{secrets.token_hex(110)}"]}
+
+
+class LoadGenerator:
+    """
+    Open-loop load generator: requests are issued on a Poisson schedule
+    regardless of how fast earlier ones complete
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, targets: List[str]):
+        self.session = session
+        self.targets = targets
+        self.latencies: Dict[str, List[float]] = {"read": [], "batch": [], "tx": []}
+        self.read_latencies: Dict[str, List[float]] = {target: [] for target in targets}
+        self.errors: Dict[str, int] = {"read": 0, "batch": 0, "tx": 0}
+        self.rejected_tx = 0
+        self.completed = 0
+        self._ids = 0
+        self._tasks = set()
+
+    async def _send(self, kind: str, payload):
+        target = random.choice(self.targets)
+        started = time.monotonic()
+        try:
+            async with self.session.post(target, json=payload) as response:
+                reply = await response.json(content_type=None)
+            replies = reply if isinstance(reply, list) else [reply]
+            if any("error" in r for r in replies):
+                self.errors[kind] += 1
+                if kind == "tx" and replies[0]["error"].get("code") == -32005:
+                    self.rejected_tx += 1
+        except Exception:
+            self.errors[kind] += 1
+        latency = time.monotonic() - started
+        self.latencies[kind].append(latency)
+        if kind != "tx":
+            self.read_latencies[target].append(latency)
+        self.completed += 1
+
+    def _next_id(self) -> int:
+        self._ids += 1
+        return self._ids
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def run(self, duration: float, rate: float, tx_rate: float, batch_ratio: float):
+        """Issue reads/batches at 'rate' req/s and transactions at 'tx_rate' tx/s"""
+        total_rate = rate + tx_rate
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            await asyncio.sleep(random.expovariate(total_rate))
+            if random.random() < tx_rate / total_rate:
+                self._spawn(self._send("tx", _tx_request(self._next_id())))
+            elif random.random() < batch_ratio:
+                batch = [_read_request(self._next_id()) for _ in range(random.randint(2, 5))]
+                self._spawn(self._send("batch", batch))
+            else:
+                self._spawn(self._send("read", _read_request(self._next_id())))
+
+        if self._tasks:
+            await asyncio.wait(set(self._tasks))
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p90/p99 in milliseconds"""
+    if not values:
+        return {"p50": 0.0, "p90": 0.0, "p99": 0.0}
+    p50, p90, p99 = np.percentile(np.asarray(values) * 1000, [50, 90, 99])
+    return {"p50": float(p50), "p90": float(p90), "p99": float(p99)}
+
+
+def mixed_percentiles(by_target: Dict[str, List[float]], shares: Dict[str, float]) -> Dict[str, float]:
+    """p50/p90/p99 in milliseconds of per-target latencies weighted to 'shares' of the traffic"""
+    values, weights = [], []
+    for target, latencies in by_target.items():
+        if latencies and shares.get(target):
+            values.extend(latencies)
+            weights.extend([shares[target] / len(latencies)] * len(latencies))
+    if not values:
+        return percentiles([])
+    order = np.argsort(values)
+    values = np.asarray(values)[order] * 1000
+    cumulative = np.cumsum(np.asarray(weights)[order])
+    cumulative /= cumulative[-1]
+    index = np.minimum(np.searchsorted(cumulative, [0.5, 0.9, 0.99]), len(values) - 1)
+    p50, p90, p99 = values[index]
+    return {"p50": float(p50), "p90": float(p90), "p99": float(p99)}
+
+
+def upstream_read_shares(public_stubs: List[StubServer]) -> Dict[str, float]:
+    """Share of the proxied phase's upstream reads that each stub served"""
+    counts = {stub.url: sum(1 for _, method in stub.log if method in READ_MIX) for stub in public_stubs}
+    total = sum(counts.values())
+    return {url: count / total if total else 0.0 for url, count in counts.items()}
+
+
+def storm_fidelity(public_stubs: List[StubServer], private_stub: StubServer) -> Dict:
+    """
+    Decoys observed at the stubs around each real transaction
+
+    Reports the overall noise ratio, the median number of decoys within
+    +/-1s of each real transaction, and the share of real transactions
+    with decoys both before and after them.
+    """
+    decoy_times = np.sort(np.array([
+        t for stub in public_stubs for t, method in stub.log if method == "eth_call"
+    ]))
+    real_times = [
+        t for stub in public_stubs + [private_stub]
+        for t, method in stub.log if method == "eth_sendRawTransaction"
+    ]
+    if not real_times:
+        return {"real_tx_observed": 0, "decoys_observed": int(len(decoy_times))}
+
+    surrounding, bracketed = [], 0
+    for t in real_times:
+        lo, hi = np.searchsorted(decoy_times, [t - 1.0, t + 1.0])
+        surrounding.append(int(hi - lo))
+        before = np.searchsorted(decoy_times, t)
+        if 0 < before < len(decoy_times):
+            bracketed += 1
+
+    return {
+        "real_tx_observed": len(real_times),
+        "decoys_observed": int(len(decoy_times)),
+        "noise_ratio": len(decoy_times) / len(real_times),
+        "median_decoys_within_1s": float(np.median(surrounding)),
+        "bracketed_fraction": bracketed / len(real_times),
+        "meets_noise_minimum": len(decoy_times) / len(real_times) >= MIMICRY_CONFIG["noise_ratio_minimum"],
+    }
+
+
+async def run_load_test(args) -> Dict:
+    """Run the baseline and proxied phases and return the report"""
+    network = Network(args.network)
+    public_stubs = [await start_stub(p) for p in PROFILES[args.profile]]
+    private_stub = await start_stub(StubProfile("private-relay", latency_ms=40))
+
+    # Point the proxy at the stubs before it reads the endpoint list
+    config.RPC_ENDPOINTS[network] = [stub.url for stub in public_stubs]
+    config.WS_RPC_ENDPOINTS[network] = []
+    MIMICRY_CONFIG["contract_cache_ttl"] = float("inf")
+
+    from private_relays import RelayRacer
+    from rpc_proxy import RPCProxy
+
+    proxy = RPCProxy(network=network, listen_port=0)
+    proxy.relays = RelayRacer([private_stub.url], proxy.forward_request)
+    # Seed the contract cache so storm generation never touches the network
+    market = proxy.mimicry.market
+    market.contract_cache = market._get_fallback_contracts()
+    market.last_refresh = time.time()
+
+    proxy_runner = web.AppRunner(proxy.build_app(), access_log=None)
+    await proxy_runner.setup()
+    await web.TCPSite(proxy_runner, "127.0.0.1", 0).start()
+    host, port = proxy_runner.addresses[0][:2]
+    proxy_url = f"http://{host}:{port}"
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        print(f"\n[LoadTest] Baseline: reads direct to stubs for {args.duration}s at {args.rate} req/s")
+        baseline = LoadGenerator(session, [stub.url for stub in public_stubs])
+        await baseline.run(args.duration, args.rate, 0.0, args.batch_ratio)
+
+        for stub in public_stubs + [private_stub]:
+            stub.log.clear()
+
+        print(f"[LoadTest] Proxied: {args.rate} req/s + {args.tx_rate} tx/s for {args.duration}s")
+        started = time.monotonic()
+        proxied = LoadGenerator(session, [proxy_url])
+        await proxied.run(args.duration, args.rate, args.tx_rate, args.batch_ratio)
+        elapsed = time.monotonic() - started
+
+        # Let in-flight storms finish so their decoys are counted
+        await asyncio.sleep(args.drain)
+
+    await proxy_runner.cleanup()
+    for stub in public_stubs + [private_stub]:
+        await stub.runner.cleanup()
+
+    # Direct latencies weighted to where the proxy actually sent reads, so a
+    # proxy that avoids slow stubs is compared with the same stubs called directly
+    shares = upstream_read_shares(public_stubs)
+    reads = proxied.latencies["read"] + proxied.latencies["batch"]
+    proxy_pct = percentiles(reads)
+    base_pct = mixed_percentiles(baseline.read_latencies, shares)
+
+    return {
+        "profile": args.profile,
+        "duration": args.duration,
+        "target_rate": args.rate,
+        "target_tx_rate": args.tx_rate,
+        "requests_completed": proxied.completed,
+        "throughput_rps": proxied.completed / elapsed if elapsed > 0 else 0.0,
+        "errors": proxied.errors,
+        "rejected_tx": proxied.rejected_tx,
+        "read_latency_ms": proxy_pct,
+        "baseline_read_latency_ms": base_pct,
+        "added_latency_ms": {k: proxy_pct[k] - base_pct[k] for k in proxy_pct},
+        "stubs": {
+            stub.profile.name: {
+                "upstream_read_share": shares[stub.url],
+                "direct_read_latency_ms": percentiles(baseline.read_latencies[stub.url]),
+            }
+            for stub in public_stubs
+        },
+        "tx_latency_ms": percentiles(proxied.latencies["tx"]),
+        "storm_fidelity": storm_fidelity(public_stubs, private_stub),
+        "proxy_stats": dict(proxy.stats),
+    }
+
+
+def print_report(report: Dict):
+    """Print a load test report"""
+    print("\n" + "=" * 70)
+    print("GHOST PROTOCOL - LOAD TEST RESULTS")
+    print("=" * 70)
+    print(f"Profile: {report['profile']} | Duration: {report['duration']}s")
+    print(f"Target: {report['target_rate']} req/s + {report['target_tx_rate']} tx/s")
+
+    print("\n[1] THROUGHPUT")
+    print(f"  Completed: {report['requests_completed']} ({report['throughput_rps']:.1f} req/s)")
+    print(f"  Errors: {report['errors']} | Rejected TX: {report['rejected_tx']}")
+
+    print("\n[2] LATENCY (ms)")
+    for label, key in [("Proxied reads", "read_latency_ms"),
+                       ("Direct reads", "baseline_read_latency_ms"),
+                       ("Added by proxy", "added_latency_ms"),
+                       ("Transactions", "tx_latency_ms")]:
+        pct = report[key]
+        print(f"  {label:<15} p50 {pct['p50']:8.1f} | p90 {pct['p90']:8.1f} | p99 {pct['p99']:8.1f}")
+    print("  Direct reads are weighted to the proxy's upstream mix:")
+    for name, stub in report["stubs"].items():
+        pct = stub["direct_read_latency_ms"]
+        print(f"    {name:<13} {stub['upstream_read_share']:5.0%} | p50 {pct['p50']:8.1f} | p99 {pct['p99']:8.1f}")
+
+    fidelity = report["storm_fidelity"]
+    print("\n[3] STORM FIDELITY")
+    print(f"  Real TX observed: {fidelity['real_tx_observed']}")
+    print(f"  Decoys observed: {fidelity['decoys_observed']}")
+    if fidelity["real_tx_observed"]:
+        print(f"  Noise Ratio: {fidelity['noise_ratio']:.1f}:1 "
+              f"({'✓' if fidelity['meets_noise_minimum'] else '❌'} min {MIMICRY_CONFIG['noise_ratio_minimum']}:1)")
+        print(f"  Median decoys within ±1s: {fidelity['median_decoys_within_1s']:.0f}")
+        print(f"  Bracketed by decoys: {fidelity['bracketed_fraction']:.0%}")
+    print("=" * 70 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ghost Protocol RPC proxy load test")
+    parser.add_argument("--rate", type=float, default=50.0, help="read requests per second")
+    parser.add_argument("--tx-rate", type=float, default=0.2, help="transactions per second")
+    parser.add_argument("--batch-ratio", type=float, default=0.1, help="share of reads sent as batches")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per phase")
+    parser.add_argument("--drain", type=float, default=MIMICRY_CONFIG["storm_duration_max"],
+                        help="seconds to wait for storms to finish")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="mixed")
+    parser.add_argument("--network", default=DEFAULT_NETWORK.value)
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[LoadTest] Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Ghost Protocol - eth_getLogs Range Splitting
+Splits wide eth_getLogs block ranges into chunks queried in parallel
+
+Public RPCs cap the block range (or result count) of eth_getLogs, so wide
+queries time out or fail. The splitter:
+  - cuts the range into chunks aligned to LOGS_CONFIG["chunk_size"]
+  - queries chunks concurrently, spread over several healthy endpoints,
+    retrying a failed chunk elsewhere and halving it if the provider says
+    the range or result set is too large
+  - merges the logs back into (blockNumber, logIndex) order
+  - caches chunks that are deeper than 'finality_depth' below the head,
+    since their logs can no longer change
+  - refuses queries needing more than 'max_chunks' upstream calls, so one
+    client request cannot multiply the load on the public endpoints
+
+Ranges bounded by "safe" or "finalized" (or "pending") are forwarded
+unsplit: only the upstream knows which block those tags stand for.
+"""
+
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import LOGS_CONFIG
+from endpoint_manager import EndpointManager
+import metrics
+
+# Provider error messages meaning "ask for a smaller range"
+RANGE_ERROR_MARKERS = (
+    "block range", "range too large", "range is too large", "more than",
+    "too many", "limit exceeded", "response size", "query timeout",
+)
+
+
+def parse_block(tag, head: int) -> Optional[int]:
+    """Block number for a filter bound, or None if it cannot be pinned down"""
+    if tag is None or tag == "latest":
+        return head
+    if tag == "earliest":
+        return 0
+    if isinstance(tag, int):
+        return tag
+    if isinstance(tag, str) and tag.startswith("0x"):
+        try:
+            return int(tag, 16)
+        except ValueError:
+            return None
+    return None  # "safe", "finalized", "pending" or garbage: leave it to the upstream
+
+
+def _log_order(log: Dict) -> Tuple[int, int]:
+    try:
+        return int(log.get("blockNumber", "0x0"), 16), int(log.get("logIndex", "0x0"), 16)
+    except (TypeError, ValueError):
+        return 0, 0
+
+
+class LogRangeSplitter:
+    """
+    Parallel, cached eth_getLogs over wide block ranges
+    """
+
+    def __init__(self,
+                 endpoints: EndpointManager,
+                 post: Callable[[str, Dict], Awaitable[Dict]],
+                 block_number: Callable[[], Awaitable[int]],
+                 shared=None):
+        """
+        'post(endpoint, request)' returns the decoded reply and raises on
+        transport failure; 'block_number()' returns the current head.
+        'shared' (a workers.HubClient) shares finalized chunks across workers.
+        """
+        self.endpoints = endpoints
+        self.post = post
+        self.block_number = block_number
+        self.shared = shared
+        self.cache: "OrderedDict[Tuple[str, int, int], List[Dict]]" = OrderedDict()
+        self.stats = {"split_queries": 0, "chunks_fetched": 0, "chunks_cached": 0, "chunks_halved": 0,
+                      "chunks_shared": 0, "queries_refused": 0}
+
+    @staticmethod
+    def get_filter(rpc_request: Dict) -> Optional[Dict]:
+        params = rpc_request.get("params") if isinstance(rpc_request, dict) else None
+        if not isinstance(params, list) or not params or not isinstance(params[0], dict):
+            return None
+        return params[0]
+
+    def may_split(self, rpc_request: Dict) -> bool:
+        """
+        Cheap check (no head lookup) whether a request is a split candidate
+
+        Numeric ranges must already be wider than one chunk; symbolic bounds
+        ("latest", missing) are resolved later in fetch().
+        """
+        if not LOGS_CONFIG["enabled"] or rpc_request.get("method") != "eth_getLogs":
+            return False
+        log_filter = self.get_filter(rpc_request)
+        if log_filter is None or "blockHash" in log_filter:
+            return False
+        start = parse_block(log_filter.get("fromBlock"), -1)
+        end = parse_block(log_filter.get("toBlock"), -1)
+        if start is None or end is None:
+            return False
+        if start >= 0 and end >= 0:
+            return end - start + 1 > LOGS_CONFIG["chunk_size"]
+        return True
+
+    def may_split_body(self, body: bytes) -> bool:
+        """may_split() for a raw single-request body"""
+        try:
+            rpc_request = json.loads(body)
+        except ValueError:
+            return False
+        return isinstance(rpc_request, dict) and self.may_split(rpc_request)
+
+    def _chunks(self, start: int, end: int) -> List[Tuple[int, int]]:
+        size = LOGS_CONFIG["chunk_size"]
+        chunks = []
+        low = start
+        while low <= end:
+            high = min(end, (low // size + 1) * size - 1)   # align to chunk boundaries
+            chunks.append((low, high))
+            low = high + 1
+        return chunks
+
+    def _cache_get(self, key) -> Optional[List[Dict]]:
+        logs = self.cache.get(key)
+        if logs is not None:
+            self.cache.move_to_end(key)
+        return logs
+
+    def _cache_put(self, key, logs: List[Dict]):
+        self.cache[key] = logs
+        self.cache.move_to_end(key)
+        while len(self.cache) > LOGS_CONFIG["cache_max_chunks"]:
+            self.cache.popitem(last=False)
+
+    async def _fetch_chunk(self, log_filter: Dict, low: int, high: int,
+                           endpoint: str, semaphore: asyncio.Semaphore) -> List[Dict]:
+        """Fetch one chunk, retrying on other endpoints and halving oversize ranges"""
+        chunk_filter = dict(log_filter, fromBlock=hex(low), toBlock=hex(high))
+        request = {"jsonrpc": "2.0", "id": 1, "method": "eth_getLogs", "params": [chunk_filter]}
+        tried = set()
+        last_error = None
+
+        for _ in range(LOGS_CONFIG["chunk_attempts"]):
+            tried.add(endpoint)
+            try:
+                async with semaphore:
+                    reply = await self.post(endpoint, request)
+            except Exception as e:
+                reply = {"error": {"message": str(e)}}
+
+            if isinstance(reply.get("result"), list):
+                self.stats["chunks_fetched"] += 1
+                return reply["result"]
+
+            last_error = reply.get("error", {"message": "no result"})
+            message = str(last_error.get("message", "")).lower()
+            if high > low and any(marker in message for marker in RANGE_ERROR_MARKERS):
+                self.stats["chunks_halved"] += 1
+                middle = (low + high) // 2
+                halves = await asyncio.gather(
+                    self._fetch_chunk(log_filter, low, middle, endpoint, semaphore),
+                    self._fetch_chunk(log_filter, middle + 1, high, endpoint, semaphore),
+                )
+                return halves[0] + halves[1]
+
+            # Transport or provider failure: try the next healthy endpoint
+            endpoint = next(
+                (url for url in self.endpoints.select_read_endpoints(len(self.endpoints.health))
+                 if url not in tried),
+                endpoint
+            )
+
+        raise RuntimeError(f"eth_getLogs chunk {low}-{high} failed: {last_error}")
+
+    async def fetch(self, rpc_request: Dict) -> Optional[Dict]:
+        """
+        Answer a wide eth_getLogs by chunks
+
+        Returns None when the resolved range fits in one chunk, so the
+        caller forwards the request unchanged.
+        """
+        log_filter = self.get_filter(rpc_request)
+        head = await self.block_number()
+        start = parse_block(log_filter.get("fromBlock"), head)
+        end = min(parse_block(log_filter.get("toBlock"), head), head)
+        if end - start + 1 <= LOGS_CONFIG["chunk_size"]:
+            return None
+
+        self.stats["split_queries"] += 1
+        identity = json.dumps(
+            {k: v for k, v in log_filter.items() if k not in ("fromBlock", "toBlock")},
+            sort_keys=True, separators=(",", ":")
+        )
+        finalized = head - LOGS_CONFIG["finality_depth"]
+        chunks = self._chunks(start, end)
+        pool = self.endpoints.select_read_endpoints(LOGS_CONFIG["endpoint_fanout"])
+        semaphore = asyncio.Semaphore(LOGS_CONFIG["max_concurrency"])
+
+        results: List[Optional[List[Dict]]] = [None] * len(chunks)
+        missing = []
+        for i, (low, high) in enumerate(chunks):
+            cached = self._cache_get((identity, low, high)) if high <= finalized else None
+            metrics.record_cache("logs", hit=cached is not None)
+            if cached is not None:
+                self.stats["chunks_cached"] += 1
+                results[i] = cached
+            else:
+                missing.append(i)
+
+        # Finalized chunks another worker already fetched
+        if self.shared is not None:
+            wanted = {f"logs:{identity}:{chunks[i][0]}:{chunks[i][1]}": i
+                      for i in missing if chunks[i][1] <= finalized}
+            if wanted:
+                for key, (logs, _) in (await self.shared.cache_get(list(wanted))).items():
+                    i = wanted[key]
+                    results[i] = logs
+                    self._cache_put((identity,) + chunks[i], logs)
+                    self.stats["chunks_shared"] += 1
+                missing = [i for i in missing if results[i] is None]
+
+        if len(missing) > LOGS_CONFIG["max_chunks"]:
+            self.stats["queries_refused"] += 1
+            return {
+                "jsonrpc": "2.0",
+                "id": rpc_request.get("id", 1),
+                "error": {"code": -32005,
+                          "message": f"eth_getLogs range {start}-{end} needs {len(missing)} queries "
+                                     f"(limit {LOGS_CONFIG['max_chunks']}); narrow fromBlock/toBlock"}
+            }
+
+        pending = []
+        for i in missing:
+            low, high = chunks[i]
+            endpoint = pool[len(pending) % len(pool)]
+            pending.append((i, asyncio.ensure_future(
+                self._fetch_chunk(log_filter, low, high, endpoint, semaphore)
+            )))
+
+        try:
+            await asyncio.gather(*(task for _, task in pending))
+        except Exception as e:
+            for _, task in pending:
+                task.cancel()
+            return {
+                "jsonrpc": "2.0",
+                "id": rpc_request.get("id", 1),
+                "error": {"code": -32603, "message": f"Proxy error: {e}"}
+            }
+
+        fresh = {}
+        for i, task in pending:
+            results[i] = task.result()
+            low, high = chunks[i]
+            if high <= finalized:
+                self._cache_put((identity, low, high), results[i])
+                fresh[f"logs:{identity}:{low}:{high}"] = results[i]
+        if fresh and self.shared is not None:
+            self.shared.cache_put(fresh)
+
+        logs = [log for chunk_logs in results for log in chunk_logs]
+        logs.sort(key=_log_order)
+        print(f"[Logs] Blocks {start}-{end}: {len(chunks)} chunks "
+              f"({len(chunks) - len(pending)} cached), {len(logs)} logs")
+        return {"jsonrpc": "2.0", "id": rpc_request.get("id", 1), "result": logs}
+
+    def snapshot(self) -> Dict:
+        return dict(self.stats, cached_chunks=len(self.cache))
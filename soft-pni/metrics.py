@@ -0,0 +1,186 @@
+"""
+Ghost Protocol - Metrics
+Minimal Prometheus-style counters, gauges and histograms
+
+The proxy runs on a single asyncio event loop, so metric updates are plain
+integer/float additions with no locks. Histograms use fixed buckets and a
+bisect, keeping observe() cheap enough for the request hot path. Metrics
+are module-level so any component can record without extra plumbing.
+"""
+
+import bisect
+from typing import Dict, List, Sequence, Tuple
+
+# Latency buckets in seconds (public RPC latencies span ~10ms to 30s)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base class: a named metric family with optional labels"""
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value:g}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down (e.g. in-flight requests)"""
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) - amount
+
+    def set(self, *labels: str, value: float):
+        self.values[labels] = value
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram per label set"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for labels, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.label_names, labels, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.label_names, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            label_str = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_str} {total:g}")
+            lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render_all(extra_lines: Sequence[str] = ()) -> str:
+    """Render every registered metric in Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------------------------------------------------
+# Ghost Protocol metrics
+# ----------------------------------------------------------------------
+
+UPSTREAM_LATENCY = Histogram(
+    "ghost_upstream_request_seconds",
+    "Latency of upstream RPC calls by endpoint host and outcome",
+    labels=("endpoint", "outcome"),
+)
+REQUEST_LATENCY = Histogram(
+    "ghost_rpc_request_seconds",
+    "Proxy latency for wallet RPC requests by method",
+    labels=("method", "transport"),
+)
+STORM_DURATION = Histogram(
+    "ghost_storm_duration_seconds",
+    "Wall-clock duration of decoy storms",
+    buckets=(0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0),
+)
+STORM_SIZE = Histogram(
+    "ghost_storm_decoys",
+    "Decoys sent per storm",
+    buckets=(10, 25, 50, 75, 100, 150, 200, 300, 500),
+)
+SCHEDULE_JITTER = Histogram(
+    "ghost_storm_schedule_jitter_seconds",
+    "Delay between an event's scheduled storm offset and its dispatch",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+INFLIGHT_REQUESTS = Gauge(
+    "ghost_inflight_requests",
+    "Wallet requests currently being handled",
+    labels=("transport",),
+)
+UPSTREAM_INFLIGHT = Gauge(
+    "ghost_upstream_inflight_requests",
+    "Upstream RPC calls currently awaiting a response",
+)
+CACHE_REQUESTS = Counter(
+    "ghost_cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss)",
+    labels=("cache", "result"),
+)
+RELAY_SUBMISSIONS = Counter(
+    "ghost_relay_submissions_total",
+    "Real transaction submissions by private relay and outcome (win/ack/duplicate/error)",
+    labels=("relay", "outcome"),
+)
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup; hit ratio = hit / (hit + miss)"""
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def cache_hit_ratio_lines() -> List[str]:
+    """Derived per-cache hit ratio gauge lines"""
+    caches = {labels[0] for labels in CACHE_REQUESTS.values}
+    if not caches:
+        return []
+    lines = [
+        "# HELP ghost_cache_hit_ratio Cache hits / lookups since start",
+        "# TYPE ghost_cache_hit_ratio gauge",
+    ]
+    for cache in sorted(caches):
+        hits = CACHE_REQUESTS.get(cache, "hit")
+        total = hits + CACHE_REQUESTS.get(cache, "miss")
+        lines.append(f'ghost_cache_hit_ratio{{cache="{cache}"}} {hits / total if total else 0.0:g}')
+    return lines
@@ -24,6 +24,7 @@ from config import (
     get_etherscan_api, get_known_contracts, ETHERSCAN_API_KEY,
     MIMICRY_CONFIG, CATEGORY_WEIGHTS, DEFI_LLAMA_API
 )
+import metrics
 
 
 class ContractCategory(Enum):
@@ -78,7 +79,9 @@ class MarketIntelligence:
         - Known protocol contracts on testnet
         - Active contracts from recent blocks
         """
-        if time.time() - self.last_refresh > self.cache_ttl:
+        expired = time.time() - self.last_refresh > self.cache_ttl
+        metrics.record_cache("contracts", hit=not expired)
+        if expired:
             self._refresh_cache()
         
         return self.contract_cache
@@ -256,8 +259,11 @@ class ContractSelector:
         selected = []
         
         for category, weight in self.CATEGORY_WEIGHTS.items():
-            # Filter contracts by category
-            category_contracts = [c for c in available if c.category == category]
+            # Filter contracts by category (weights are keyed by enum value, or name for "erc20")
+            category_contracts = [
+                c for c in available
+                if category in (c.category.value, c.category.name.lower())
+            ]
             
             if not category_contracts:
                 continue
@@ -384,9 +390,10 @@ class DecoyScheduler:
     Determines WHEN to send decoys using true randomization
     """
     
-    def __init__(self, network: Network = DEFAULT_NETWORK):
+    def __init__(self, network: Network = DEFAULT_NETWORK, endpoint_manager=None):
         self.network = network
         self.public_rpcs = get_all_rpc_endpoints(network)
+        self.endpoint_manager = endpoint_manager
     
     def schedule_heartbeat(self) -> Tuple[int, float]:
         """
@@ -438,9 +445,15 @@ class DecoyScheduler:
     def assign_rpc_endpoints(self, decoys: List[DecoyCall]) -> List[DecoyCall]:
         """
         Randomly distribute decoys across multiple public RPC endpoints
+
+        With an endpoint manager attached, dead endpoints are skipped and
+        faster ones are favoured within the configured spread.
         """
         for decoy in decoys:
-            decoy.rpc_endpoint = random.choice(self.public_rpcs)
+            if self.endpoint_manager:
+                decoy.rpc_endpoint = self.endpoint_manager.choose_decoy_endpoint()
+            else:
+                decoy.rpc_endpoint = random.choice(self.public_rpcs)
         return decoys
 
 
@@ -449,12 +462,12 @@ class MimicryEngine:
     Main orchestrator for the decoy generation system
     """
     
-    def __init__(self, network: Network = DEFAULT_NETWORK):
+    def __init__(self, network: Network = DEFAULT_NETWORK, endpoint_manager=None):
         self.network = network
         self.market = MarketIntelligence(network)
         self.selector = ContractSelector(self.market, network)
         self.pattern_gen = InteractionPatternGenerator()
-        self.scheduler = DecoyScheduler(network)
+        self.scheduler = DecoyScheduler(network, endpoint_manager)
         print(f"[MimicryEngine] Initialized for network: {network.value}")
     
     def generate_decoy_storm(self, intensity: int = 80) -> List[DecoyCall]:
@@ -0,0 +1,231 @@
+"""
+Ghost Protocol - Monte Carlo Validation
+Many independently seeded validator simulations across a process pool
+
+One validator run is a single noisy sample. This harness runs N virtual-time
+simulations (GhostProtocolValidator.run_simulation) with distinct seeds in a
+process pool and aggregates, with confidence intervals:
+  - timing correlation
+  - endpoint clustering entropy
+  - adversary classifier balanced accuracy, AUC and false positive / negative rates
+  - the smallest anonymity set around a real transaction
+  - the overall pass rate
+
+Runs share nothing, so throughput scales with the number of worker processes.
+Simulations use the built-in fallback contracts unless --live is given.
+
+Usage:
+    python monte_carlo.py --runs 200 --duration 86400 --workers 8 --seed 1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Network, DEFAULT_NETWORK, VALIDATION_CONFIG
+
+# Per-run metrics aggregated across runs
+METRICS = (
+    "timing_correlation",
+    "distribution_entropy",
+    "classifier_accuracy",
+    "classifier_auc",
+    "false_positive_rate",
+    "false_negative_rate",
+    "anonymity_set_min",
+)
+
+
+def run_metrics(report: Dict) -> Dict:
+    """Flat per-run metrics from a run_simulation() report"""
+    observer = report["observer"]
+    fpr = observer.get("false_positive_rate")
+    fnr = observer.get("false_negative_rate")
+    accuracy = observer.get("balanced_accuracy")
+    if accuracy is None and fpr is not None and fnr is not None:
+        accuracy = 1.0 - (fpr + fnr) / 2   # balanced accuracy
+    anonymity_windows = report["anonymity"].get("windows", {})
+    checked = anonymity_windows.get(f"{VALIDATION_CONFIG['anonymity_check_window']:g}s")
+    return {
+        "timing_correlation": report["timing"]["timing_correlation"],
+        "distribution_entropy": report["ip_clustering"].get("distribution_entropy"),
+        "classifier_accuracy": accuracy,
+        "classifier_auc": observer.get("auc"),
+        "false_positive_rate": fpr,
+        "false_negative_rate": fnr,
+        # Fewest look-alike decoys around any real transaction in the checked window
+        "anonymity_set_min": checked["neighbourhood"]["min"] if checked else None,
+        "passed": report["passed"],
+        "decoys": report["simulation"]["decoys"],
+        "real_transactions": report["simulation"]["real_transactions"],
+        "events": report["simulation"]["events"],
+    }
+
+
+def run_one(task: Tuple[int, float, int, str, bool]) -> Dict:
+    """Run one seeded simulation in a worker process and return its metrics"""
+    seed, duration, num_real_tx, network_value, offline = task
+    from validator import GhostProtocolValidator
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        validator = GhostProtocolValidator(Network(network_value))
+        report = validator.run_simulation(
+            duration_seconds=duration, num_real_tx=num_real_tx,
+            seed=seed, offline=offline, verbose=False
+        )
+    return dict(run_metrics(report), seed=seed, wall_seconds=time.perf_counter() - started)
+
+
+def bootstrap_ci(values: np.ndarray, confidence: float, resamples: int,
+                 rng: np.random.Generator) -> Tuple[float, float]:
+    """Percentile bootstrap confidence interval of the mean"""
+    if len(values) < 2:
+        return float(values[0]), float(values[0])
+    idx = rng.integers(0, len(values), size=(resamples, len(values)))
+    means = values[idx].mean(axis=1)
+    tail = (1.0 - confidence) / 2 * 100
+    low, high = np.percentile(means, [tail, 100 - tail])
+    return float(low), float(high)
+
+
+def wilson_interval(successes: int, total: int, confidence: float) -> Tuple[float, float]:
+    """Wilson score interval for a proportion"""
+    if total == 0:
+        return 0.0, 0.0
+    # Two-sided normal quantile, e.g. 1.96 for 95%
+    z = math.sqrt(2) * _erfinv(confidence)
+    p = successes / total
+    denom = 1 + z * z / total
+    centre = (p + z * z / (2 * total)) / denom
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denom
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+def _erfinv(y: float) -> float:
+    """Inverse error function (Winitzki approximation refined by two Newton steps)"""
+    a = 0.147
+    ln = math.log(1 - y * y)
+    first = 2 / (math.pi * a) + ln / 2
+    x = math.copysign(math.sqrt(math.sqrt(first * first - ln / a) - first), y)
+    for _ in range(2):
+        x -= (math.erf(x) - y) / (2 / math.sqrt(math.pi) * math.exp(-x * x))
+    return x
+
+
+def aggregate(results: List[Dict], confidence: float, resamples: int, seed: int) -> Dict:
+    """Mean, spread and confidence interval of every metric, plus the pass rate"""
+    rng = np.random.default_rng(seed)
+    summary = {}
+    for metric in METRICS:
+        values = np.array([r[metric] for r in results if r.get(metric) is not None], dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            continue
+        low, high = bootstrap_ci(values, confidence, resamples, rng)
+        summary[metric] = {
+            "n": int(len(values)),
+            "mean": round(float(values.mean()), 6),
+            "std": round(float(values.std(ddof=1)) if len(values) > 1 else 0.0, 6),
+            "ci_low": round(low, 6),
+            "ci_high": round(high, 6),
+            "p5": round(float(np.percentile(values, 5)), 6),
+            "p95": round(float(np.percentile(values, 95)), 6),
+        }
+
+    passed = sum(1 for r in results if r["passed"])
+    low, high = wilson_interval(passed, len(results), confidence)
+    summary["pass_rate"] = {
+        "n": len(results),
+        "mean": round(passed / len(results), 6) if results else 0.0,
+        "ci_low": round(low, 6),
+        "ci_high": round(high, 6),
+    }
+    return summary
+
+
+def run_monte_carlo(runs: int, duration: float, num_real_tx: int = 5,
+                    workers: Optional[int] = None, base_seed: int = 0,
+                    network: Network = DEFAULT_NETWORK, offline: bool = True,
+                    confidence: float = 0.95, resamples: int = 2000) -> Dict:
+    """Run 'runs' seeded simulations across 'workers' processes and aggregate them"""
+    workers = workers or os.cpu_count() or 1
+    tasks = [(base_seed + i, duration, num_real_tx, network.value, offline) for i in range(runs)]
+    # A few tasks per dispatch keeps IPC overhead low while balancing the load
+    chunksize = max(1, runs // (workers * 4))
+
+    started = time.perf_counter()
+    if workers == 1:
+        results = [run_one(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_one, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - started
+
+    busy = sum(r["wall_seconds"] for r in results)
+    return {
+        "runs": runs,
+        "workers": workers,
+        "simulated_seconds_per_run": duration,
+        "real_tx_per_run": num_real_tx,
+        "base_seed": base_seed,
+        "confidence": confidence,
+        "elapsed_seconds": round(elapsed, 3),
+        "runs_per_second": round(runs / elapsed, 3) if elapsed > 0 else None,
+        # 1.0 means every worker was busy simulating for the whole run
+        "parallel_efficiency": round(busy / (elapsed * workers), 3) if elapsed > 0 else None,
+        "metrics": aggregate(results, confidence, resamples, base_seed),
+        "per_run": results,
+    }
+
+
+def print_report(report: Dict):
+    print(f"\n{'='*70}")
+    print("GHOST PROTOCOL - MONTE CARLO VALIDATION")
+    print(f"{'='*70}")
+    print(f"Runs: {report['runs']} x {report['simulated_seconds_per_run']:,.0f}s simulated "
+          f"| Workers: {report['workers']} | Seeds: {report['base_seed']}..{report['base_seed'] + report['runs'] - 1}")
+    print(f"Elapsed: {report['elapsed_seconds']}s ({report['runs_per_second']} runs/s, "
+          f"parallel efficiency {report['parallel_efficiency']})")
+    print(f"\n  {'metric':<24}{'mean':>10}{'std':>10}   {int(report['confidence'] * 100)}% CI")
+    for metric, stats in report["metrics"].items():
+        std = f"{stats['std']:>10.4f}" if "std" in stats else " " * 10
+        print(f"  {metric:<24}{stats['mean']:>10.4f}{std}   [{stats['ci_low']:.4f}, {stats['ci_high']:.4f}]")
+    print(f"{'='*70}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ghost Protocol Monte Carlo validation")
+    parser.add_argument("--runs", type=int, default=100, help="independent simulations")
+    parser.add_argument("--duration", type=float, default=3600, help="simulated seconds per run")
+    parser.add_argument("--real-tx", type=int, default=5, help="real transactions per run")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first run")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--network", default=DEFAULT_NETWORK.value)
+    parser.add_argument("--live", action="store_true", help="fetch live contract data in every run")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = run_monte_carlo(
+        runs=args.runs, duration=args.duration, num_real_tx=args.real_tx,
+        workers=args.workers, base_seed=args.seed, network=Network(args.network),
+        offline=not args.live, confidence=args.confidence
+    )
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[MonteCarlo] Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
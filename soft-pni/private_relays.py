@@ -0,0 +1,132 @@
+"""
+Ghost Protocol - Private Relay Racing
+Submits a real transaction to every configured private relay at once
+
+At the real transaction's storm offset the request goes to all relays in
+parallel. The first relay to acknowledge it answers the wallet; the other
+submissions keep running in the background so the transaction still
+reaches every relay, and their outcomes (ack, duplicate/"already known",
+error) are counted per relay.
+"""
+
+import asyncio
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, List, Tuple
+from urllib.parse import urlparse
+
+from web3 import Web3
+
+import metrics
+
+# Error messages nodes and relays use for a transaction they already have
+KNOWN_TX_MARKERS = (
+    "already known", "known transaction", "alreadyknown",
+    "already imported", "already exists",
+)
+
+
+@dataclass
+class RelayStats:
+    """Submission outcomes for one relay"""
+    wins: int = 0          # first acknowledgement of a race
+    acks: int = 0          # acknowledged, but after another relay
+    duplicates: int = 0    # relay reported the transaction as already known
+    errors: int = 0
+
+
+def is_known_transaction(response: Dict) -> bool:
+    """Whether an error response means the relay already has the transaction"""
+    message = str(response.get("error", {}).get("message", "")).lower()
+    return any(marker in message for marker in KNOWN_TX_MARKERS)
+
+
+class RelayRacer:
+    """
+    Races real transactions across a list of private relays
+    """
+
+    def __init__(self, relays: List[str], forward: Callable[[str, Dict], Awaitable[Dict]]):
+        """'forward(relay, request)' returns a JSON-RPC response and never raises"""
+        self.relays = list(relays)
+        self.forward = forward
+        self.stats: Dict[str, RelayStats] = {relay: RelayStats() for relay in self.relays}
+        self._background = set()
+
+    async def _attempt(self, relay: str, rpc_request: Dict) -> Tuple[str, str, Dict]:
+        response = await self.forward(relay, rpc_request)
+        if "result" in response:
+            outcome = "ack"
+        elif is_known_transaction(response):
+            outcome = "duplicate"
+        else:
+            outcome = "error"
+        return relay, outcome, response
+
+    def _record(self, relay: str, outcome: str):
+        stats = self.stats.setdefault(relay, RelayStats())
+        if outcome == "win":
+            stats.wins += 1
+        elif outcome == "ack":
+            stats.acks += 1
+        elif outcome == "duplicate":
+            stats.duplicates += 1
+        else:
+            stats.errors += 1
+        metrics.RELAY_SUBMISSIONS.inc(urlparse(relay).netloc, outcome)
+
+    def _record_later(self, task: asyncio.Task):
+        """Count the outcome of a submission still running after the race was decided"""
+        def done(finished: asyncio.Task):
+            self._background.discard(finished)
+            if finished.cancelled() or finished.exception() is not None:
+                return
+            relay, outcome, _ = finished.result()
+            self._record(relay, outcome)
+
+        self._background.add(task)
+        task.add_done_callback(done)
+
+    async def submit(self, rpc_request: Dict) -> Dict:
+        """
+        Send 'rpc_request' to every relay and return the first acknowledgement
+
+        If no relay acknowledges it but at least one reports it as already
+        known, an eth_sendRawTransaction is answered with its hash (it is in
+        a mempool). Otherwise the first error response is returned.
+        """
+        pending = {
+            asyncio.create_task(self._attempt(relay, rpc_request)) for relay in self.relays
+        }
+        failures: List[Tuple[str, Dict]] = []
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            results = [task.result() for task in done]
+            winner = next((result for result in results if result[1] == "ack"), None)
+            # Every finished submission is counted exactly once: the winner as a
+            # win, any other ack in the same batch as a late ack (a lost race)
+            for result in results:
+                relay, outcome, response = result
+                if result is winner:
+                    self._record(relay, "win")
+                    continue
+                self._record(relay, outcome)
+                if outcome != "ack":
+                    failures.append((outcome, response))
+            if winner is not None:
+                for other in pending:
+                    self._record_later(other)
+                return winner[2]
+
+        params = rpc_request.get("params", [])
+        if rpc_request.get("method") == "eth_sendRawTransaction" and params and \
+                any(outcome == "duplicate" for outcome, _ in failures):
+            return {
+                "jsonrpc": "2.0",
+                "id": rpc_request.get("id", 1),
+                "result": Web3.to_hex(Web3.keccak(hexstr=params[0])),
+            }
+        return failures[0][1]
+
+    def snapshot(self) -> Dict:
+        return {urlparse(relay).netloc: asdict(stats) for relay, stats in self.stats.items()}
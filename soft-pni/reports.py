@@ -0,0 +1,250 @@
+"""
+Ghost Protocol - Validation Reports
+Machine-readable validator results and regression comparison
+
+`python validator.py ... --json PATH` writes one JSON document per run:
+mode, seed, network, code revision, the full MIMICRY / CATEGORY / VALIDATION
+configuration, runtime (wall seconds, events, events per second), a flat
+'metrics' dict and the complete analyzer report.
+
+`compare` diffs two such documents metric by metric. Every metric has a
+direction and a tolerance (absolute or relative to the baseline, whichever
+is larger); a change in the bad direction beyond it is a regression. Runs
+whose mode, network, seed or other recorded arguments (duration, --simulate,
+--offline, --trace; not output paths) differ are flagged as not comparable.
+With --fail-on-regression the exit status is 1, so a nightly job can run:
+
+    python validator.py 86400 --simulate --seed 42 --offline --json nightly.json
+    python reports.py compare baseline.json nightly.json --fail-on-regression
+"""
+
+import json
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import MIMICRY_CONFIG, CATEGORY_WEIGHTS, VALIDATION_CONFIG
+
+SCHEMA_VERSION = 1
+
+# metric -> (better direction, absolute tolerance, relative tolerance)
+METRICS: Dict[str, Tuple[str, float, float]] = {
+    # Privacy
+    "timing_correlation": ("lower", 0.02, 0.0),
+    "periodicity": ("lower", 0.05, 0.0),
+    "distribution_entropy": ("higher", 0.02, 0.0),
+    "suspicious_endpoints": ("lower", 0.0, 0.0),
+    "adversary_auc": ("lower", 0.03, 0.0),
+    "adversary_balanced_accuracy": ("lower", 0.03, 0.0),
+    "anonymity_set_min": ("higher", 1.0, 0.10),
+    "anonymity_set_median": ("higher", 1.0, 0.10),
+    "passed": ("higher", 0.0, 0.0),
+    # Performance
+    "events_per_second": ("higher", 0.0, 0.15),
+    "wall_seconds": ("lower", 0.5, 0.25),
+}
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def flat_metrics(report: Dict) -> Dict:
+    """The comparable numbers of a validator report"""
+    timing = report.get("timing", {})
+    ip_report = report.get("ip_clustering", {})
+    observer = report.get("observer", {})
+    metrics = {
+        "timing_correlation": timing.get("timing_correlation"),
+        "periodicity": timing.get("periodicity"),
+        "distribution_entropy": ip_report.get("distribution_entropy"),
+        "suspicious_endpoints": ip_report.get("suspicious_endpoints"),
+        "adversary_auc": observer.get("auc"),
+        "adversary_balanced_accuracy": observer.get("balanced_accuracy"),
+        "passed": report.get("passed"),
+    }
+    windows = report.get("anonymity", {}).get("windows", {})
+    checked = windows.get(f"{VALIDATION_CONFIG['anonymity_check_window']:g}s")
+    if checked:
+        metrics["anonymity_set_min"] = checked["neighbourhood"]["min"]
+        metrics["anonymity_set_median"] = checked["neighbourhood"]["median"]
+    return metrics
+
+
+def build_document(report: Dict, mode: str, wall_seconds: float, network: str,
+                   seed: Optional[int] = None, args: Optional[List[str]] = None) -> Dict:
+    """JSON-ready record of one validator run"""
+    if "simulation" in report:
+        events = report["simulation"]["events"]
+    elif "trace" in report:
+        events = report["trace"]["rows"]
+    else:
+        events = report.get("timing", {}).get("total_transactions", 0)
+    metrics = flat_metrics(report)
+    metrics["wall_seconds"] = round(wall_seconds, 3)
+    metrics["events_per_second"] = round(events / wall_seconds, 1) if wall_seconds > 0 else None
+    return {
+        "schema": SCHEMA_VERSION,
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "mode": mode,
+        "network": network,
+        "seed": seed,
+        "revision": _git_revision(),
+        "args": args or [],
+        "config": {
+            "mimicry": dict(MIMICRY_CONFIG),
+            "category_weights": dict(CATEGORY_WEIGHTS),
+            "validation": dict(VALIDATION_CONFIG),
+        },
+        "runtime": {"wall_seconds": round(wall_seconds, 3), "events": events,
+                    "events_per_second": metrics["events_per_second"]},
+        "metrics": metrics,
+        "report": report,
+    }
+
+
+def _json_default(value):
+    # NumPy scalars and arrays
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+def write_document(path: str, document: Dict):
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, default=_json_default)
+
+
+def load_document(path: str) -> Dict:
+    with open(path) as f:
+        document = json.load(f)
+    if document.get("schema") != SCHEMA_VERSION:
+        raise ValueError(f"{path}: unsupported report schema {document.get('schema')}")
+    return document
+
+
+# validator.py options taking a value; --json and --save-trace only say where output goes
+VALUE_OPTIONS = ("--seed", "--trace", "--json", "--save-trace")
+OUTPUT_OPTIONS = ("--json", "--save-trace")
+
+
+def run_arguments(args: List[str]) -> Dict[str, object]:
+    """Recorded validator argv as {argument: value}, without output-only options"""
+    run: Dict[str, object] = {}
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in VALUE_OPTIONS:
+            value = args[i + 1] if i + 1 < len(args) else None
+            if arg not in OUTPUT_OPTIONS:
+                run[arg] = value
+            i += 2
+            continue
+        if arg.startswith("--"):
+            run[arg] = True
+        else:
+            run["duration"] = arg
+        i += 1
+    return run
+
+
+def _argument_changes(baseline: List[str], candidate: List[str]) -> List[str]:
+    before, after = run_arguments(baseline), run_arguments(candidate)
+    names = sorted((set(before) | set(after)) - {"--seed"})  # the seed has its own warning
+    return [f"{name}: {before.get(name, '(unset)')} -> {after.get(name, '(unset)')}"
+            for name in names if before.get(name) != after.get(name)]
+
+
+def _config_changes(baseline: Dict, candidate: Dict) -> List[str]:
+    changes = []
+    for section, values in candidate.items():
+        before = baseline.get(section, {})
+        for key in sorted(set(values) | set(before)):
+            if values.get(key) != before.get(key):
+                changes.append(f"{section}.{key}: {before.get(key)} -> {values.get(key)}")
+    return changes
+
+
+def compare(baseline: Dict, candidate: Dict) -> Dict:
+    """Metric-by-metric diff of two report documents"""
+    rows = []
+    for metric, (better, absolute, relative) in METRICS.items():
+        old = baseline["metrics"].get(metric)
+        new = candidate["metrics"].get(metric)
+        if old is None or new is None:
+            continue
+        old, new = float(old), float(new)
+        change = new - old
+        tolerance = max(absolute, relative * abs(old))
+        worse = change < 0 if better == "higher" else change > 0
+        if abs(change) <= tolerance or change == 0:
+            status = "ok"
+        else:
+            status = "regression" if worse else "improvement"
+        rows.append({"metric": metric, "baseline": old, "candidate": new,
+                     "change": change, "tolerance": tolerance, "status": status})
+
+    warnings = []
+    for field in ("mode", "seed", "network"):
+        if baseline.get(field) != candidate.get(field):
+            warnings.append(f"{field} differs ({baseline.get(field)} vs {candidate.get(field)}); "
+                            f"results may not be comparable")
+    argument_changes = _argument_changes(baseline.get("args", []), candidate.get("args", []))
+    if argument_changes:
+        warnings.append(f"run arguments differ ({'; '.join(argument_changes)}); "
+                        f"results may not be comparable")
+    return {
+        "baseline": {"revision": baseline.get("revision"), "generated_at": baseline.get("generated_at")},
+        "candidate": {"revision": candidate.get("revision"), "generated_at": candidate.get("generated_at")},
+        "metrics": rows,
+        "regressions": [row["metric"] for row in rows if row["status"] == "regression"],
+        "config_changes": _config_changes(baseline.get("config", {}), candidate.get("config", {})),
+        "warnings": warnings,
+    }
+
+
+def print_comparison(diff: Dict):
+    print(f"\n{'='*80}")
+    print("GHOST PROTOCOL - VALIDATION REPORT COMPARISON")
+    print(f"{'='*80}")
+    print(f"Baseline:  {diff['baseline']['revision']} ({diff['baseline']['generated_at']})")
+    print(f"Candidate: {diff['candidate']['revision']} ({diff['candidate']['generated_at']})")
+    for warning in diff["warnings"]:
+        print(f"  ⚠️  {warning}")
+    print(f"\n  {'metric':<30}{'baseline':>14}{'candidate':>14} {'change':>13}   status")
+    marks = {"ok": "", "improvement": "✓ improved", "regression": "❌ REGRESSION"}
+    for row in diff["metrics"]:
+        print(f"  {row['metric']:<30}{row['baseline']:>14.4f}{row['candidate']:>14.4f} "
+              f"{row['change']:>+13.4f}   {marks[row['status']]}")
+    if diff["config_changes"]:
+        print("\n  Config changes:")
+        for change in diff["config_changes"]:
+            print(f"    {change}")
+    print(f"\n{'❌ ' + str(len(diff['regressions'])) + ' regression(s)' if diff['regressions'] else '✓ No regressions'}")
+    print(f"{'='*80}\n")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if len(args) != 3 or args[0] != "compare":
+        print("Usage: python reports.py compare <baseline.json> <candidate.json> "
+              "[--json] [--fail-on-regression]")
+        sys.exit(2)
+
+    diff = compare(load_document(args[1]), load_document(args[2]))
+    if "--json" in sys.argv:
+        print(json.dumps(diff, indent=2))
+    else:
+        print_comparison(diff)
+    if "--fail-on-regression" in sys.argv and diff["regressions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,14 +10,46 @@ import asyncio
 import aiohttp
 from aiohttp import web
 import json
+import re
 import time
-from typing import Dict, Optional
+from typing import Awaitable, Callable, Dict, List, Optional
 from urllib.parse import urlparse
 import websockets
 from web3 import Web3
 
-from config import Network, DEFAULT_NETWORK, get_all_rpc_endpoints, PRIVATE_RPC_ENDPOINT
-from mimicry_engine import MimicryEngine
+from config import (
+    Network, DEFAULT_NETWORK, get_all_rpc_endpoints, get_ws_rpc_endpoints,
+    PRIVATE_RPC_ENDPOINTS, HEAD_CONFIG, HEDGE_CONFIG, PROXY_CONFIG, ROUTING_CONFIG, TX_CACHE_CONFIG
+)
+from endpoint_manager import EndpointManager, RateLimitedError, parse_retry_after
+from head_follower import HeadFollower, HEAD_METHODS
+from hedging import HedgePolicy
+from log_splitter import LogRangeSplitter
+from mimicry_engine import MimicryEngine, DecoyCall
+from private_relays import RelayRacer
+from storm_coordinator import StormCoordinator
+from storm_journal import open_journal
+from tx_prep_cache import TxPrepCache, GAS_METHODS
+from ws_proxy import SubscriptionMultiplexer
+from workers import HubClient, run_workers
+import metrics
+import tracing
+
+# Matches "method":"<name>" in a raw JSON-RPC body (single or batch)
+METHOD_PATTERN = re.compile(rb'"method"\s*:\s*"([^"]*)"')
+# Objects opening a batch element (also matches object params, so it over-counts calls)
+BATCH_OBJECT_PATTERN = re.compile(rb'[\[,]\s*\{')
+
+# JSON-RPC error codes / messages providers use for rate limiting
+RATE_LIMIT_CODES = frozenset({429, -32005})
+RATE_LIMIT_MARKERS = ("rate limit", "too many requests", "exceeded")
+
+# Methods reported under their own name in metrics (others become "other")
+METRIC_METHODS = frozenset({
+    "eth_chainId", "net_version", "eth_gasPrice", "eth_maxPriorityFeePerGas",
+    "eth_feeHistory", "eth_getLogs", "eth_getTransactionReceipt",
+    "eth_getTransactionByHash", "eth_getBlockByHash", "eth_subscribe", "eth_unsubscribe",
+})
 
 
 class RPCProxy:
@@ -25,12 +57,23 @@ class RPCProxy:
     HTTP/WebSocket proxy that intercepts wallet RPC calls
     """
     
-    def __init__(self, network: Network = DEFAULT_NETWORK, listen_port: int = 8545):
+    def __init__(self, network: Network = DEFAULT_NETWORK, listen_port: int = 8545,
+                 hub: Optional[HubClient] = None):
         self.network = network
         self.listen_port = listen_port
-        self.mimicry = MimicryEngine(network)
+        self.hub = hub  # Set when running as one of several worker processes
         self.public_rpcs = get_all_rpc_endpoints(network)
-        self.private_rpc = PRIVATE_RPC_ENDPOINT
+        self.endpoints = EndpointManager(self.public_rpcs)
+        self.mimicry = MimicryEngine(network, endpoint_manager=self.endpoints)
+        self.hedger = HedgePolicy()
+        self.tx_cache = TxPrepCache(track_nonces=hub is None)
+        self.relays = RelayRacer(PRIVATE_RPC_ENDPOINTS, self.forward_request)
+        self.logs = LogRangeSplitter(self.endpoints, self.post_upstream, self.current_block_number, hub)
+        self.head = HeadFollower(self.fetch_latest_header)
+        self.head.on_new_block(self.on_new_block)
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.ws_mux = SubscriptionMultiplexer(get_ws_rpc_endpoints(network), self.get_session)
+        self._ws_tasks = set()
         
         # Statistics
         self.stats = {
@@ -38,12 +81,26 @@ class RPCProxy:
             "decoy_requests": 0,
             "real_transactions": 0,
             "storms_triggered": 0,
+            "storms_merged": 0,
+            "storms_rejected": 0,
+            "hedged_requests": 0,
+            "hedge_wins": 0,
+            "ws_connections": 0,
+            "raw_passthrough": 0,
+            "answered_locally": 0,
+            "decoys_deferred": 0,
+            "decoys_throttled": 0,
         }
         
+        self.storms = StormCoordinator(
+            self.mimicry, self.send_decoy, self.send_real_transaction, self.stats,
+            journal=open_journal()
+        )
+        
         print(f"[RPCProxy] Initialized on port {listen_port}")
         print(f"[RPCProxy] Network: {network.value}")
         print(f"[RPCProxy] Public RPCs: {len(self.public_rpcs)}")
-        print(f"[RPCProxy] Private RPC: {'Configured' if self.private_rpc else '❌ NOT SET'}")
+        print(f"[RPCProxy] Private relays: {len(self.relays.relays) or '❌ NOT SET'}")
     
     def is_transaction_request(self, method: str) -> bool:
         """Check if RPC method is a transaction broadcast"""
@@ -68,150 +125,654 @@ class RPCProxy:
         ]
         return method in read_methods
     
-    async def forward_request(self, endpoint: str, rpc_request: Dict) -> Dict:
-        """Forward RPC request to specified endpoint"""
+    def get_session(self) -> aiohttp.ClientSession:
+        """Shared upstream HTTP session (created lazily on the running loop)"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+        return self.session
+    
+    def observe_upstream(self, endpoint: str, started: float, outcome: str):
+        """Record upstream latency, labelled by host so API keys in paths never leak"""
+        metrics.UPSTREAM_LATENCY.observe(time.monotonic() - started, urlparse(endpoint).netloc, outcome)
+    
+    async def _post_upstream(self, endpoint: str, read_reply: Callable, **post_kwargs):
+        """
+        POST upstream with health, hedge-latency and metrics bookkeeping
+        
+        read_reply(response) decodes the reply; raises on any failure.
+        """
+        started = time.monotonic()
+        metrics.UPSTREAM_INFLIGHT.inc()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
+            with tracing.span("upstream"):
+                async with self.get_session().post(
                     endpoint,
-                    json=rpc_request,
                     headers={"Content-Type": "application/json"},
-                    timeout=aiohttp.ClientTimeout(total=30)
+                    timeout=aiohttp.ClientTimeout(total=PROXY_CONFIG["upstream_timeout"]),
+                    **post_kwargs
                 ) as response:
-                    return await response.json()
+                    if response.status == 429:
+                        raise RateLimitedError(endpoint, parse_retry_after(response.headers.get("Retry-After")))
+                    response.raise_for_status()
+                    reply = await read_reply(response)
+        except asyncio.CancelledError:
+            self.observe_upstream(endpoint, started, "cancelled")
+            raise  # Lost a hedge race; not an endpoint failure
+        except RateLimitedError as e:
+            # Throttled, not broken: back off without touching the circuit breaker
+            self.endpoints.record_rate_limited(endpoint, e.retry_after)
+            self.observe_upstream(endpoint, started, "rate_limited")
+            raise
+        except Exception:
+            self.endpoints.record_failure(endpoint)
+            self.observe_upstream(endpoint, started, "error")
+            raise
+        finally:
+            metrics.UPSTREAM_INFLIGHT.dec()
+        
+        latency = time.monotonic() - started
+        self.observe_upstream(endpoint, started, "ok")
+        self.endpoints.record_success(endpoint, latency)
+        if endpoint in self.endpoints.health:
+            self.hedger.record_latency(latency)
+        return reply
+    
+    @staticmethod
+    def is_rate_limit_error(reply) -> bool:
+        """Whether a decoded JSON-RPC reply is a provider rate-limit error"""
+        if not isinstance(reply, dict) or not isinstance(reply.get("error"), dict):
+            return False
+        error = reply["error"]
+        message = str(error.get("message", "")).lower()
+        return error.get("code") in RATE_LIMIT_CODES and \
+            any(marker in message for marker in RATE_LIMIT_MARKERS)
+    
+    async def post_upstream(self, endpoint: str, rpc_request: Dict) -> Dict:
+        """POST an RPC request upstream and decode the reply; raises on failure"""
+        async def read_json(response):
+            reply = await response.json(content_type=None)
+            if self.is_rate_limit_error(reply):
+                raise RateLimitedError(endpoint)
+            return reply
+        
+        return await self._post_upstream(endpoint, read_json, json=rpc_request)
+    
+    async def post_upstream_raw(self, endpoint: str, body: bytes) -> bytes:
+        """POST a raw JSON-RPC body upstream and return the raw reply bytes; raises on failure"""
+        return await self._post_upstream(endpoint, lambda response: response.read(), data=body)
+    
+    def proxy_error(self, rpc_request: Dict, error: Exception) -> Dict:
+        """JSON-RPC error response for a failed upstream call"""
+        return {
+            "jsonrpc": "2.0",
+            "id": rpc_request.get("id", 1),
+            "error": {"code": -32603, "message": f"Proxy error: {str(error)}"}
+        }
+    
+    async def forward_request(self, endpoint: str, rpc_request: Dict) -> Dict:
+        """Forward RPC request to specified endpoint"""
+        try:
+            return await self.post_upstream(endpoint, rpc_request)
         except Exception as e:
-            return {
-                "jsonrpc": "2.0",
-                "id": rpc_request.get("id", 1),
-                "error": {"code": -32603, "message": f"Proxy error: {str(e)}"}
-            }
+            return self.proxy_error(rpc_request, e)
     
-    async def trigger_decoy_storm(self, real_tx_data: Dict):
+    async def hedged_call(self, send: Callable[[str], Awaitable]):
         """
-        Launch a decoy storm when a real transaction is detected
+        Run send(endpoint) for a read, hedging to a second endpoint if slow
+        
+        Waits on the primary for the current percentile-based hedge delay,
+        then (budget permitting) calls send() on another healthy endpoint.
+        The first successful answer wins and the loser is cancelled; if every
+        attempt fails the last error is raised.
         """
-        print(f"\n[ALERT] Real transaction detected!")
-        print(f"[STORM] Generating camouflage...")
+        primary = self.endpoints.choose_read_endpoint()
+        if not HEDGE_CONFIG["enabled"]:
+            return await send(primary)
         
-        storm_start = time.time()
-        self.stats["storms_triggered"] += 1
+        self.hedger.on_read()
+        primary_task = asyncio.create_task(send(primary))
+        done, _ = await asyncio.wait({primary_task}, timeout=self.hedger.hedge_delay())
         
-        # Generate decoys
-        decoys = self.mimicry.generate_decoy_storm(intensity=75)
+        secondary = next(
+            (url for url in self.endpoints.select_read_endpoints(2) if url != primary), None
+        )
+        if primary_task in done or secondary is None or not self.hedger.try_acquire_hedge():
+            return await primary_task
         
-        # Schedule timeline
-        timeline, real_tx_offset = self.mimicry.scheduler.schedule_storm(real_tx_ready=True)
+        self.stats["hedged_requests"] += 1
+        hedge_task = asyncio.create_task(send(secondary))
+        pending = {primary_task, hedge_task}
+        last_error: Exception = RuntimeError("no upstream response")
         
-        print(f"[STORM] {len(decoys)} decoys | Duration: {max(timeline) if timeline else 0:.2f}s")
-        print(f"[STORM] Real TX will be sent at t+{real_tx_offset:.2f}s")
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if task is hedge_task:
+                        self.stats["hedge_wins"] += 1
+                    return task.result()
+                last_error = task.exception()
         
-        # Execute storm asynchronously
-        tasks = []
-        real_tx_sent = False
+        raise last_error
+    
+    async def forward_read(self, rpc_request: Dict) -> Dict:
+        """Forward a read request with hedging"""
+        try:
+            return await self.hedged_call(lambda endpoint: self.post_upstream(endpoint, rpc_request))
+        except Exception as e:
+            return self.proxy_error(rpc_request, e)
+    
+    async def fetch_latest_header(self) -> Dict:
+        """Latest block header (transaction hashes only) from the public RPCs; raises on failure"""
+        request = {"jsonrpc": "2.0", "id": 1, "method": "eth_getBlockByNumber", "params": ["latest", False]}
+        response = await self.hedged_call(lambda endpoint: self.post_upstream(endpoint, request))
+        if not isinstance(response.get("result"), dict):
+            raise ValueError(response.get("error", "no header"))
+        return response["result"]
+    
+    async def current_block_number(self) -> int:
+        """Latest block number, from the head follower when fresh; raises on failure"""
+        if self.head.is_fresh():
+            return self.head.number
+        request = {"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []}
+        response = await self.hedged_call(lambda endpoint: self.post_upstream(endpoint, request))
+        return int(response["result"], 16)
+    
+    def on_new_block(self, number: int):
+        """Head follower callback: drop block-scoped cached answers"""
+        self.tx_cache.invalidate_block()
+    
+    async def split_logs(self, rpc_request: Dict) -> Dict:
+        """Answer a wide eth_getLogs in parallel chunks, or forward it unchanged"""
+        try:
+            response = await self.logs.fetch(rpc_request)
+        except Exception as e:
+            print(f"[Logs] Could not split range ({e}); forwarding as-is")
+            response = None
+        if response is None:
+            response = await self.forward_request(self.endpoints.choose_read_endpoint(), rpc_request)
+        return response
+    
+    def peek_methods(self, body: bytes) -> List[str]:
+        """
+        Extract JSON-RPC method names from a raw body without decoding it
         
-        for offset in sorted(timeline):
-            # Wait until this offset
-            await asyncio.sleep(max(0, offset - (time.time() - storm_start)))
+        Falls back to a full decode whenever the regex could miss a call: any
+        JSON escape in the body ("\u006dethod", "eth_send\u0052aw...") or a
+        batch with more element objects than matched methods. A missed
+        transaction would otherwise be forwarded raw, without a storm.
+        """
+        if b"\\" in body:
+            return self.decoded_methods(body)
+        names = METHOD_PATTERN.findall(body)
+        if body.lstrip()[:1] == b"[" and len(BATCH_OBJECT_PATTERN.findall(body)) != len(names):
+            return self.decoded_methods(body)
+        return [m.decode("utf-8", "replace") for m in names]
+    
+    @staticmethod
+    def decoded_methods(body: bytes) -> List[str]:
+        """Method names of a fully decoded body ([] if it is not valid JSON-RPC)"""
+        try:
+            rpc_request = json.loads(body)
+        except ValueError:
+            return []
+        calls = rpc_request if isinstance(rpc_request, list) else [rpc_request]
+        return [str(call.get("method", "")) for call in calls if isinstance(call, dict)]
+    
+    def raw_proxy_error(self, body: bytes, error: Exception) -> web.Response:
+        """Error response for a failed raw passthrough (decodes the body only here)"""
+        try:
+            rpc_request = json.loads(body)
+        except ValueError:
+            rpc_request = {}
+        if not isinstance(rpc_request, dict):
+            rpc_request = {}
+        return web.json_response(self.proxy_error(rpc_request, error))
+    
+    async def stream_upstream(self, request: web.Request, endpoint: str, body: bytes) -> web.StreamResponse:
+        """Stream a raw body upstream and the upstream reply back chunk by chunk"""
+        started = time.monotonic()
+        metrics.UPSTREAM_INFLIGHT.inc()
+        try:
+            try:
+                with tracing.span("upstream"):
+                    upstream = await self.get_session().post(
+                        endpoint,
+                        data=body,
+                        headers={"Content-Type": "application/json"},
+                        timeout=aiohttp.ClientTimeout(total=PROXY_CONFIG["upstream_timeout"])
+                    )
+            except Exception as e:
+                self.endpoints.record_failure(endpoint)
+                self.observe_upstream(endpoint, started, "error")
+                return self.raw_proxy_error(body, e)
             
-            # Check if it's time to send real TX
-            if not real_tx_sent and offset >= real_tx_offset:
-                # Send real TX to private RPC
-                if self.private_rpc:
-                    task = self.forward_request(self.private_rpc, real_tx_data)
-                else:
-                    # Fallback to random public RPC
-                    import random
-                    task = self.forward_request(random.choice(self.public_rpcs), real_tx_data)
+            async with upstream:
+                if upstream.status == 429:
+                    self.endpoints.record_rate_limited(
+                        endpoint, parse_retry_after(upstream.headers.get("Retry-After"))
+                    )
+                    self.observe_upstream(endpoint, started, "rate_limited")
+                    return self.raw_proxy_error(body, RateLimitedError(endpoint))
+                if upstream.status >= 400:
+                    self.endpoints.record_failure(endpoint)
+                    self.observe_upstream(endpoint, started, "error")
+                    return self.raw_proxy_error(body, RuntimeError(f"upstream HTTP {upstream.status}"))
                 
-                tasks.append(task)
-                real_tx_sent = True
-                self.stats["real_transactions"] += 1
-                print(f"[TX] Real transaction sent via {'private relay' if self.private_rpc else 'public RPC'}")
-            else:
-                # Send decoy to public RPC
-                if decoys:
-                    decoy = decoys.pop(0)
-                    # Convert decoy to RPC call
-                    decoy_request = {
-                        "jsonrpc": "2.0",
-                        "method": "eth_call",
-                        "params": [{
-                            "to": decoy.contract_address,
-                            "data": Web3.keccak(text=f"{decoy.function_name}()").hex()[:10]
-                        }, "latest"],
-                        "id": int(time.time() * 1000)
-                    }
-                    task = self.forward_request(decoy.rpc_endpoint, decoy_request)
-                    tasks.append(task)
-                    self.stats["decoy_requests"] += 1
-        
-        # Execute all tasks
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Find real TX response
-        real_tx_response = None
-        if real_tx_sent:
-            real_tx_response = results[timeline.index(real_tx_offset)] if len(results) > 0 else None
-        
-        storm_duration = time.time() - storm_start
-        print(f"[STORM] Complete in {storm_duration:.2f}s")
-        print(f"[STORM] Decoys sent: {self.stats['decoy_requests']}")
-        
-        return real_tx_response
-    
-    async def handle_rpc_request(self, request: web.Request) -> web.Response:
+                response = web.StreamResponse(headers={
+                    "Content-Type": upstream.headers.get("Content-Type", "application/json")
+                })
+                await response.prepare(request)
+                try:
+                    with tracing.span("stream"):
+                        async for chunk in upstream.content.iter_any():
+                            await response.write(chunk)
+                except Exception:
+                    # Headers are already sent; all we can do is record and drop the connection
+                    self.endpoints.record_failure(endpoint)
+                    self.observe_upstream(endpoint, started, "error")
+                    raise
+                await response.write_eof()
+        finally:
+            metrics.UPSTREAM_INFLIGHT.dec()
+        
+        self.observe_upstream(endpoint, started, "ok")
+        self.endpoints.record_success(endpoint, time.monotonic() - started)
+        return response
+    
+    async def forward_raw(self, request: web.Request, body: bytes, methods: List[str]) -> web.StreamResponse:
         """
-        Main HTTP handler for RPC requests
+        Fast path for non-transaction requests: no JSON decode/encode
+        
+        Read methods are hedged on raw bytes; anything else (e.g. large
+        eth_getLogs replies) is streamed straight through.
         """
-        self.stats["total_requests"] += 1
+        self.stats["raw_passthrough"] += 1
+        if all(self.is_read_request(m) for m in methods):
+            try:
+                payload = await self.hedged_call(lambda endpoint: self.post_upstream_raw(endpoint, body))
+            except Exception as e:
+                return self.raw_proxy_error(body, e)
+            return web.Response(body=payload, content_type="application/json")
         
-        try:
-            rpc_request = await request.json()
-        except:
-            return web.json_response({
-                "jsonrpc": "2.0",
-                "error": {"code": -32700, "message": "Parse error"}
-            })
+        return await self.stream_upstream(request, self.endpoints.choose_read_endpoint(), body)
+    
+    async def send_decoy(self, decoy: DecoyCall) -> Optional[Dict]:
+        """
+        Convert a decoy to an RPC call and send it within the endpoint rate limits
+        
+        Uses the assigned endpoint if it has a decoy token, otherwise another
+        endpoint with spare capacity. If every endpoint is saturated the decoy
+        waits up to 'decoy_max_defer' seconds, then is dropped (returns None).
+        """
+        endpoint = self.endpoints.acquire_decoy_endpoint(decoy.rpc_endpoint)
+        if endpoint is None:
+            self.stats["decoys_deferred"] += 1
+            deadline = time.monotonic() + ROUTING_CONFIG["decoy_max_defer"]
+            while endpoint is None and time.monotonic() < deadline:
+                await asyncio.sleep(min(self.endpoints.decoy_token_wait(), deadline - time.monotonic()) + 0.001)
+                endpoint = self.endpoints.acquire_decoy_endpoint(decoy.rpc_endpoint)
+        if endpoint is None:
+            self.stats["decoys_throttled"] += 1
+            return None
+        decoy.rpc_endpoint = endpoint
+        
+        decoy_request = {
+            "jsonrpc": "2.0",
+            "method": "eth_call",
+            "params": [{
+                "to": decoy.contract_address,
+                "data": Web3.keccak(text=f"{decoy.function_name}()").hex()[:10]
+            }, "latest"],
+            "id": int(time.time() * 1000)
+        }
+        return await self.forward_request(decoy.rpc_endpoint, decoy_request)
+    
+    async def send_real_transaction(self, real_tx_data: Dict) -> Dict:
+        """Race a real transaction across the private relays (or send to the best public RPC)"""
+        if self.relays.relays:
+            response = await self.relays.submit(real_tx_data)
+            via = f"{len(self.relays.relays)} private relay(s)"
+        else:
+            # Fallback to the healthiest public RPC
+            response = await self.forward_request(self.endpoints.choose_read_endpoint(), real_tx_data)
+            via = "public RPC"
+        
+        self.stats["real_transactions"] += 1
+        print(f"[TX] Real transaction sent via {via}")
+        return response
+    
+    async def trigger_decoy_storm(self, real_tx_data: Dict) -> Dict:
+        """
+        Hide a real transaction in a decoy storm
+        
+        Transactions that arrive while a storm is running join its timeline;
+        otherwise a new storm is admitted against the global decoy budget.
+        """
+        print(f"\n[ALERT] Real transaction detected!")
+        if self.hub:
+            # Storms are scheduled by the hub so they merge across all workers
+            try:
+                return await self.hub.submit_transaction(real_tx_data)
+            except Exception as e:
+                return self.proxy_error(real_tx_data, e)
+        
+        print(f"[STORM] Generating camouflage...")
+        return await self.storms.submit(real_tx_data)
+    
+    def needs_dispatch(self, method: str) -> bool:
+        """Whether a method must be decoded (intercepted or answered locally)"""
+        if self.is_transaction_request(method):
+            return True
+        if HEAD_CONFIG["enabled"] and method == "eth_blockNumber":
+            return True
+        return TX_CACHE_CONFIG["enabled"] and method in self.tx_cache.methods
+    
+    def needs_decoding(self, methods: List[str], body: bytes) -> bool:
+        """Whether a raw body must be decoded (intercepted, answered locally or split)"""
+        if any(self.needs_dispatch(m) for m in methods):
+            return True
+        if methods == ["eth_getLogs"]:
+            return self.logs.may_split_body(body)
+        if methods == ["eth_getBlockByNumber"]:
+            return self.head.is_fresh() and b'"latest"' in body
+        return False
+    
+    async def dispatch(self, rpc_request: Dict) -> Dict:
+        """
+        Route a parsed JSON-RPC request (shared by the HTTP and WebSocket listeners)
+        """
+        if isinstance(rpc_request, list):
+            # Batch: every call is routed on its own (transactions still get a storm)
+            return await asyncio.gather(*(self.dispatch(call) for call in rpc_request))
         
         method = rpc_request.get("method", "")
+        params = rpc_request.get("params", [])
+        use_tx_cache = TX_CACHE_CONFIG["enabled"] and self.tx_cache.handles(method, params)
+        
+        if method in HEAD_METHODS:
+            answered = self.head.answer(rpc_request)
+            if answered is not None:
+                self.stats["answered_locally"] += 1
+                return answered
+        
+        if use_tx_cache:
+            with tracing.span("cache"):
+                cached = self.tx_cache.lookup(rpc_request)
+            if cached is None and self.hub and method in GAS_METHODS:
+                cached = await self.shared_gas_answer(rpc_request)
+            if cached is not None:
+                self.stats["answered_locally"] += 1
+                return cached
         
         # Check if this is a transaction
         if self.is_transaction_request(method):
             print(f"\n[INTERCEPT] {method}")
             
             # Trigger storm and send real TX within it
-            response = await self.trigger_decoy_storm(rpc_request)
+            with tracing.span("storm"):
+                response = await self.trigger_decoy_storm(rpc_request)
             
             if response:
-                return web.json_response(response)
+                if TX_CACHE_CONFIG["enabled"]:
+                    self.tx_cache.record_transaction(rpc_request, response)
+                return response
             else:
-                return web.json_response({
+                return {
                     "jsonrpc": "2.0",
                     "id": rpc_request.get("id", 1),
                     "error": {"code": -32000, "message": "Transaction failed"}
-                })
+                }
         
-        # For read requests, just forward to a random public RPC
+        # Wide eth_getLogs ranges are split into chunks queried in parallel
+        elif self.logs.may_split(rpc_request):
+            with tracing.span("logs_split"):
+                response = await self.split_logs(rpc_request)
+        
+        # Idempotent reads are hedged across the fastest healthy public RPCs
+        elif self.is_read_request(method):
+            response = await self.forward_read(rpc_request)
+        
+        # Anything else is forwarded once to one of the fastest healthy public RPCs
         else:
-            import random
-            endpoint = random.choice(self.public_rpcs)
+            endpoint = self.endpoints.choose_read_endpoint()
             response = await self.forward_request(endpoint, rpc_request)
+        
+        if use_tx_cache:
+            self.tx_cache.store(rpc_request, response)
+            key = self.shared_gas_key(method, params) if self.hub and method in GAS_METHODS else None
+            if key and "result" in response:
+                self.hub.cache_put({key: response["result"]}, ttl=TX_CACHE_CONFIG["gas_ttl"])
+        return response
+    
+    def shared_gas_key(self, method: str, params) -> Optional[str]:
+        """Hub cache key of a gas answer: scoped to the current block, None if the head is unknown"""
+        if not self.head.is_fresh():
+            return None
+        return f"gas:{self.head.number}:{TxPrepCache.gas_key(method, params)}"
+    
+    async def shared_gas_answer(self, rpc_request: Dict) -> Optional[Dict]:
+        """A gas answer another worker fetched for this block, or None"""
+        method = rpc_request.get("method", "")
+        params = rpc_request.get("params", [])
+        key = self.shared_gas_key(method, params)
+        if key is None:
+            return None
+        found = await self.hub.cache_get([key])
+        if key not in found:
+            return None
+        result, age = found[key]
+        self.tx_cache.store_gas(TxPrepCache.gas_key(method, params), result, age)
+        return {"jsonrpc": "2.0", "id": rpc_request.get("id", 1), "result": result}
+    
+    def method_label(self, methods: List[str]) -> str:
+        """Bounded metric label for a request's method(s)"""
+        if not methods:
+            return "invalid"
+        if len(methods) > 1:
+            return "batch"
+        method = methods[0]
+        if method in METRIC_METHODS or self.is_transaction_request(method) or self.is_read_request(method):
+            return method
+        return "other"
+    
+    async def handle_rpc_request(self, request: web.Request) -> web.StreamResponse:
+        """
+        Main HTTP handler for RPC requests
+        """
+        self.stats["total_requests"] += 1
+        started = time.monotonic()
+        trace = tracing.TRACER.start("http")
+        metrics.INFLIGHT_REQUESTS.inc("http")
+        body = b""
+        try:
+            with tracing.span("read_body"):
+                body = await request.read()
+            return await self.route_http_body(request, body)
+        finally:
+            metrics.INFLIGHT_REQUESTS.dec("http")
+            label = self.method_label(self.peek_methods(body))
+            metrics.REQUEST_LATENCY.observe(time.monotonic() - started, label, "http")
+            tracing.TRACER.finish(trace, label)
+    
+    async def route_http_body(self, request: web.Request, body: bytes) -> web.StreamResponse:
+        """Route a raw HTTP request body to the raw fast path or full dispatch"""
+        # Only transactions and locally answerable calls need the decoded request;
+        # everything else passes through raw
+        if PROXY_CONFIG["raw_passthrough"]:
+            with tracing.span("classify"):
+                methods = self.peek_methods(body)
+                raw = methods and not self.needs_decoding(methods, body)
+            if raw:
+                return await self.forward_raw(request, body, methods)
+        
+        try:
+            with tracing.span("parse"):
+                rpc_request = json.loads(body)
+        except:
+            return web.json_response({
+                "jsonrpc": "2.0",
+                "error": {"code": -32700, "message": "Parse error"}
+            })
+        
+        response = await self.dispatch(rpc_request)
+        with tracing.span("serialize"):
             return web.json_response(response)
     
+    async def handle_ws_message(self, ws: web.WebSocketResponse, data: str):
+        """Handle one JSON-RPC message received over a client WebSocket"""
+        self.stats["total_requests"] += 1
+        trace = tracing.TRACER.start("ws")
+        
+        try:
+            with tracing.span("parse"):
+                rpc_request = json.loads(data)
+        except ValueError:
+            tracing.TRACER.finish(trace, "invalid")
+            await ws.send_json({"jsonrpc": "2.0", "error": {"code": -32700, "message": "Parse error"}})
+            return
+        
+        if isinstance(rpc_request, list):
+            await ws.send_json(await self.dispatch(rpc_request))
+            tracing.TRACER.finish(trace, "batch")
+            return
+        
+        method = rpc_request.get("method", "")
+        started = time.monotonic()
+        metrics.INFLIGHT_REQUESTS.inc("ws")
+        request_id = rpc_request.get("id", 1)
+        
+        try:
+            if method == "eth_subscribe":
+                result = await self.ws_mux.subscribe(ws, rpc_request.get("params", []))
+                response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+            elif method == "eth_unsubscribe":
+                params = rpc_request.get("params", [])
+                result = await self.ws_mux.unsubscribe(ws, params[0]) if params else False
+                response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+            else:
+                # Transactions sent over WS still go through a decoy storm
+                response = await self.dispatch(rpc_request)
+        except Exception as e:
+            response = self.proxy_error(rpc_request, e)
+        finally:
+            metrics.INFLIGHT_REQUESTS.dec("ws")
+            metrics.REQUEST_LATENCY.observe(time.monotonic() - started, self.method_label([method]), "ws")
+        
+        if not ws.closed:
+            with tracing.span("serialize"):
+                await ws.send_json(response)
+        tracing.TRACER.finish(trace, self.method_label([method]))
+    
+    async def handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """
+        WebSocket listener: JSON-RPC over WS with shared eth_subscribe subscriptions
+        """
+        ws = web.WebSocketResponse(heartbeat=30)
+        if not ws.can_prepare(request).ok:
+            raise web.HTTPMethodNotAllowed(request.method, ["POST"])
+        await ws.prepare(request)
+        self.stats["ws_connections"] += 1
+        
+        try:
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    # Handle concurrently so a storm does not block subscriptions
+                    task = asyncio.create_task(self.handle_ws_message(ws, msg.data))
+                    self._ws_tasks.add(task)
+                    task.add_done_callback(self._ws_tasks.discard)
+        finally:
+            await self.ws_mux.drop_client(ws)
+        
+        return ws
+    
     async def handle_health_check(self, request: web.Request) -> web.Response:
         """Health check endpoint"""
+        stats = self.stats
+        if self.hub:
+            try:
+                stats = await self.hub.aggregated_stats()
+            except Exception:
+                pass  # Hub unreachable; report this worker's own counters
+        
         return web.json_response({
             "status": "healthy",
             "network": self.network.value,
-            "stats": self.stats,
-            "private_rpc_configured": bool(self.private_rpc)
+            "stats": stats,
+            "worker": self.hub.worker_id if self.hub else None,
+            "endpoints": self.endpoints.snapshot(),
+            "hedge_delay_ms": round(self.hedger.hedge_delay() * 1000, 1),
+            "hedge_rate": round(self.hedger.hedge_rate(), 4),
+            "websocket": self.ws_mux.snapshot(),
+            "tx_cache": self.tx_cache.snapshot(),
+            "logs": self.logs.snapshot(),
+            "head": self.head.snapshot(),
+            "private_relays": self.relays.snapshot(),
+            "private_rpc_configured": bool(self.relays.relays)
         })
     
-    def run(self):
-        """Start the proxy server"""
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        """Prometheus text-format metrics endpoint"""
+        extra = []
+        for key, value in self.stats.items():
+            extra.append(f"# TYPE ghost_{key}_total counter")
+            extra.append(f"ghost_{key}_total {value}")
+        
+        health_items = [(urlparse(url).netloc, h) for url, h in self.endpoints.health.items()]
+        extra.append("# TYPE ghost_endpoint_latency_ewma_seconds gauge")
+        for host, health in health_items:
+            extra.append(f'ghost_endpoint_latency_ewma_seconds{{endpoint="{host}"}} {health.latency_ewma:g}')
+        extra.append("# TYPE ghost_endpoint_throttled gauge")
+        for host, health in health_items:
+            extra.append(f'ghost_endpoint_throttled{{endpoint="{host}"}} {int(self.endpoints.is_throttled(health.url))}')
+        extra.append("# TYPE ghost_endpoint_circuit_open gauge")
+        for host, health in health_items:
+            extra.append(f'ghost_endpoint_circuit_open{{endpoint="{host}"}} {int(health.state.value != "closed")}')
+        
+        extra.extend(metrics.cache_hit_ratio_lines())
+        return web.Response(text=metrics.render_all(extra), content_type="text/plain", charset="utf-8")
+    
+    async def handle_traces(self, request: web.Request) -> web.Response:
+        """Rolling per-stage latency summary of sampled requests"""
+        return web.json_response(tracing.TRACER.summary())
+    
+    async def on_startup(self, app: web.Application):
+        """Start background endpoint health probing (and hub stats sync for workers)"""
+        self.endpoints.start_probing(self.get_session())
+        self.head.start()
+        if self.hub:
+            self.hub.start(self.stats)
+    
+    async def on_cleanup(self, app: web.Application):
+        """Stop probing and close the shared upstream session"""
+        await self.endpoints.stop_probing()
+        await self.head.stop()
+        await self.ws_mux.close()
+        if self.hub:
+            await self.hub.close()
+        tracing.TRACER.close()
+        if self.storms.journal:
+            self.storms.journal.close()
+        if self.session is not None:
+            await self.session.close()
+    
+    def build_app(self) -> web.Application:
+        """Create the aiohttp application with all proxy routes"""
         app = web.Application()
         app.router.add_post('/', self.handle_rpc_request)
+        app.router.add_get('/', self.handle_websocket)
         app.router.add_get('/health', self.handle_health_check)
+        app.router.add_get('/metrics', self.handle_metrics)
+        app.router.add_get('/traces', self.handle_traces)
+        app.on_startup.append(self.on_startup)
+        app.on_cleanup.append(self.on_cleanup)
+        return app
+    
+    def run(self):
+        """Start the proxy server"""
+        app = self.build_app()
         
         print(f"\n{'='*60}")
         print(f"🔒 Ghost Protocol RPC Proxy")
@@ -220,13 +781,14 @@ class RPCProxy:
         print(f"Network: {self.network.value}")
         print(f"\nConfigure your wallet to use this RPC endpoint:")
         print(f"  http://localhost:{self.listen_port}")
+        print(f"  ws://localhost:{self.listen_port}  (subscriptions)")
         print(f"\nAll transactions will be anonymized automatically.")
         print(f"{'='*60}\n")
         
         web.run_app(app, host='127.0.0.1', port=self.listen_port)
 
 
-async def main():
+def main():
     import sys
     import os
     from dotenv import load_dotenv
@@ -236,6 +798,7 @@ async def main():
     # Parse arguments
     network = DEFAULT_NETWORK
     port = 8545
+    num_workers = 1
     
     if len(sys.argv) > 1:
         try:
@@ -249,16 +812,25 @@ async def main():
         except:
             print(f"Invalid port. Using default: 8545")
     
+    if len(sys.argv) > 3:
+        try:
+            num_workers = max(1, int(sys.argv[3]))
+        except:
+            print(f"Invalid worker count. Using a single process")
+    
     # Check for private RPC configuration
-    if not PRIVATE_RPC_ENDPOINT:
+    if not PRIVATE_RPC_ENDPOINTS:
         print("\n⚠️  WARNING: No private RPC endpoint configured!")
         print("   Real transactions will use public RPCs (less anonymous)")
-        print("   Set GHOST_PRIVATE_RPC in .env file\n")
+        print("   Set GHOST_PRIVATE_RPC (or GHOST_PRIVATE_RPCS) in .env file\n")
     
     # Create and run proxy
-    proxy = RPCProxy(network=network, listen_port=port)
-    proxy.run()
+    if num_workers > 1:
+        run_workers(network, port, num_workers)
+    else:
+        proxy = RPCProxy(network=network, listen_port=port)
+        proxy.run()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -0,0 +1,302 @@
+"""
+Ghost Protocol - Storm Coordinator
+Merges overlapping decoy storms and enforces a global decoy budget
+
+When real transactions arrive close together, each one joins the storm
+that is already running (extending it slightly) instead of launching an
+independent storm. Every admitted decoy is paid for from a token bucket,
+so total decoy traffic stays under STORM_CONFIG["decoy_budget_per_second"]
+no matter how many transactions arrive. Finished storms and transaction
+outcomes are appended to the storm journal when one is configured.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from config import MIMICRY_CONFIG, STORM_CONFIG
+from mimicry_engine import DecoyCall, MimicryEngine
+from storm_journal import StormJournal
+import metrics
+import tracing
+
+
+@dataclass(order=True)
+class StormEvent:
+    """One scheduled send inside a storm timeline"""
+    offset: float
+    seq: int
+    decoy: Optional[DecoyCall] = field(default=None, compare=False)
+    real_tx: Optional[Dict] = field(default=None, compare=False)
+    future: Optional[asyncio.Future] = field(default=None, compare=False)
+
+
+@dataclass
+class ActiveStorm:
+    """A running storm timeline shared by one or more real transactions"""
+    started: float                    # time.monotonic() at storm start
+    end_offset: float                 # seconds after start
+    density: float                    # decoys per second
+    events: List[StormEvent] = field(default_factory=list)  # heap
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    started_wall: float = field(default_factory=time.time)
+    decoys_sent: int = 0
+    decoys_throttled: int = 0
+    real_txs: int = 0
+    merges: int = 0
+    endpoints: set = field(default_factory=set)
+    decoy_tasks: set = field(default_factory=set)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> float:
+        return self.end_offset - self.elapsed()
+
+
+class StormCoordinator:
+    """
+    Schedules real transactions into shared storm timelines
+    """
+
+    def __init__(self,
+                 mimicry: MimicryEngine,
+                 send_decoy: Callable[[DecoyCall], Awaitable[Optional[Dict]]],
+                 send_real: Callable[[Dict], Awaitable[Dict]],
+                 stats: Dict,
+                 journal: Optional[StormJournal] = None):
+        self.mimicry = mimicry
+        self.send_decoy = send_decoy
+        self.send_real = send_real
+        self.stats = stats
+        self.journal = journal
+        self.active: Optional[ActiveStorm] = None
+        self.tokens = float(STORM_CONFIG["decoy_budget_burst"])
+        self.last_refill = time.monotonic()
+        self._seq = itertools.count()
+        self._tasks = set()
+
+    # ------------------------------------------------------------------
+    # Decoy budget
+    # ------------------------------------------------------------------
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.tokens + (now - self.last_refill) * STORM_CONFIG["decoy_budget_per_second"],
+            float(STORM_CONFIG["decoy_budget_burst"])
+        )
+        self.last_refill = now
+
+    def reserve_decoys(self, wanted: int, minimum: int) -> int:
+        """
+        Take up to 'wanted' decoys from the budget
+
+        Returns the number granted, or 0 (taking nothing) if fewer than
+        'minimum' are available.
+        """
+        self._refill()
+        granted = min(wanted, int(self.tokens))
+        if granted < minimum or granted <= 0:
+            return 0
+        self.tokens -= granted
+        return granted
+
+    # ------------------------------------------------------------------
+    # Submission
+    # ------------------------------------------------------------------
+
+    def _can_merge(self) -> bool:
+        return self.active is not None and \
+            self.active.remaining() >= STORM_CONFIG["merge_min_remaining"]
+
+    async def submit(self, real_tx: Dict) -> Dict:
+        """
+        Hide a real transaction in a storm and return its RPC response
+
+        Joins the running storm if one is active, otherwise admits a new
+        storm once the decoy budget allows it.
+        """
+        future = asyncio.get_running_loop().create_future()
+        submitted = time.monotonic()
+        if self._can_merge():
+            self._merge(self.active, real_tx, future)
+            admission = "merged"
+        else:
+            # Admission may still end up merging into a storm started while it waited
+            admission = await self._admit(real_tx, future)
+
+        response = await future
+        if self.journal:
+            # Only the budget refusal counts as rejected; relays and upstream nodes
+            # also answer -32005 when they rate-limit, which is an ordinary error
+            if admission == "rejected":
+                outcome = "rejected"
+            else:
+                outcome = "ok" if "result" in response else "error"
+            self.journal.record_transaction(time.monotonic() - submitted, outcome, admission == "merged")
+        return response
+
+    def _push(self, storm: ActiveStorm, offset: float, **payload):
+        heapq.heappush(storm.events, StormEvent(offset=offset, seq=next(self._seq), **payload))
+
+    def _merge(self, storm: ActiveStorm, real_tx: Dict, future: asyncio.Future):
+        """Inject a real transaction into the running storm, extending it slightly"""
+        extension = random.uniform(
+            MIMICRY_CONFIG["storm_duration_min"],
+            MIMICRY_CONFIG["storm_duration_max"]
+        ) * STORM_CONFIG["merge_extension_factor"]
+
+        # Extra decoys keep the original density over the extension, budget permitting
+        granted = self.reserve_decoys(int(extension * storm.density), minimum=0)
+        if granted:
+            with tracing.span("storm_generate"):
+                decoys = self.mimicry.generate_decoy_storm(intensity=granted)
+            for decoy in decoys:
+                offset = random.uniform(storm.end_offset, storm.end_offset + extension)
+                self._push(storm, offset, decoy=decoy)
+        storm.end_offset += extension
+        storm.merges += 1
+
+        # Same 30-70% placement rule as a fresh storm, over what is left of the timeline
+        elapsed = storm.elapsed()
+        real_offset = elapsed + random.uniform(0.3, 0.7) * (storm.end_offset - elapsed)
+        self._push(storm, real_offset, real_tx=real_tx, future=future)
+
+        self.stats["storms_merged"] += 1
+        print(f"[STORM] Merged real TX into running storm at t+{real_offset:.2f}s "
+              f"(+{granted} decoys, extended by {extension:.2f}s)")
+        storm.wakeup.set()
+
+    async def _admit(self, real_tx: Dict, future: asyncio.Future) -> str:
+        """
+        Start a new storm, waiting for decoy budget if necessary
+
+        Returns "started", "merged" (into a storm another transaction started
+        while this one waited for budget) or "rejected" (budget exhausted;
+        'future' already holds the error response).
+        """
+        with tracing.span("storm_schedule"):
+            timeline, real_offset = self.mimicry.scheduler.schedule_storm(real_tx_ready=True)
+        minimum = min(MIMICRY_CONFIG["noise_ratio_minimum"], len(timeline))
+        deadline = time.monotonic() + STORM_CONFIG["max_admission_wait"]
+
+        granted = self.reserve_decoys(len(timeline), minimum)
+        while not granted and time.monotonic() < deadline:
+            await asyncio.sleep(0.25)
+            # Another transaction may have started a storm while we waited
+            if self._can_merge():
+                self._merge(self.active, real_tx, future)
+                return "merged"
+            granted = self.reserve_decoys(len(timeline), minimum)
+
+        if not granted:
+            self.stats["storms_rejected"] += 1
+            print("[STORM] Decoy budget exhausted - transaction rejected")
+            future.set_result({
+                "jsonrpc": "2.0",
+                "id": real_tx.get("id", 1),
+                "error": {"code": -32005, "message": "Decoy budget exhausted, retry later"}
+            })
+            return "rejected"
+
+        if granted < len(timeline):
+            timeline = sorted(random.sample(timeline, granted))
+        with tracing.span("storm_generate"):
+            decoys = self.mimicry.generate_decoy_storm(intensity=granted)
+        duration = max(timeline + [real_offset])
+
+        storm = ActiveStorm(
+            started=time.monotonic(),
+            end_offset=duration,
+            density=granted / duration if duration > 0 else 0.0,
+        )
+        for offset, decoy in zip(timeline, decoys):
+            self._push(storm, offset, decoy=decoy)
+        self._push(storm, real_offset, real_tx=real_tx, future=future)
+
+        self.stats["storms_triggered"] += 1
+        print(f"[STORM] {len(decoys)} decoys | Duration: {duration:.2f}s")
+        print(f"[STORM] Real TX will be sent at t+{real_offset:.2f}s")
+
+        self.active = storm
+        self._spawn(self._run(storm))
+        return "started"
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, storm: ActiveStorm):
+        """Dispatch storm events at their offsets until the timeline is empty"""
+        # Spawned from the first transaction's request; its trace must not collect decoy calls
+        tracing.detach()
+        while storm.events:
+            delay = storm.events[0].offset - storm.elapsed()
+            if delay > 0:
+                # Sleep until the next event, or until a merge adds an earlier one
+                storm.wakeup.clear()
+                try:
+                    await asyncio.wait_for(storm.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            event = heapq.heappop(storm.events)
+            metrics.SCHEDULE_JITTER.observe(storm.elapsed() - event.offset)
+            if event.real_tx is not None:
+                storm.real_txs += 1
+                self._spawn(self._send_real(event))
+            else:
+                task = self._spawn(self._send_decoy(storm, event.decoy))
+                storm.decoy_tasks.add(task)
+                task.add_done_callback(storm.decoy_tasks.discard)
+
+        if self.active is storm:
+            self.active = None
+        # Deferred decoys may still be waiting for a rate-limit token
+        if storm.decoy_tasks:
+            await asyncio.wait(set(storm.decoy_tasks))
+        metrics.STORM_DURATION.observe(storm.elapsed())
+        metrics.STORM_SIZE.observe(storm.decoys_sent)
+        if self.journal:
+            self._refill()
+            self.journal.record_storm(
+                storm.started_wall, storm.elapsed(), storm.decoys_sent, storm.real_txs,
+                storm.merges, len(storm.endpoints), self.tokens
+            )
+        print(f"[STORM] Complete in {storm.elapsed():.2f}s")
+        print(f"[STORM] Decoys sent: {storm.decoys_sent} | Throttled: {storm.decoys_throttled} | "
+              f"Real TX: {storm.real_txs}")
+
+    async def _send_decoy(self, storm: ActiveStorm, decoy: DecoyCall):
+        """Send one decoy; only decoys that actually left count toward the storm"""
+        if await self.send_decoy(decoy) is None:
+            storm.decoys_throttled += 1
+            return
+        storm.decoys_sent += 1
+        storm.endpoints.add(decoy.rpc_endpoint)
+        self.stats["decoy_requests"] += 1
+
+    async def _send_real(self, event: StormEvent):
+        """Send a real transaction and resolve the waiting wallet request"""
+        try:
+            response = await self.send_real(event.real_tx)
+        except Exception as e:
+            response = {
+                "jsonrpc": "2.0",
+                "id": event.real_tx.get("id", 1),
+                "error": {"code": -32000, "message": f"Transaction failed: {e}"}
+            }
+        if not event.future.done():
+            event.future.set_result(response)
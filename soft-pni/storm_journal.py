@@ -0,0 +1,255 @@
+"""
+Ghost Protocol - Storm Journal
+Durable append-only record of every storm and real transaction
+
+Proxy stats live in memory and reset on restart. The journal appends one
+small binary record per finished storm and per real-transaction submission
+to rotating files, so weeks of throughput and privacy behaviour can be
+analysed without a database.
+
+File layout: the 4-byte magic b"GSJ1", then records of
+    <u16 payload length><u32 CRC32 of payload><payload>
+where payload[0] is the record type. The reader skips unknown record types
+and stops cleanly at a torn final record (e.g. after a crash mid-write).
+
+Usage: python storm_journal.py <journal directory> [--json]
+"""
+
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Union
+
+from config import JOURNAL_CONFIG
+
+MAGIC = b"GSJ1"
+FILE_SUFFIX = ".gsj"
+RECORD_HEADER = struct.Struct("<HI")
+
+STORM_RECORD = 1
+TX_RECORD = 2
+
+# type, start (unix s), duration (s), decoys, real txs, merges, endpoints, budget left
+STORM_STRUCT = struct.Struct("<BdfHHHHf")
+# type, time (unix s), wait until response (s), outcome, merged
+TX_STRUCT = struct.Struct("<BdfBB")
+
+# "rejected" means refused by the decoy budget; upstream or relay failures
+# (including their own -32005 rate limits) are "error"
+TX_OUTCOMES = ("ok", "error", "rejected")
+
+
+@dataclass
+class StormRecord:
+    started: float
+    duration: float
+    decoys: int
+    real_txs: int
+    merges: int
+    endpoints: int
+    budget_left: float
+
+
+@dataclass
+class TxRecord:
+    time: float
+    wait: float
+    outcome: str
+    merged: bool
+
+
+JournalRecord = Union[StormRecord, TxRecord]
+
+
+def _clamp16(value: int) -> int:
+    return max(0, min(int(value), 0xFFFF))
+
+
+class StormJournal:
+    """
+    Append-only writer with size-based rotation
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._file = None
+        self._size = 0
+        self.records_written = 0
+
+    def _open_new_file(self):
+        self.close()
+        name = f"storms-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}{FILE_SUFFIX}"
+        path = os.path.join(self.directory, name)
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._size = self._file.tell()
+        self._prune()
+
+    def _prune(self):
+        """Delete the oldest files beyond 'max_files' (0 keeps everything)"""
+        keep = JOURNAL_CONFIG["max_files"]
+        if keep <= 0:
+            return
+        files = journal_files(self.directory)
+        for path in files[:-keep]:
+            os.remove(path)
+
+    def _append(self, payload: bytes):
+        if self._file is None or self._size >= JOURNAL_CONFIG["max_file_bytes"]:
+            self._open_new_file()
+        record = RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        self._file.write(record)
+        self._file.flush()
+        if JOURNAL_CONFIG["fsync"]:
+            os.fsync(self._file.fileno())
+        self._size += len(record)
+        self.records_written += 1
+
+    def record_storm(self, started: float, duration: float, decoys: int, real_txs: int,
+                     merges: int, endpoints: int, budget_left: float):
+        """Append a finished storm ('started' is a unix timestamp)"""
+        self._append(STORM_STRUCT.pack(
+            STORM_RECORD, started, duration, _clamp16(decoys), _clamp16(real_txs),
+            _clamp16(merges), _clamp16(endpoints), budget_left
+        ))
+
+    def record_transaction(self, wait: float, outcome: str, merged: bool):
+        """Append a real-transaction submission outcome ('ok', 'error' or 'rejected')"""
+        self._append(TX_STRUCT.pack(
+            TX_RECORD, time.time(), wait, TX_OUTCOMES.index(outcome), int(merged)
+        ))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def open_journal() -> Optional[StormJournal]:
+    """Journal configured by GHOST_JOURNAL_DIR, or None if journaling is off"""
+    if not JOURNAL_CONFIG["directory"]:
+        return None
+    return StormJournal(JOURNAL_CONFIG["directory"])
+
+
+# ----------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------
+
+def journal_files(directory: str) -> List[str]:
+    """Journal files in write order (names start with their creation time)"""
+    names = sorted(n for n in os.listdir(directory) if n.endswith(FILE_SUFFIX))
+    return [os.path.join(directory, n) for n in names]
+
+
+def read_file(path: str) -> Iterator[JournalRecord]:
+    """Decode every intact record of one journal file"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path}: not a storm journal")
+
+    view = memoryview(data)
+    pos = len(MAGIC)
+    end = len(data)
+    while pos + RECORD_HEADER.size <= end:
+        length, crc = RECORD_HEADER.unpack_from(view, pos)
+        start = pos + RECORD_HEADER.size
+        if start + length > end:
+            break  # Torn final record
+        payload = view[start:start + length]
+        pos = start + length
+        if zlib.crc32(payload) != crc:
+            break  # Corrupt tail: nothing after it can be trusted
+        kind = payload[0]
+        if kind == STORM_RECORD and length == STORM_STRUCT.size:
+            yield StormRecord(*STORM_STRUCT.unpack(payload)[1:])
+        elif kind == TX_RECORD and length == TX_STRUCT.size:
+            _, when, wait, outcome, merged = TX_STRUCT.unpack(payload)
+            yield TxRecord(when, wait, TX_OUTCOMES[outcome], bool(merged))
+
+
+def read_journal(path: str) -> Iterator[JournalRecord]:
+    """Records from a journal file or every file of a journal directory, oldest first"""
+    paths = journal_files(path) if os.path.isdir(path) else [path]
+    for file_path in paths:
+        yield from read_file(file_path)
+
+
+def summarize(records: Iterator[JournalRecord]) -> Dict:
+    """Throughput and privacy summary of journal records"""
+    storms = decoys = storm_txs = merges = 0
+    storm_seconds = 0.0
+    tx_outcomes = {outcome: 0 for outcome in TX_OUTCOMES}
+    waits: List[float] = []
+    days: Dict[str, Dict[str, int]] = {}
+    first = last = None
+
+    for record in records:
+        when = record.started if isinstance(record, StormRecord) else record.time
+        first = when if first is None else min(first, when)
+        last = when if last is None else max(last, when)
+        day = days.setdefault(time.strftime("%Y-%m-%d", time.gmtime(when)), {"storms": 0, "transactions": 0})
+
+        if isinstance(record, StormRecord):
+            storms += 1
+            decoys += record.decoys
+            storm_txs += record.real_txs
+            merges += record.merges
+            storm_seconds += record.duration
+            day["storms"] += 1
+        else:
+            tx_outcomes[record.outcome] += 1
+            day["transactions"] += 1
+            if record.outcome == "ok":
+                waits.append(record.wait)
+
+    waits.sort()
+    submitted = sum(tx_outcomes.values())
+    return {
+        "span_hours": round((last - first) / 3600, 2) if first is not None else 0.0,
+        "storms": storms,
+        "decoys": decoys,
+        "transactions": tx_outcomes,
+        "rejection_rate": round(tx_outcomes["rejected"] / submitted, 4) if submitted else 0.0,
+        "noise_ratio": round(decoys / storm_txs, 1) if storm_txs else 0.0,
+        "merge_rate": round(merges / storm_txs, 4) if storm_txs else 0.0,
+        "mean_storm_seconds": round(storm_seconds / storms, 2) if storms else 0.0,
+        "tx_wait_p50": round(waits[len(waits) // 2], 3) if waits else None,
+        "tx_wait_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else None,
+        "per_day": days,
+    }
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args:
+        print("Usage: python storm_journal.py <journal directory or file> [--json]")
+        sys.exit(1)
+
+    summary = summarize(read_journal(args[0]))
+    if "--json" in sys.argv:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"\n{'='*60}")
+    print("GHOST PROTOCOL - STORM JOURNAL")
+    print(f"{'='*60}")
+    print(f"Span: {summary['span_hours']}h | Storms: {summary['storms']} | Decoys: {summary['decoys']}")
+    print(f"Transactions: {summary['transactions']} (rejection rate {summary['rejection_rate']:.2%})")
+    print(f"Noise Ratio: {summary['noise_ratio']}:1 | Merged: {summary['merge_rate']:.2%}")
+    print(f"Mean storm: {summary['mean_storm_seconds']}s | "
+          f"TX wait p50/p95: {summary['tx_wait_p50']}s / {summary['tx_wait_p95']}s")
+    for day, counts in summary["per_day"].items():
+        print(f"  {day}: {counts['storms']} storms, {counts['transactions']} transactions")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test HeadFollower head tracking
+Locally served heads must never go backwards
+"""
+
+from head_follower import HeadFollower
+
+
+def header(number: int, tag: str = "a") -> dict:
+    return {"number": hex(number), "hash": f"0x{tag}{number:x}", "parentHash": f"0x{tag}{number - 1:x}"}
+
+
+async def _never():
+    raise AssertionError("not polled in tests")
+
+
+def make_follower():
+    follower = HeadFollower(_never)
+    seen = []
+    follower.on_new_block(seen.append)
+    return follower, seen
+
+
+def test_lower_header_is_ignored():
+    """A lagging endpoint's older header neither rewinds the head nor fires callbacks"""
+    follower, seen = make_follower()
+    follower.update(header(100))
+    follower.update(header(101))
+    follower.update(header(99))
+    follower.update(header(100))
+    assert follower.number == 101
+    answer = follower.answer({"id": 1, "method": "eth_blockNumber", "params": []})
+    assert answer["result"] == hex(101)
+    assert seen == [100, 101]
+    assert follower.blocks_seen == 2
+    assert follower.behind_headers == 2
+
+
+def test_same_height_new_hash_is_reorg():
+    follower, seen = make_follower()
+    follower.update(header(100))
+    follower.update(header(100))
+    follower.update(header(100, tag="b"))
+    assert seen == [100, 100]
+    assert follower.header["hash"] == header(100, tag="b")["hash"]
+
+
+def test_stale_head_accepts_lower_header():
+    follower, seen = make_follower()
+    follower.update(header(100))
+    follower.updated = float("-inf")  # Long past max_staleness
+    follower.update(header(98))
+    assert follower.number == 98
+    assert seen == [100, 98]
+
+
+def main():
+    for test in (test_lower_header_is_ignored, test_same_height_new_hash_is_reorg,
+                 test_stale_head_accepts_lower_header):
+        test()
+        print(f"✓ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test RPCProxy request classification
+Raw bodies carrying a transaction must never take the raw passthrough
+"""
+
+import asyncio
+import json
+
+from rpc_proxy import RPCProxy
+
+ESCAPED_KEY_BATCH = (
+    b'[{"jsonrpc":"2.0","id":1,"method":"eth_getBalance","params":["0x00","latest"]},'
+    b'{"jsonrpc":"2.0","id":2,"\\u006dethod":"eth_sendRawTransaction","params":["0x00"]}]'
+)
+
+
+def make_proxy() -> RPCProxy:
+    proxy = RPCProxy()
+    routed = []
+
+    async def forward_raw(request, body, methods):
+        routed.append(("raw", methods))
+
+    async def dispatch(rpc_request):
+        routed.append(("dispatch", rpc_request))
+        return {"jsonrpc": "2.0", "id": 1, "result": "0x0"}
+
+    proxy.forward_raw = forward_raw
+    proxy.dispatch = dispatch
+    proxy.routed = routed
+    return proxy
+
+
+def test_escaped_method_key_in_batch():
+    """An escaped "method" key inside a batch is still seen as a transaction"""
+    proxy = make_proxy()
+    methods = proxy.peek_methods(ESCAPED_KEY_BATCH)
+    assert methods == ["eth_getBalance", "eth_sendRawTransaction"], methods
+    assert proxy.needs_decoding(methods, ESCAPED_KEY_BATCH)
+
+    asyncio.run(proxy.route_http_body(None, ESCAPED_KEY_BATCH))
+    assert [route for route, _ in proxy.routed] == ["dispatch"], proxy.routed
+    assert proxy.routed[0][1] == json.loads(ESCAPED_KEY_BATCH)
+
+
+def test_escaped_method_name():
+    proxy = make_proxy()
+    body = b'{"jsonrpc":"2.0","id":1,"method":"eth_send\\u0052awTransaction","params":["0x00"]}'
+    assert proxy.peek_methods(body) == ["eth_sendRawTransaction"]
+
+
+def test_plain_reads_stay_raw():
+    proxy = make_proxy()
+    body = b'{"jsonrpc":"2.0","id":1,"method":"eth_getBalance","params":["0x00","latest"]}'
+    asyncio.run(proxy.route_http_body(None, body))
+    assert proxy.routed == [("raw", ["eth_getBalance"])], proxy.routed
+
+
+def main():
+    for test in (test_escaped_method_key_in_batch, test_escaped_method_name, test_plain_reads_stay_raw):
+        test()
+        print(f"✓ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test TxPrepCache raw transaction decoding
+Malformed raw transactions must be rejected as undecodable, never crash
+"""
+
+import rlp
+from eth_account import Account
+
+import tx_prep_cache
+from tx_prep_cache import TxPrepCache, decode_raw_transaction
+
+TO = "0x" + "11" * 20
+
+
+def signed_raw(nonce: int) -> tuple:
+    account = Account.create()
+    signed = account.sign_transaction({
+        "nonce": nonce, "gasPrice": 1, "gas": 21000, "to": TO,
+        "value": 0, "data": b"", "chainId": 11155111,
+    })
+    raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+    return account.address.lower(), "0x" + bytes(raw).hex()
+
+
+def test_decodes_legacy_transaction():
+    sender, raw = signed_raw(7)
+    assert decode_raw_transaction(raw) == (sender, 7)
+
+
+def test_list_nonce_is_undecodable():
+    """A nonce field holding a list is a ValueError, not a TypeError"""
+    legacy = rlp.encode([[b"\x01"], 1, 21000, bytes.fromhex(TO[2:]), 0, b"", 27, 1, 1])
+    typed = b"\x02" + rlp.encode([11155111, [b"\x01"], 1, 1, 21000, bytes.fromhex(TO[2:]), 0, b"", [], 0, 1, 1])
+    # Let signature recovery pass so only the nonce field is malformed
+    recover = tx_prep_cache.Account.recover_transaction
+    tx_prep_cache.Account.recover_transaction = staticmethod(lambda raw: TO)
+    try:
+        for raw in (legacy, typed):
+            try:
+                decode_raw_transaction("0x" + raw.hex())
+            except ValueError:
+                continue
+            raise AssertionError(f"accepted malformed transaction {raw.hex()}")
+    finally:
+        tx_prep_cache.Account.recover_transaction = recover
+
+
+def test_blob_network_form():
+    """Blob transactions sent as [tx, blobs, commitments, proofs] decode the inner nonce"""
+    body = [11155111, 9, 1, 1, 21000, bytes.fromhex(TO[2:]), 0, b"", [], 1, [], 0, 1, 1]
+    raw = b"\x03" + rlp.encode([body, [b"\x00" * 4], [b"\x00" * 48], [b"\x00" * 48]])
+    recover = tx_prep_cache.Account.recover_transaction
+    tx_prep_cache.Account.recover_transaction = staticmethod(lambda raw: TO)
+    try:
+        assert decode_raw_transaction("0x" + raw.hex()) == (TO, 9)
+    finally:
+        tx_prep_cache.Account.recover_transaction = recover
+
+
+def test_record_transaction_ignores_malformed_input():
+    cache = TxPrepCache()
+    legacy = rlp.encode([[b"\x01"], 1, 21000, bytes.fromhex(TO[2:]), 0, b"", 27, 1, 1])
+    for raw in ("0x" + legacy.hex(), "0xzz", "0x"):
+        cache.record_transaction({"method": "eth_sendRawTransaction", "params": [raw]}, {"result": "0x1"})
+    assert cache.nonces == {}
+
+
+def main():
+    for test in (test_decodes_legacy_transaction, test_list_nonce_is_undecodable, test_blob_network_form,
+                 test_record_transaction_ignores_malformed_input):
+        test()
+        print(f"✓ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
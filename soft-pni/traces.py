@@ -0,0 +1,186 @@
+"""
+Ghost Protocol - Traffic Traces
+Columnar capture files the validator can analyze via memory mapping
+
+A trace is an uncompressed .npz (np.savez) holding one array per column,
+one row per observed RPC call, sorted by time:
+
+    timestamp   float64   unix seconds (required)
+    is_real     int8      1 for real user traffic, 0 for decoys (required)
+    endpoint    int32     code into 'endpoint_names'
+    function    int32     code into 'function_names'
+    contract    int32     code into 'contract_names'
+    gas         int64     gas estimate
+
+Missing optional columns read as zeros. Members of an uncompressed zip
+are contiguous .npy files, so open_trace() maps each column straight from
+disk with np.memmap: multi-gigabyte traces are analyzed chunk by chunk
+without loading them.
+
+Usage:
+    python traces.py info <trace.npz>
+    python traces.py convert <calls.csv> <trace.npz>
+CSV input has a header naming the columns above, with endpoint, function
+and contract given as strings (e.g. exported from a packet capture).
+"""
+
+import csv
+import os
+import struct
+import sys
+import zipfile
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+COLUMNS = {
+    "timestamp": np.float64,
+    "is_real": np.int8,
+    "endpoint": np.int32,
+    "function": np.int32,
+    "contract": np.int32,
+    "gas": np.int64,
+}
+CATEGORICAL = ("endpoint", "function", "contract")
+REQUIRED = ("timestamp", "is_real")
+
+# Rows per chunk when streaming a trace through the analyzers
+CHUNK_ROWS = 1 << 20
+
+_LOCAL_HEADER = struct.Struct("<4s5H3I2H")
+
+
+class Trace:
+    """
+    Read-only columns of a trace file, memory-mapped
+    """
+
+    def __init__(self, path: str, columns: Dict[str, np.ndarray], labels: Dict[str, List[str]]):
+        self.path = path
+        self.columns = columns
+        self.labels = labels
+        self.rows = len(columns["timestamp"])
+
+    def column(self, name: str) -> np.ndarray:
+        """A column, or read-only zeros (no memory) if the trace lacks it"""
+        if name in self.columns:
+            return self.columns[name]
+        return np.broadcast_to(np.zeros(1, dtype=COLUMNS[name]), (self.rows,))
+
+    def chunks(self, rows: int = CHUNK_ROWS) -> Iterator[Tuple[int, int]]:
+        """(start, stop) row ranges covering the trace"""
+        for start in range(0, self.rows, rows):
+            yield start, min(self.rows, start + rows)
+
+    def __len__(self) -> int:
+        return self.rows
+
+
+def _map_member(path: str, info: zipfile.ZipInfo) -> np.ndarray:
+    """np.memmap of one stored .npy member of an .npz"""
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"{path}: compressed traces cannot be memory-mapped (save with np.savez)")
+    with open(path, "rb") as f:
+        f.seek(info.header_offset)
+        fields = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+        name_length, extra_length = fields[-2], fields[-1]
+        f.seek(info.header_offset + _LOCAL_HEADER.size + name_length + extra_length)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if dtype.hasobject:
+        raise ValueError(f"{path}: object arrays cannot be memory-mapped")
+    if shape == (0,):
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape, offset=offset,
+                     order="F" if fortran_order else "C")
+
+
+def open_trace(path: str) -> Trace:
+    """Memory-map the columns of a trace file"""
+    columns: Dict[str, np.ndarray] = {}
+    labels: Dict[str, List[str]] = {}
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if name in COLUMNS:
+                columns[name] = _map_member(path, info)
+            elif name.endswith("_names") and name[:-6] in CATEGORICAL:
+                with archive.open(info) as member:
+                    labels[name[:-6]] = [str(v) for v in np.lib.format.read_array(member)]
+
+    for name in REQUIRED:
+        if name not in columns:
+            raise ValueError(f"{path}: trace has no '{name}' column")
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) != 1:
+        raise ValueError(f"{path}: columns have different lengths")
+    return Trace(path, columns, labels)
+
+
+def save_trace(path: str, labels: Optional[Dict[str, List[str]]] = None, **columns: np.ndarray):
+    """Write columns (sorted by timestamp) as an uncompressed trace file"""
+    for name in REQUIRED:
+        if name not in columns:
+            raise ValueError(f"trace needs a '{name}' column")
+    unknown = set(columns) - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown trace columns: {sorted(unknown)}")
+
+    order = np.argsort(columns["timestamp"], kind="stable")
+    arrays = {name: np.asarray(values, dtype=COLUMNS[name])[order] for name, values in columns.items()}
+    for name, names in (labels or {}).items():
+        arrays[f"{name}_names"] = np.array(names, dtype=str)
+    np.savez(path, **arrays)
+
+
+def convert_csv(csv_path: str, trace_path: str) -> int:
+    """Convert a CSV of calls to a trace file; returns the number of rows"""
+    data = {name: array("d") for name in COLUMNS}
+    vocab: Dict[str, Dict[str, int]] = {name: {} for name in CATEGORICAL}
+    with open(csv_path, newline="") as f:
+        reader = csv.DictReader(f)
+        present = [name for name in COLUMNS if name in (reader.fieldnames or [])]
+        for row in reader:
+            for name in present:
+                value = row[name]
+                if name in CATEGORICAL:
+                    value = vocab[name].setdefault(value, len(vocab[name]))
+                elif name == "is_real":
+                    value = value.strip().lower() in ("1", "true", "yes")
+                data[name].append(float(value))
+
+    save_trace(
+        trace_path,
+        labels={name: list(vocab[name]) for name in CATEGORICAL if name in present},
+        **{name: np.frombuffer(data[name]) for name in present}
+    )
+    return len(data["timestamp"])
+
+
+def main():
+    if len(sys.argv) >= 3 and sys.argv[1] == "info":
+        trace = open_trace(sys.argv[2])
+        timestamps = trace.column("timestamp")
+        real = int(np.count_nonzero(trace.column("is_real")))
+        print(f"{trace.path}: {len(trace):,} rows ({real:,} real), "
+              f"{os.path.getsize(trace.path) / 1e6:,.1f} MB")
+        if len(trace):
+            print(f"  span: {timestamps[-1] - timestamps[0]:,.0f}s")
+        print(f"  columns: {', '.join(trace.columns)}")
+        for name, names in trace.labels.items():
+            print(f"  {name}: {len(names)} distinct")
+    elif len(sys.argv) >= 4 and sys.argv[1] == "convert":
+        rows = convert_csv(sys.argv[2], sys.argv[3])
+        print(f"[Traces] Wrote {rows:,} rows to {sys.argv[3]}")
+    else:
+        print("Usage: python traces.py info <trace.npz> | convert <calls.csv> <trace.npz>")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
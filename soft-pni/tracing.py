@@ -0,0 +1,171 @@
+"""
+Ghost Protocol - Request Tracing
+Sampled per-request stage timings for the proxy hot path
+
+A sampled request carries a Trace in a context variable, so any component
+on its call path (dispatch, storm coordinator, upstream calls) can record a
+stage with `with tracing.span("upstream"):` without extra plumbing. Spans use
+the monotonic clock; unsampled requests get a shared no-op span.
+
+Finished traces feed a rolling per-stage summary (served at GET /traces)
+and are optionally appended to a JSON-lines file for offline analysis.
+"""
+
+import json
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from config import TRACE_CONFIG
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("ghost_trace", default=None)
+
+
+class Trace:
+    """Stage spans of one sampled request"""
+    __slots__ = ("transport", "method", "started", "wall_time", "total", "spans", "token")
+
+    def __init__(self, transport: str):
+        self.transport = transport
+        self.method = ""
+        self.started = time.monotonic()
+        self.wall_time = time.time()
+        self.total = 0.0
+        self.spans: List[tuple] = []    # (stage, offset, duration) in seconds
+        self.token = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "time": round(self.wall_time, 6),
+            "transport": self.transport,
+            "method": self.method,
+            "total_ms": round(self.total * 1000, 3),
+            "spans": [
+                {"stage": stage, "offset_ms": round(offset * 1000, 3), "ms": round(duration * 1000, 3)}
+                for stage, offset, duration in self.spans
+            ],
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "stage", "start")
+
+    def __init__(self, trace: Trace, stage: str):
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.monotonic()
+        self.trace.spans.append((self.stage, self.start - self.trace.started, end - self.start))
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(stage: str):
+    """Context manager timing 'stage' on the current request's trace (if sampled)"""
+    trace = _current.get()
+    if trace is None:
+        return _NULL_SPAN
+    return _Span(trace, stage)
+
+
+def detach():
+    """Stop recording into the inherited trace (for background tasks outliving a request)"""
+    _current.set(None)
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Tracer:
+    """
+    Samples requests, keeps recent traces and exports them
+    """
+
+    def __init__(self):
+        self.recent: deque = deque(maxlen=TRACE_CONFIG["summary_window"])
+        self.sampled = 0
+        self._file = None
+
+    def start(self, transport: str) -> Optional[Trace]:
+        """Begin tracing the current request, or return None if not sampled"""
+        if not TRACE_CONFIG["enabled"] or random.random() >= TRACE_CONFIG["sample_rate"]:
+            return None
+        trace = Trace(transport)
+        trace.token = _current.set(trace)
+        return trace
+
+    def finish(self, trace: Optional[Trace], method: str):
+        """Close a trace started with start() and export it"""
+        if trace is None:
+            return
+        trace.total = time.monotonic() - trace.started
+        trace.method = method
+        _current.reset(trace.token)
+        self.sampled += 1
+        self.recent.append(trace)
+
+        path = TRACE_CONFIG["jsonl_path"]
+        if path:
+            if self._file is None:
+                self._file = open(path, "a", buffering=1)
+            self._file.write(json.dumps(trace.to_dict()) + "\n")
+
+    def summary(self) -> Dict:
+        """Per-stage latency distribution over the recent traces"""
+        stages: Dict[str, List[float]] = {"total": []}
+        methods: Dict[str, int] = {}
+        for trace in self.recent:
+            stages["total"].append(trace.total)
+            methods[trace.method] = methods.get(trace.method, 0) + 1
+            for stage, _, duration in trace.spans:
+                stages.setdefault(stage, []).append(duration)
+
+        summary = {}
+        for stage, durations in stages.items():
+            if not durations:
+                continue
+            ordered = sorted(durations)
+            summary[stage] = {
+                "count": len(ordered),
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+                "p50_ms": round(_percentile(ordered, 50) * 1000, 3),
+                "p95_ms": round(_percentile(ordered, 95) * 1000, 3),
+                "p99_ms": round(_percentile(ordered, 99) * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3),
+            }
+        return {
+            "enabled": TRACE_CONFIG["enabled"],
+            "sample_rate": TRACE_CONFIG["sample_rate"],
+            "sampled_total": self.sampled,
+            "window": len(self.recent),
+            "methods": methods,
+            "stages": summary,
+        }
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+TRACER = Tracer()
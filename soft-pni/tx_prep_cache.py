@@ -0,0 +1,162 @@
+"""
+Ghost Protocol - Transaction Preparation Cache
+Answers nonce and gas queries locally while a wallet prepares a send
+
+Wallets call eth_getTransactionCount(addr, "pending"), eth_gasPrice,
+eth_maxPriorityFeePerGas, eth_feeHistory and eth_estimateGas before every
+transaction. This cache:
+  - tracks the pending nonce per address, incrementing it locally when
+    the proxy forwards a raw transaction from that address
+  - keeps gas price / fee history / gas estimate answers for about one
+    block, dropping them when a new block is seen
+"""
+
+import json
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import rlp
+from eth_account import Account
+
+from config import TX_CACHE_CONFIG
+import metrics
+
+GAS_METHODS = frozenset({
+    "eth_gasPrice", "eth_maxPriorityFeePerGas", "eth_feeHistory", "eth_estimateGas",
+})
+CACHEABLE_METHODS = GAS_METHODS | {"eth_getTransactionCount"}
+
+
+def decode_raw_transaction(raw_tx: str) -> Tuple[str, int]:
+    """
+    Return (sender, nonce) for a signed raw transaction
+
+    Handles legacy and typed (EIP-2718) envelopes; raises ValueError if
+    the payload cannot be decoded.
+    """
+    try:
+        raw = bytes.fromhex(raw_tx[2:] if raw_tx.startswith("0x") else raw_tx)
+        if raw and raw[0] < 0x7f:
+            fields = rlp.decode(raw[1:])
+            if fields and isinstance(fields[0], list):
+                fields = fields[0]            # Blob network form: [tx, blobs, commitments, proofs]
+            nonce = fields[1]                 # [chainId, nonce, ...]
+        else:
+            nonce = rlp.decode(raw)[0]        # [nonce, gasPrice, ...]
+        # A malformed envelope can carry a list where the nonce should be
+        nonce = int.from_bytes(nonce, "big")
+        sender = Account.recover_transaction(raw)
+    except Exception as e:
+        raise ValueError(f"undecodable raw transaction: {e}")
+    return sender.lower(), nonce
+
+
+class TxPrepCache:
+    """
+    Pending-nonce tracker plus a per-block gas answer cache
+    """
+
+    def __init__(self, track_nonces: bool = True):
+        # Off when several worker processes proxy for the same wallets: a nonce
+        # advanced by one worker would be invisible to the others
+        self.track_nonces = track_nonces
+        self.methods = CACHEABLE_METHODS if track_nonces else GAS_METHODS
+        self.nonces: Dict[str, Tuple[int, float, bool]] = {}    # address -> (next nonce, updated, local)
+        self.gas: Dict[str, Tuple[Any, float]] = {}             # request key -> (result, stored)
+
+    @staticmethod
+    def gas_key(method: str, params) -> str:
+        return method + json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+    def handles(self, method: str, params) -> bool:
+        """Whether a request is answered from (or stored into) this cache"""
+        if method in GAS_METHODS:
+            return True
+        return self.track_nonces and method == "eth_getTransactionCount" and \
+            isinstance(params, list) and len(params) >= 2 and params[1] == "pending"
+
+    def lookup(self, rpc_request: Dict) -> Optional[Dict]:
+        """Return a cached JSON-RPC response for the request, or None"""
+        method = rpc_request.get("method", "")
+        params = rpc_request.get("params", [])
+        now = time.monotonic()
+        result = None
+
+        if method == "eth_getTransactionCount":
+            entry = self.nonces.get(str(params[0]).lower())
+            if entry and now - entry[1] < TX_CACHE_CONFIG["nonce_ttl"]:
+                result = hex(entry[0])
+            metrics.record_cache("nonce", hit=result is not None)
+        else:
+            entry = self.gas.get(self.gas_key(method, params))
+            if entry and now - entry[1] < TX_CACHE_CONFIG["gas_ttl"]:
+                result = entry[0]
+            metrics.record_cache("gas", hit=result is not None)
+
+        if result is None:
+            return None
+        return {"jsonrpc": "2.0", "id": rpc_request.get("id", 1), "result": result}
+
+    def store(self, rpc_request: Dict, response: Dict):
+        """Remember a successful upstream answer"""
+        if "result" not in response:
+            return
+        method = rpc_request.get("method", "")
+        params = rpc_request.get("params", [])
+
+        if method == "eth_getTransactionCount":
+            address = str(params[0]).lower()
+            upstream = int(response["result"], 16)
+            now = time.monotonic()
+            entry = self.nonces.get(address)
+            # A transaction we just forwarded may not be in the upstream pending
+            # pool yet; past the TTL a lower answer means it was dropped or replaced
+            if entry and entry[2] and now - entry[1] < TX_CACHE_CONFIG["nonce_ttl"] \
+                    and entry[0] > upstream:
+                return
+            self.nonces[address] = (upstream, now, False)
+        else:
+            self.gas[self.gas_key(method, params)] = (response["result"], time.monotonic())
+
+    def store_gas(self, key: str, result: Any, age: float = 0.0):
+        """Remember a gas answer that was fetched 'age' seconds ago (e.g. by another worker)"""
+        self.gas[key] = (result, time.monotonic() - age)
+
+    def record_transaction(self, rpc_request: Dict, response: Dict):
+        """Advance the sender's pending nonce after a transaction was accepted"""
+        if not self.track_nonces or "result" not in response:
+            return
+        method = rpc_request.get("method", "")
+        params = rpc_request.get("params", [])
+        if not params:
+            return
+        now = time.monotonic()
+
+        if method == "eth_sendRawTransaction":
+            try:
+                sender, nonce = decode_raw_transaction(params[0])
+            except ValueError:
+                return
+        elif method == "eth_sendTransaction" and isinstance(params[0], dict) and "from" in params[0]:
+            sender = params[0]["from"].lower()
+            entry = self.nonces.get(sender)
+            if "nonce" in params[0]:
+                nonce = int(params[0]["nonce"], 16)
+            elif entry:
+                nonce = entry[0]
+            else:
+                return
+        else:
+            return
+
+        entry = self.nonces.get(sender)
+        if entry and now - entry[1] < TX_CACHE_CONFIG["nonce_ttl"]:
+            nonce = max(entry[0] - 1, nonce)
+        self.nonces[sender] = (nonce + 1, now, True)
+
+    def invalidate_block(self):
+        """Drop per-block gas answers (call when a new block is seen)"""
+        self.gas.clear()
+
+    def snapshot(self) -> Dict:
+        return {"tracked_addresses": len(self.nonces), "gas_entries": len(self.gas)}
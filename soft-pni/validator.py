@@ -1,23 +1,37 @@
 """
 Ghost Protocol - Validation Framework
 Tests the effectiveness of decoy camouflage against various observer techniques
+
+Two modes:
+  - wall-clock: run_validation_suite() drives the engine in real time
+  - simulation: run_simulation() replays the same engine logic on a virtual
+    clock (discrete-event), so a simulated day validates in seconds
 """
 
 import time
 import asyncio
 import aiohttp
+import heapq
+import itertools
+import math
 import requests
 import numpy as np
 import random
 import secrets
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
 from dataclasses import dataclass
-from collections import defaultdict
+from collections import deque
 import statistics
+from array import array
 
+from adversary import Observations, cross_validate
+import anonymity
+import spectral
+from reports import build_document, write_document
+from traces import open_trace, save_trace
 from config import (
     Network, DEFAULT_NETWORK, get_etherscan_api, ETHERSCAN_API_KEY,
-    VALIDATION_CONFIG
+    MIMICRY_CONFIG, VALIDATION_CONFIG
 )
 from mimicry_engine import MimicryEngine, DecoyCall
 
@@ -32,95 +46,367 @@ class Transaction:
     is_real: bool  # Ground truth for validation
 
 
+# Simulated clock start for seeded runs (2023-11-14 00:00 UTC): wall-clock
+# starts would shift the clustering window boundaries from run to run
+SIMULATION_EPOCH = 1_699_920_000.0
+
+
+class VirtualClock:
+    """
+    Discrete-event scheduler on simulated time
+
+    Events run in timestamp order (FIFO for equal times) as fast as the CPU
+    allows; 'now' jumps to each event's time as it is processed.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self._events: List[Tuple[float, int, Callable, tuple]] = []
+        self._seq = itertools.count()
+        self.processed = 0
+
+    def schedule(self, delay: float, callback: Callable, *args):
+        """Run callback(*args) 'delay' simulated seconds from now"""
+        heapq.heappush(self._events, (self.now + max(0.0, delay), next(self._seq), callback, args))
+
+    def run_until(self, end_time: float):
+        """Process events up to and including 'end_time'"""
+        while self._events and self._events[0][0] <= end_time:
+            when, _, callback, args = heapq.heappop(self._events)
+            self.now = when
+            callback(*args)
+            self.processed += 1
+        self.now = max(self.now, end_time)
+
+
+def random_hex(num_bytes: int, seeded: bool = False) -> str:
+    """0x-prefixed random hex; 'seeded' draws from the (reproducible) random module"""
+    if seeded:
+        return f"0x{random.getrandbits(num_bytes * 8):0{num_bytes * 2}x}"
+    return f"0x{secrets.token_hex(num_bytes)}"
+
+
+class GrowableArray:
+    """
+    Append-only NumPy column that doubles its capacity when full
+    """
+    
+    def __init__(self, dtype=np.float64, capacity: int = 1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._size = 0
+    
+    def _reserve(self, size: int):
+        if size > len(self._data):
+            grown = np.empty(max(size, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+    
+    def append(self, value):
+        self._reserve(self._size + 1)
+        self._data[self._size] = value
+        self._size += 1
+    
+    def extend(self, values: np.ndarray):
+        self._reserve(self._size + len(values))
+        self._data[self._size:self._size + len(values)] = values
+        self._size += len(values)
+    
+    def view(self) -> np.ndarray:
+        """The filled part of the column (no copy)"""
+        return self._data[:self._size]
+    
+    def __getitem__(self, index: int):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        return self._data[index]
+    
+    def __len__(self) -> int:
+        return self._size
+
+
+class RunningStats:
+    """Welford's online mean and variance"""
+    __slots__ = ("count", "mean", "m2")
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+    
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+    
+    def add_many(self, values: np.ndarray):
+        """Add an array of values at once (Chan et al. pairwise update)"""
+        n = len(values)
+        if n == 0:
+            return
+        mean = float(values.mean())
+        m2 = float(np.square(values - mean).sum())
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+    
+    @property
+    def std(self) -> float:
+        """Population standard deviation"""
+        return (self.m2 / self.count) ** 0.5 if self.count else 0.0
+
+
 class TimingAnalyzer:
     """
     Detects timing patterns that could link transactions to specific users
+    
+    Event times live in one NumPy column per stream (8 bytes per event);
+    interval statistics and the real/decoy interval co-moments are updated
+    as events arrive and cost O(1) to read. Periodicity and real/decoy
+    leakage come from FFTs over binned counts (spectral.py).
     """
     
     def __init__(self):
-        self.tx_timestamps = []
+        self.times = {True: GrowableArray(), False: GrowableArray()}  # is_real -> times
+        self.intervals = RunningStats()     # Gaps between consecutive events of either kind
+        self._last_time: Optional[float] = None
+        # Sums over the k-th real interval paired with the k-th decoy interval
+        self._interval_sum = {True: 0.0, False: 0.0}
+        self._interval_sq = {True: 0.0, False: 0.0}
+        self._cross = 0.0
     
     def add_transaction(self, tx: Transaction):
         """Record transaction timestamp"""
-        self.tx_timestamps.append((tx.timestamp, tx.is_real))
+        self.add_event(tx.timestamp, tx.is_real)
+    
+    def add_event(self, timestamp: float, is_real: bool):
+        """Record one event and update the running statistics"""
+        times = self.times[is_real]
+        if len(times):
+            interval = timestamp - times[-1]
+            self._interval_sum[is_real] += interval
+            self._interval_sq[is_real] += interval * interval
+            # Pair with the other stream's interval at the same index, if it has one
+            index = len(times) - 1
+            other = self.times[not is_real]
+            if index + 1 < len(other):
+                self._cross += interval * (other[index + 1] - other[index])
+        times.append(timestamp)
+        
+        if self._last_time is not None:
+            self.intervals.add(timestamp - self._last_time)
+        self._last_time = timestamp
+    
+    def add_events(self, timestamps: np.ndarray, is_real: np.ndarray):
+        """Bulk add_event() for time-ordered arrays, e.g. a chunk of a trace"""
+        if not len(timestamps):
+            return
+        previous = [] if self._last_time is None else [self._last_time]
+        self.intervals.add_many(np.diff(np.concatenate((previous, timestamps))))
+        self._last_time = float(timestamps[-1])
+        
+        # Real first: its new intervals pair with decoy intervals from earlier
+        # chunks, then new decoy intervals pair with every real interval, so
+        # each (k-th real, k-th decoy) pair is counted exactly once
+        for stream in (True, False):
+            new = timestamps[is_real == stream]
+            if not len(new):
+                continue
+            times = self.times[stream]
+            first = max(len(times) - 1, 0)      # Index of the first new interval
+            previous = [times[-1]] if len(times) else []
+            intervals = np.diff(np.concatenate((previous, new)))
+            times.extend(new)
+            self._interval_sum[stream] += float(intervals.sum())
+            self._interval_sq[stream] += float(np.dot(intervals, intervals))
+            
+            other = self.times[not stream].view()
+            paired = min(len(intervals), max(0, len(other) - 1 - first))
+            if paired:
+                self._cross += float(np.dot(intervals[:paired], np.diff(other[first:first + paired + 1])))
     
     def calculate_correlation(self) -> float:
         """
-        Calculate temporal correlation between real and decoy transactions
+        Correlation between real and decoy inter-arrival intervals
         
-        Returns: Pearson correlation coefficient (target: < 0.1)
+        Reported as 'interval_correlation'; the k-th real interval is paired with the k-th decoy interval; the
+        shorter sequence counts as zeros beyond its end.
+        
+        Returns: Pearson correlation coefficient
         """
-        if len(self.tx_timestamps) < 2:
+        real_count, decoy_count = len(self.times[True]), len(self.times[False])
+        if real_count == 0 or decoy_count == 0:
             return 0.0
         
-        real_times = [t for t, is_real in self.tx_timestamps if is_real]
-        decoy_times = [t for t, is_real in self.tx_timestamps if not is_real]
-        
-        if not real_times or not decoy_times:
+        pairs = max(real_count - 1, decoy_count - 1, 1)
+        sum_r, sum_d = self._interval_sum[True], self._interval_sum[False]
+        var_r = pairs * self._interval_sq[True] - sum_r * sum_r
+        var_d = pairs * self._interval_sq[False] - sum_d * sum_d
+        # Constant interval sequences have (numerically) zero variance
+        if var_r <= 1e-12 * pairs * self._interval_sq[True] or \
+                var_d <= 1e-12 * pairs * self._interval_sq[False]:
             return 0.0
         
-        # Calculate time intervals
-        real_intervals = np.diff(real_times) if len(real_times) > 1 else [0]
-        decoy_intervals = np.diff(decoy_times) if len(decoy_times) > 1 else [0]
-        
-        # If lengths differ, pad the shorter one
-        max_len = max(len(real_intervals), len(decoy_intervals))
-        real_intervals = np.pad(real_intervals, (0, max_len - len(real_intervals)))
-        decoy_intervals = np.pad(decoy_intervals, (0, max_len - len(decoy_intervals)))
-        
-        # Pearson correlation
-        if np.std(real_intervals) == 0 or np.std(decoy_intervals) == 0:
-            return 0.0
-        
-        correlation = np.corrcoef(real_intervals, decoy_intervals)[0, 1]
-        return abs(correlation)
+        correlation = (pairs * self._cross - sum_r * sum_d) / np.sqrt(var_r * var_d)
+        return abs(float(correlation))
     
-    def detect_periodic_patterns(self) -> bool:
+    def spectral_report(self) -> Dict:
+        """FFT periodicity and real/decoy cross-correlation (spectral.py), O(n + B log B)"""
+        return spectral.analyze(self.times[True].view(), self.times[False].view())
+    
+    def detect_periodic_patterns(self, spectral_report: Optional[Dict] = None) -> bool:
         """
         Detect if transactions follow periodic patterns (bad for anonymity)
         """
-        if len(self.tx_timestamps) < 10:
-            return False
-        
-        times = [t for t, _ in self.tx_timestamps]
-        intervals = np.diff(times)
-        
-        # Check if standard deviation is suspiciously low (periodic)
-        mean_interval = np.mean(intervals)
-        std_interval = np.std(intervals)
-        
-        # Coefficient of variation < 0.3 suggests periodicity
-        if mean_interval > 0:
-            cv = std_interval / mean_interval
-            return cv < 0.3
-        
-        return False
+        spectral_report = spectral_report or self.spectral_report()
+        return spectral_report["periodicity"] >= VALIDATION_CONFIG["periodicity_threshold"]
     
     def generate_report(self) -> Dict:
         """Generate timing analysis report"""
-        correlation = self.calculate_correlation()
-        periodic = self.detect_periodic_patterns()
+        spectral_report = self.spectral_report()
+        # Largest real/decoy count correlation at any lag
+        correlation = spectral_report["cross_correlation"]
+        periodic = self.detect_periodic_patterns(spectral_report)
+        real_count = len(self.times[True])
         
         return {
             "timing_correlation": correlation,
+            "leak_lag_seconds": spectral_report["leak_lag_seconds"],
             "is_periodic": periodic,
-            "total_transactions": len(self.tx_timestamps),
-            "real_tx_count": sum(1 for _, is_real in self.tx_timestamps if is_real),
+            "period_seconds": spectral_report["period_seconds"],
+            "periodicity": spectral_report["periodicity"],
+            "interval_correlation": self.calculate_correlation(),
+            "total_transactions": real_count + len(self.times[False]),
+            "real_tx_count": real_count,
+            "mean_interval": self.intervals.mean,
+            "interval_cv": self.intervals.std / self.intervals.mean if self.intervals.mean > 0 else 0.0,
             "passed": correlation < VALIDATION_CONFIG["timing_correlation_threshold"] and not periodic
         }
 
 
+class EndpointCounts:
+    """
+    Per-endpoint call counters with O(1) entropy and clustering updates
+    
+    Entropy uses H = log2(N) - (1/N) * sum(c * log2(c)), keeping the sum
+    current as each count grows.
+    """
+    __slots__ = ("counts", "total", "real", "suspicious", "_c_log_c")
+    
+    def __init__(self):
+        self.counts: Dict[str, List[int]] = {}  # endpoint -> [calls, real calls]
+        self.total = 0
+        self.real = 0
+        self.suspicious = 0                      # endpoints that carried only real calls
+        self._c_log_c = 0.0
+    
+    def add(self, endpoint: str, is_real: bool, calls: int = 1):
+        """Count 'calls' calls to 'endpoint', all real or all decoy"""
+        self.add_many(endpoint, calls, calls if is_real else 0)
+    
+    def add_many(self, endpoint: str, calls: int, real: int):
+        """Count 'calls' calls to 'endpoint', 'real' of them real"""
+        counts = self.counts.get(endpoint)
+        if counts is None:
+            counts = self.counts[endpoint] = [0, 0]
+        was_suspicious = counts[0] > 0 and counts[1] == counts[0]
+        
+        c = counts[0]
+        self._c_log_c += (c + calls) * math.log2(c + calls) - (c * math.log2(c) if c else 0.0)
+        counts[0] += calls
+        counts[1] += real
+        self.total += calls
+        self.real += real
+        self.suspicious += (counts[1] == counts[0]) - was_suspicious
+    
+    def normalized_entropy(self) -> float:
+        """Entropy of the endpoint distribution divided by its maximum (1.0 = uniform)"""
+        if self.total == 0 or len(self.counts) < 2:
+            return 0.0
+        entropy = math.log2(self.total) - self._c_log_c / self.total
+        return max(0.0, entropy) / math.log2(len(self.counts))
+
+
 class IPClusteringDetector:
     """
     Simulates an adversary trying to cluster transactions by RPC endpoint/IP
+    
+    Only counters are kept (per endpoint, overall and for a bounded number
+    of closed time windows), so memory is constant however long it runs.
     """
     
     def __init__(self):
-        self.endpoint_usage = defaultdict(list)  # endpoint -> [tx_hash]
+        self.overall = EndpointCounts()
+        self.window_seconds = VALIDATION_CONFIG["clustering_window_seconds"]
+        self.window_start: Optional[float] = None
+        self.window = EndpointCounts()
+        self.windows = deque(maxlen=VALIDATION_CONFIG["clustering_windows_kept"])
     
-    def record_call(self, tx_hash: str, endpoint: str, is_real: bool):
+    def record_call(self, tx_hash: str, endpoint: str, is_real: bool,
+                    timestamp: Optional[float] = None):
         """Record which endpoint was used for a transaction"""
-        self.endpoint_usage[endpoint].append((tx_hash, is_real))
+        self.overall.add(endpoint, is_real)
+        
+        timestamp = time.time() if timestamp is None else timestamp
+        self._enter_window(timestamp - timestamp % self.window_seconds)
+        self.window.add(endpoint, is_real)
+    
+    def record_calls(self, endpoints: np.ndarray, is_real: np.ndarray, timestamps: np.ndarray,
+                     names: Optional[List[str]] = None):
+        """
+        Bulk record_call() for time-ordered arrays of endpoint codes
+        ('names[code]' is the endpoint, or the code itself without names)
+        """
+        label = names.__getitem__ if names else str
+        windows = (timestamps // self.window_seconds).astype(np.int64)
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(windows)) + 1, [len(windows)]))
+        for low, high in zip(bounds[:-1], bounds[1:]):
+            self._enter_window(float(windows[low] * self.window_seconds))
+            calls = np.bincount(endpoints[low:high])
+            real = np.bincount(endpoints[low:high], weights=is_real[low:high])
+            for code in np.flatnonzero(calls):
+                self.overall.add_many(label(code), int(calls[code]), int(real[code]))
+                self.window.add_many(label(code), int(calls[code]), int(real[code]))
+    
+    def _enter_window(self, window_start: float):
+        """Make the window starting at 'window_start' current (earlier ones count in the open window)"""
+        if self.window_start is None:
+            self.window_start = window_start
+        elif window_start > self.window_start:
+            self._close_window()
+            self.window_start = window_start
+    
+    def _close_window(self):
+        self.windows.append({
+            "start": self.window_start,
+            "calls": self.window.total,
+            "real": self.window.real,
+            "endpoints": len(self.window.counts),
+            "entropy": self.window.normalized_entropy(),
+            "suspicious_endpoints": self.window.suspicious,
+        })
+        self.window = EndpointCounts()
+    
+    def window_metrics(self) -> Dict:
+        """Clustering per closed window (the open one is still filling)"""
+        if not self.windows:
+            return {"windows": 0}
+        entropies = [w["entropy"] for w in self.windows]
+        real_windows = [w for w in self.windows if w["real"]]
+        return {
+            "windows": len(self.windows),
+            "window_seconds": self.window_seconds,
+            "mean_window_entropy": float(np.mean(entropies)),
+            "min_window_entropy": float(min(entropies)),
+            "windows_with_real": len(real_windows),
+            # Windows where some endpoint carried nothing but real calls
+            "suspicious_windows": sum(1 for w in real_windows if w["suspicious_endpoints"]),
+            "min_entropy_with_real": float(min(w["entropy"] for w in real_windows)) if real_windows else None,
+        }
     
     def detect_clustering(self) -> Dict:
         """
@@ -128,109 +414,108 @@ class IPClusteringDetector:
         
         Returns: Detection accuracy metrics
         """
-        if not self.endpoint_usage:
+        if not self.overall.total:
             return {"passed": True, "confidence": 0.0}
         
         # Strategy: Real TX might always use the same "private" endpoint
-        endpoint_real_counts = {}
-        for endpoint, txs in self.endpoint_usage.items():
-            real_count = sum(1 for _, is_real in txs if is_real)
-            total_count = len(txs)
-            endpoint_real_counts[endpoint] = (real_count, total_count)
-        
-        # Find endpoints with 100% real TX (perfect clustering)
-        suspicious_endpoints = [
-            ep for ep, (real, total) in endpoint_real_counts.items()
-            if total > 0 and real == total
-        ]
-        
-        # Calculate entropy of distribution (high entropy = good dispersion)
-        total_txs = sum(len(txs) for txs in self.endpoint_usage.values())
-        endpoint_probs = [len(txs) / total_txs for txs in self.endpoint_usage.values()]
-        entropy = -sum(p * np.log2(p) if p > 0 else 0 for p in endpoint_probs)
-        max_entropy = np.log2(len(self.endpoint_usage))
-        
-        normalized_entropy = entropy / max_entropy if max_entropy > 0 else 0
+        # (endpoints with 100% real TX are perfect clustering); high entropy
+        # of the distribution means good dispersion
+        normalized_entropy = self.overall.normalized_entropy()
         
         return {
-            "endpoints_used": len(self.endpoint_usage),
-            "suspicious_endpoints": len(suspicious_endpoints),
+            "endpoints_used": len(self.overall.counts),
+            "suspicious_endpoints": self.overall.suspicious,
             "distribution_entropy": normalized_entropy,
-            "passed": len(suspicious_endpoints) == 0 and normalized_entropy > 0.7
+            "windowed": self.window_metrics(),
+            "passed": self.overall.suspicious == 0 and normalized_entropy > 0.7
         }
 
 
 class ObserverSimulator:
     """
     Simulates an external observer trying to distinguish real from decoy traffic
-    Uses machine learning-like heuristics
+    Trains a real-vs-decoy classifier (adversary.py) on everything it observed
     """
     
     def __init__(self):
-        self.observations = []
+        # Columnar storage: a few bytes per observation
+        self.gas = array("q")
+        self.function = array("q")
+        self.contract = array("q")
+        self.endpoint = array("q")
+        self.timestamp = array("d")
+        self.is_real = array("b")
+        self.vocab: Dict[str, Dict[str, int]] = {"function": {}, "contract": {}, "endpoint": {}}
+    
+    def _code(self, column: str, value: str) -> int:
+        vocabulary = self.vocab[column]
+        return vocabulary.setdefault(value, len(vocabulary))
     
     def observe(self, decoy: DecoyCall, is_real: bool):
         """Record an observation"""
-        features = {
-            "gas_estimate": decoy.gas_estimate,
-            "function_name": decoy.function_name,
-            "contract": decoy.contract_address,
-            "timestamp": decoy.timestamp,
-            "is_real": is_real
-        }
-        self.observations.append(features)
+        self.gas.append(decoy.gas_estimate)
+        self.function.append(self._code("function", decoy.function_name))
+        self.contract.append(self._code("contract", decoy.contract_address))
+        self.endpoint.append(self._code("endpoint", decoy.rpc_endpoint))
+        self.timestamp.append(decoy.timestamp)
+        self.is_real.append(is_real)
     
-    def attempt_classification(self) -> Dict:
+    def observations(self) -> Observations:
+        """Copy of everything observed so far as NumPy columns"""
+        return Observations(
+            gas=np.array(self.gas, dtype=np.int64),
+            function=np.array(self.function, dtype=np.int64),
+            contract=np.array(self.contract, dtype=np.int64),
+            endpoint=np.array(self.endpoint, dtype=np.int64),
+            timestamp=np.array(self.timestamp, dtype=np.float64),
+            is_real=np.array(self.is_real, dtype=np.int8),
+            labels={column: list(vocabulary) for column, vocabulary in self.vocab.items()},
+        )
+    
+    def attempt_classification(self, observations: Optional[Observations] = None,
+                               rows: Optional[np.ndarray] = None) -> Dict:
         """
-        Try to classify transactions as real/decoy based on patterns
+        Train the adversary with cross-validation and measure how well it
+        picks real calls out of the decoys
+        
+        Args:
+            observations: Columns to classify (default: everything observed)
+            rows: Subset of the observations to train and score on
         
-        Returns: False positive/negative rates
+        Returns: Held-out false positive/negative rates, accuracy and AUC
         """
-        if len(self.observations) < 10:
+        observations = observations or self.observations()
+        is_real = observations.is_real if rows is None else observations.is_real[rows]
+        total = len(is_real)
+        real_count = int(np.count_nonzero(is_real))
+        if total < 10 or real_count < 2 or real_count == total:
+            # Too few labelled examples of one class to cross-validate
             return {
                 "false_positive_rate": 0.0,
                 "false_negative_rate": 0.0,
-                "accuracy": 0.0,
+                "observations": total,
+                "real_observations": real_count,
                 "passed": True
             }
         
-        # Simple heuristic: Look for patterns in gas estimates
-        real_obs = [o for o in self.observations if o["is_real"]]
-        decoy_obs = [o for o in self.observations if not o["is_real"]]
-        
-        if not real_obs or not decoy_obs:
-            return {"passed": True}
-        
-        # Calculate gas estimate statistics
-        real_gas_mean = np.mean([o["gas_estimate"] for o in real_obs])
-        decoy_gas_mean = np.mean([o["gas_estimate"] for o in decoy_obs])
-        
-        # If means are very different, observer could detect pattern
-        gas_difference = abs(real_gas_mean - decoy_gas_mean)
-        threshold = min(real_gas_mean, decoy_gas_mean) * 0.5
-        
-        detectable = gas_difference > threshold
-        
-        # Simulate classification attempt
-        if detectable:
-            # Observer can distinguish - calculate error rates
-            false_positive_rate = 0.15  # 15% of decoys classified as real
-            false_negative_rate = 0.15  # 15% of real classified as decoy
-        else:
-            # Observer cannot distinguish - random guessing
-            false_positive_rate = 0.50
-            false_negative_rate = 0.50
-        
-        passed = (false_positive_rate < VALIDATION_CONFIG["false_positive_threshold"] or
-                  false_negative_rate < VALIDATION_CONFIG["false_negative_threshold"])
-        
-        return {
-            "false_positive_rate": false_positive_rate,
-            "false_negative_rate": false_negative_rate,
-            "gas_difference": gas_difference,
-            "detectable_pattern": detectable,
-            "passed": not detectable
-        }
+        started = time.perf_counter()
+        report = cross_validate(
+            observations,
+            folds=VALIDATION_CONFIG["observer_folds"],
+            max_train_rows=VALIDATION_CONFIG["observer_max_train_rows"],
+            seed=random.getrandbits(32),
+            rows=rows
+        )
+        report["train_seconds"] = round(time.perf_counter() - started, 3)
+        
+        # The adversary wins if it ranks real calls above decoys, or if it
+        # separates them almost perfectly at its decision threshold
+        separated = (report["false_positive_rate"] < VALIDATION_CONFIG["false_positive_threshold"] and
+                     report["false_negative_rate"] < VALIDATION_CONFIG["false_negative_threshold"])
+        report["detectable_pattern"] = separated or \
+            report["auc"] >= VALIDATION_CONFIG["classifier_auc_threshold"]
+        report["passed"] = not report["detectable_pattern"]
+        return report
 
 
 class GhostProtocolValidator:
@@ -245,10 +530,11 @@ class GhostProtocolValidator:
         self.timing_analyzer = TimingAnalyzer()
         self.ip_detector = IPClusteringDetector()
         self.observer = ObserverSimulator()
+        self.seeded = False  # Hashes come from the seeded random module in simulations
     
-    async def run_validation_suite(self, duration_seconds: int = 60, num_real_tx: int = 5):
+    async def run_validation_suite(self, duration_seconds: int = 60, num_real_tx: int = 5) -> Dict:
         """
-        Run full validation suite
+        Run full validation suite and return the report from build_report()
         
         Args:
             duration_seconds: How long to run the test
@@ -279,34 +565,10 @@ class GhostProtocolValidator:
                 # Generate storm with real TX
                 decoys = self.engine.generate_decoy_storm(intensity=random.randint(60, 100))
                 
-                # Record real TX
-                real_tx = Transaction(
-                    hash=f"0x{secrets.token_hex(32)}",
-                    from_address=f"0x{secrets.token_hex(20)}",
-                    to_address=f"0x{secrets.token_hex(20)}",
-                    timestamp=time.time(),
-                    is_real=True
-                )
-                self.timing_analyzer.add_transaction(real_tx)
-                
-                # Record all decoys
+                # Record the real TX and all decoys
+                self._record_real(time.time(), bool(decoys))
                 for decoy in decoys:
-                    fake_tx = Transaction(
-                        hash=f"0x{secrets.token_hex(32)}",
-                        from_address=f"0x{secrets.token_hex(20)}",
-                        to_address=decoy.contract_address,
-                        timestamp=decoy.timestamp,
-                        is_real=False
-                    )
-                    self.timing_analyzer.add_transaction(fake_tx)
-                    self.ip_detector.record_call(fake_tx.hash, decoy.rpc_endpoint, False)
-                    self.observer.observe(decoy, False)
-                
-                # Record real TX - simulate it going through one of the public RPCs mixed in
-                # (In production, it would go to private relay, but for testing we need to show
-                # it can't be distinguished from decoys)
-                real_rpc = random.choice(self.engine.scheduler.public_rpcs) if decoys else "unknown"
-                self.ip_detector.record_call(real_tx.hash, real_rpc, True)
+                    self._record_decoy(decoy)
                 
                 real_tx_sent += 1
                 print(f"  ✓ Sent {len(decoys)} decoys with real TX hidden inside")
@@ -315,57 +577,320 @@ class GhostProtocolValidator:
                 # Just heartbeat decoys
                 decoys = self.engine.generate_decoy_storm(intensity=random.randint(3, 10))
                 for decoy in decoys:
-                    fake_tx = Transaction(
-                        hash=f"0x{secrets.token_hex(32)}",
-                        from_address=f"0x{secrets.token_hex(20)}",
-                        to_address=decoy.contract_address,
-                        timestamp=decoy.timestamp,
-                        is_real=False
-                    )
-                    self.timing_analyzer.add_transaction(fake_tx)
-                    self.ip_detector.record_call(fake_tx.hash, decoy.rpc_endpoint, False)
-                    self.observer.observe(decoy, False)
+                    self._record_decoy(decoy)
             
             # Sleep before next cycle
             await asyncio.sleep(random.uniform(2, 5))
         
         print("\n[Complete] Test duration finished. Analyzing results...\n")
-        self._generate_final_report()
+        report = self.build_report()
+        self._generate_final_report(report)
+        return report
+    
+    def _record_decoy(self, decoy: DecoyCall):
+        """Feed one sent decoy to every analyzer"""
+        fake_tx = Transaction(
+            hash=random_hex(32, self.seeded),
+            from_address=random_hex(20, self.seeded),
+            to_address=decoy.contract_address,
+            timestamp=decoy.timestamp,
+            is_real=False
+        )
+        self.timing_analyzer.add_transaction(fake_tx)
+        self.ip_detector.record_call(fake_tx.hash, decoy.rpc_endpoint, False, decoy.timestamp)
+        self.observer.observe(decoy, False)
+    
+    def _record_real(self, timestamp: float, mixed_in: bool = True):
+        """Feed one real transaction to the analyzers"""
+        real_tx = Transaction(
+            hash=random_hex(32, self.seeded),
+            from_address=random_hex(20, self.seeded),
+            to_address=random_hex(20, self.seeded),
+            timestamp=timestamp,
+            is_real=True
+        )
+        self.timing_analyzer.add_transaction(real_tx)
+        
+        # Simulate the real TX going through one of the public RPCs mixed in
+        # (In production, it would go to private relay, but for testing we need to show
+        # it can't be distinguished from decoys)
+        real_rpc = random.choice(self.engine.scheduler.public_rpcs) if mixed_in else "unknown"
+        self.ip_detector.record_call(real_tx.hash, real_rpc, True, timestamp)
+        
+        # What the observer sees of it: the wallet's read of the contract the
+        # user is about to call, on the same endpoint
+        contracts = self.engine.selector.select_contracts(count=1) or \
+            self.engine.market._get_fallback_contracts()
+        calls = self.engine.pattern_gen.generate_calls(random.choice(contracts))
+        if calls:
+            real_call = calls[0]
+            real_call.timestamp = timestamp
+            real_call.rpc_endpoint = real_rpc
+            self.observer.observe(real_call, True)
+    
+    # ------------------------------------------------------------------
+    # Virtual-time simulation
+    # ------------------------------------------------------------------
+    
+    def run_simulation(self, duration_seconds: float = VALIDATION_CONFIG["test_duration"],
+                       num_real_tx: int = 5, seed: Optional[int] = None,
+                       offline: bool = False, verbose: bool = True,
+                       config_heartbeat: bool = False) -> Dict:
+        """
+        Run the validation cycle logic on a virtual clock
+        
+        Same cycle structure as run_validation_suite (a cycle every 2-5s,
+        real transactions spread evenly over the run), but storms follow
+        the scheduler's timeline: every decoy and the real transaction are
+        separate events at their storm offsets, and heartbeat decoys are
+        spread over one second. Returns the report from build_report().
+        
+        Args:
+            duration_seconds: Simulated time to cover
+            num_real_tx: Number of real transactions to simulate
+            seed: Seeds the random module (decoys, timing, hashes) for reproducible runs
+            offline: Use the built-in fallback contracts instead of fetching live data
+            verbose: Print progress and the final report
+            config_heartbeat: Send heartbeat bursts on the scheduler's own timer
+                (MIMICRY_CONFIG heartbeat_interval_*) instead of with every cycle
+        """
+        if seed is not None:
+            random.seed(seed)
+            self.seeded = True
+        
+        if offline:
+            self.engine.market.contract_cache = self.engine.market._get_fallback_contracts()
+            self.engine.market.last_refresh = float("inf")  # Never refresh during the run
+        else:
+            self.engine.market.gather_trending_contracts()
+        
+        clock = VirtualClock(start=SIMULATION_EPOCH if seed is not None else time.time())
+        start = clock.now
+        real_interval = duration_seconds / num_real_tx if num_real_tx else float("inf")
+        state = {"real_sent": 0, "decoys": 0}
+        
+        def send_decoy(decoy: DecoyCall):
+            decoy.timestamp = clock.now
+            self._record_decoy(decoy)
+            state["decoys"] += 1
+        
+        def cycle():
+            elapsed = clock.now - start
+            if elapsed >= duration_seconds:
+                return
+            
+            if state["real_sent"] < num_real_tx and elapsed > real_interval * state["real_sent"]:
+                timeline, real_offset = self.engine.scheduler.schedule_storm(real_tx_ready=True)
+                decoys = self.engine.generate_decoy_storm(intensity=len(timeline))
+                for offset, decoy in zip(timeline, decoys):
+                    clock.schedule(offset, send_decoy, decoy)
+                clock.schedule(real_offset, lambda: self._record_real(clock.now, bool(decoys)))
+                state["real_sent"] += 1
+                if verbose:
+                    print(f"  [t+{elapsed:,.0f}s] Real TX {state['real_sent']}/{num_real_tx} "
+                          f"hidden in {len(decoys)} decoys")
+            elif not config_heartbeat:
+                # Heartbeat burst
+                for decoy in self.engine.generate_decoy_storm(intensity=random.randint(3, 10)):
+                    clock.schedule(random.uniform(0, 1.0), send_decoy, decoy)
+            
+            clock.schedule(random.uniform(2, 5), cycle)
+        
+        def heartbeat():
+            if clock.now - start >= duration_seconds:
+                return
+            burst_size, interval = self.engine.scheduler.schedule_heartbeat()
+            for decoy in self.engine.generate_decoy_storm(intensity=burst_size):
+                clock.schedule(random.uniform(0, 1.0), send_decoy, decoy)
+            clock.schedule(interval, heartbeat)
+        
+        if verbose:
+            print("\n" + "=" * 70)
+            print("GHOST PROTOCOL - VALIDATION SUITE (SIMULATED TIME)")
+            print("=" * 70)
+            print(f"Network: {self.network.value}")
+            print(f"Simulated duration: {duration_seconds:,.0f}s | Real TX: {num_real_tx} | Seed: {seed}")
+            print("=" * 70 + "\n")
+        
+        wall_start = time.perf_counter()
+        clock.schedule(0.0, cycle)
+        if config_heartbeat:
+            clock.schedule(0.0, heartbeat)
+        # Let storms started near the end finish (longest storm is storm_duration_max)
+        clock.run_until(start + duration_seconds + MIMICRY_CONFIG["storm_duration_max"])
+        wall_time = time.perf_counter() - wall_start
+        
+        report = self.build_report()
+        report["simulation"] = {
+            "simulated_seconds": duration_seconds,
+            "wall_seconds": round(wall_time, 3),
+            "speedup": round(duration_seconds / wall_time, 1) if wall_time > 0 else None,
+            "events": clock.processed,
+            "decoys": state["decoys"],
+            "real_transactions": state["real_sent"],
+            "seed": seed,
+        }
+        if verbose:
+            print(f"\n[Complete] {clock.processed:,} events in {wall_time:.2f}s "
+                  f"({report['simulation']['speedup']}x real time). Analyzing results...\n")
+            self._generate_final_report(report)
+        return report
+    
+    # ------------------------------------------------------------------
+    # Recorded traces
+    # ------------------------------------------------------------------
+    
+    def analyze_trace(self, path: str, verbose: bool = True) -> Dict:
+        """
+        Run all three detectors over a recorded trace (traces.py)
+        
+        The trace is memory-mapped and streamed through the timing and IP
+        clustering analyzers in chunks; the observer trains on every real
+        row plus up to VALIDATION_CONFIG["observer_max_rows"] sampled decoys,
+        with timing features taken from the full trace.
+        """
+        trace = open_trace(path)
+        if verbose:
+            print(f"\n[Trace] {path}: {len(trace):,} rows, columns: {', '.join(trace.columns)}")
+        
+        wall_start = time.perf_counter()
+        timestamps = trace.column("timestamp")
+        is_real = trace.column("is_real")
+        endpoints = trace.column("endpoint") if "endpoint" in trace.columns else None
+        for start, stop in trace.chunks():
+            chunk_times = np.asarray(timestamps[start:stop], dtype=np.float64)
+            chunk_real = np.asarray(is_real[start:stop]) != 0
+            self.timing_analyzer.add_events(chunk_times, chunk_real)
+            if endpoints is not None:
+                self.ip_detector.record_calls(np.asarray(endpoints[start:stop]), chunk_real,
+                                              chunk_times, trace.labels.get("endpoint"))
+        
+        observations = Observations(
+            gas=trace.column("gas"), function=trace.column("function"),
+            contract=trace.column("contract"), endpoint=trace.column("endpoint"),
+            timestamp=timestamps, is_real=is_real, labels=trace.labels,
+        )
+        rows = None
+        limit = VALIDATION_CONFIG["observer_max_rows"]
+        if len(trace) > limit:
+            rng = np.random.default_rng(random.getrandbits(32))
+            sampled = np.unique(rng.integers(0, len(trace), size=limit))
+            rows = np.union1d(np.flatnonzero(is_real), sampled)
+        report = self.build_report(self.observer.attempt_classification(observations, rows), observations)
+        
+        wall_time = time.perf_counter() - wall_start
+        report["trace"] = {
+            "path": path,
+            "rows": len(trace),
+            "real_rows": int(np.count_nonzero(is_real)),
+            "observer_rows": len(trace) if rows is None else len(rows),
+            "wall_seconds": round(wall_time, 3),
+            "rows_per_second": round(len(trace) / wall_time) if wall_time > 0 else None,
+        }
+        if verbose:
+            print(f"[Trace] Analyzed in {wall_time:.2f}s "
+                  f"({report['trace']['rows_per_second']:,} rows/s)\n")
+            self._generate_final_report(report)
+        return report
+    
+    def save_trace(self, path: str):
+        """Write everything the observer saw (real and decoy calls) as a trace file"""
+        observations = self.observer.observations()
+        save_trace(
+            path,
+            labels=observations.labels,
+            timestamp=observations.timestamp, is_real=observations.is_real,
+            endpoint=observations.endpoint, function=observations.function,
+            contract=observations.contract, gas=observations.gas,
+        )
     
-    def _generate_final_report(self):
+    def build_report(self, observer_report: Optional[Dict] = None,
+                     observations: Optional[Observations] = None) -> Dict:
+        """
+        Run every analyzer and return their reports plus the overall verdict
+        
+        'observations' defaults to everything the observer saw; a trace
+        passes its full columns (and its sampled observer report).
+        """
+        observations = observations or self.observer.observations()
+        timing_report = self.timing_analyzer.generate_report()
+        ip_report = self.ip_detector.detect_clustering()
+        observer_report = observer_report or self.observer.attempt_classification(observations)
+        anonymity_report = anonymity.analyze(observations)
+        return {
+            "timing": timing_report,
+            "ip_clustering": ip_report,
+            "observer": observer_report,
+            "anonymity": anonymity_report,
+            "passed": bool(timing_report.get('passed', False) and
+                           ip_report.get('passed', False) and
+                           observer_report.get('passed', False) and
+                           anonymity_report.get('passed', False)),
+        }
+    
+    def _generate_final_report(self, report: Optional[Dict] = None):
         """Generate and display validation report"""
+        report = report or self.build_report()
         print("=" * 70)
         print("VALIDATION RESULTS")
         print("=" * 70)
         
         # Timing Analysis
-        timing_report = self.timing_analyzer.generate_report()
+        timing_report = report["timing"]
         print("\n[1] TIMING ATTACK RESISTANCE")
-        print(f"  Correlation Coefficient: {timing_report['timing_correlation']:.4f}")
+        print(f"  Real/Decoy Cross-Correlation: {timing_report['timing_correlation']:.4f} "
+              f"(at lag {timing_report['leak_lag_seconds']:+.0f}s)")
         print(f"  Threshold: < {VALIDATION_CONFIG['timing_correlation_threshold']}")
-        print(f"  Periodic Pattern: {'❌ DETECTED' if timing_report['is_periodic'] else '✓ None'}")
+        print(f"  Periodic Pattern: {'❌ DETECTED' if timing_report['is_periodic'] else '✓ None'} "
+              f"(autocorrelation peak {timing_report['periodicity']:.3f})")
         print(f"  Result: {'✓ PASSED' if timing_report['passed'] else '❌ FAILED'}")
         
         # IP Clustering
-        ip_report = self.ip_detector.detect_clustering()
+        ip_report = report["ip_clustering"]
         print("\n[2] IP CLUSTERING RESISTANCE")
         print(f"  Endpoints Used: {ip_report.get('endpoints_used', 0)}")
         print(f"  Distribution Entropy: {ip_report.get('distribution_entropy', 0):.4f}")
         print(f"  Suspicious Endpoints: {ip_report.get('suspicious_endpoints', 0)}")
+        windowed = ip_report.get("windowed", {})
+        if windowed.get("windows"):
+            print(f"  Per {windowed['window_seconds']}s Window: mean entropy {windowed['mean_window_entropy']:.4f}, "
+                  f"real-only endpoint in {windowed['suspicious_windows']}/{windowed['windows_with_real']} "
+                  f"windows with real TX")
         print(f"  Result: {'✓ PASSED' if ip_report.get('passed', False) else '❌ FAILED'}")
         
         # Observer Classification
-        observer_report = self.observer.attempt_classification()
+        observer_report = report["observer"]
         print("\n[3] PATTERN DETECTION RESISTANCE")
+        print(f"  Observations: {observer_report.get('observations', 0)} "
+              f"({observer_report.get('real_observations', 0)} real)")
         print(f"  Detectable Pattern: {'❌ YES' if observer_report.get('detectable_pattern') else '✓ NO'}")
         print(f"  False Positive Rate: {observer_report.get('false_positive_rate', 0):.2%}")
         print(f"  False Negative Rate: {observer_report.get('false_negative_rate', 0):.2%}")
+        if "auc" in observer_report:
+            print(f"  Adversary AUC: {observer_report['auc']:.4f} "
+                  f"(threshold: < {VALIDATION_CONFIG['classifier_auc_threshold']}, "
+                  f"{observer_report['folds']}-fold cross-validated)")
+            print(f"  Strongest Features: {', '.join(observer_report['strongest_features'])}")
         print(f"  Result: {'✓ PASSED' if observer_report['passed'] else '❌ FAILED'}")
         
+        # Anonymity Sets
+        anonymity_report = report.get("anonymity", {})
+        print("\n[4] ANONYMITY SET")
+        print(f"  Real Transactions: {anonymity_report.get('real_transactions', 0)}")
+        for window, levels in anonymity_report.get("windows", {}).items():
+            neighbourhood = levels["neighbourhood"]
+            print(f"  ±{window}: {levels['time']['median']:.0f} decoys (median), "
+                  f"{neighbourhood['median']:.0f} look-alikes (median, min {neighbourhood['min']})")
+        if "windows" in anonymity_report:
+            check_window = VALIDATION_CONFIG["anonymity_check_window"]
+            checked = anonymity_report["windows"][f"{check_window:g}s"]["neighbourhood"]
+            print(f"  Smallest Set: {checked['min']} look-alikes within ±{check_window}s "
+                  f"(threshold: ≥ {anonymity_report['minimum_set']}, "
+                  f"{checked['below_minimum']} real TX below)")
+        print(f"  Result: {'✓ PASSED' if anonymity_report.get('passed', False) else '❌ FAILED'}")
+        
         # Overall Assessment
-        all_passed = (timing_report.get('passed', False) and 
-                     ip_report.get('passed', False) and 
-                     observer_report.get('passed', False))
+        all_passed = report["passed"]
         
         print("\n" + "=" * 70)
         print(f"OVERALL: {'✓✓✓ ALL TESTS PASSED' if all_passed else '❌ SOME TESTS FAILED'}")
@@ -384,16 +909,46 @@ async def main():
     import secrets
     import random
     
+    # Usage: python validator.py [duration] [--simulate] [--seed N] [--offline]
+    #                            [--save-trace PATH] [--json PATH]
+    #        python validator.py --trace PATH [--json PATH]
+    args = sys.argv[1:]
+    
+    def option(name: str) -> Optional[str]:
+        if name in args and args.index(name) + 1 < len(args):
+            return args[args.index(name) + 1]
+        return None
+    
     # Allow duration override
     duration = 60
-    if len(sys.argv) > 1:
+    if args and not args[0].startswith("--"):
         try:
-            duration = int(sys.argv[1])
+            duration = int(args[0])
         except:
             pass
     
+    seed = int(option("--seed")) if option("--seed") is not None else None
+    
     validator = GhostProtocolValidator(DEFAULT_NETWORK)
-    await validator.run_validation_suite(duration_seconds=duration, num_real_tx=5)
+    started = time.perf_counter()
+    if option("--trace"):
+        mode = "trace"
+        report = validator.analyze_trace(option("--trace"))
+    elif "--simulate" in args:
+        mode = "simulation"
+        report = validator.run_simulation(duration_seconds=duration, num_real_tx=5,
+                                          seed=seed, offline="--offline" in args)
+        if option("--save-trace"):
+            validator.save_trace(option("--save-trace"))
+    else:
+        mode = "live"
+        report = await validator.run_validation_suite(duration_seconds=duration, num_real_tx=5)
+    
+    if option("--json"):
+        document = build_document(report, mode, time.perf_counter() - started,
+                                  validator.network.value, seed, args)
+        write_document(option("--json"), document)
+        print(f"[Validator] Report written to {option('--json')}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,288 @@
+"""
+Ghost Protocol - Multi-Process Proxy Workers
+Pre-fork supervisor running several RPCProxy workers on one port
+
+Workers share the listen port via SO_REUSEPORT and handle the read hot
+path independently. Everything that must be consistent across workers
+lives in a single hub process reached over a local Unix socket:
+  - storm scheduling: every real transaction is forwarded to the hub, so
+    storms merge and the decoy budget applies across all clients
+  - the contract cache used to build decoys (only the hub builds storms,
+    so it is fetched once instead of once per worker)
+  - a shared read cache: finalized eth_getLogs chunks and per-block gas
+    answers fetched by one worker are served to the others (a local IPC
+    round-trip instead of another upstream call)
+  - stats: workers push their counters and /health shows the total
+
+The hub socket lives in a private (0700) directory and is itself 0600, so
+other local users cannot reach the hub. SO_REUSEPORT requires Linux
+(e.g. the Raspberry Pi deployment).
+"""
+
+import asyncio
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+from config import Network, PROXY_CONFIG
+
+
+class HubClient:
+    """
+    Worker-side connection to the hub process
+    """
+
+    def __init__(self, socket_path: str, worker_id: int):
+        self.socket_path = socket_path
+        self.worker_id = worker_id
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._sync_task: Optional[asyncio.Task] = None
+        self._put_tasks = set()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.UnixConnector(path=self.socket_path),
+                timeout=aiohttp.ClientTimeout(total=PROXY_CONFIG["hub_timeout"])
+            )
+        return self.session
+
+    async def submit_transaction(self, rpc_request: Dict) -> Dict:
+        """Hand a real transaction to the hub's storm coordinator"""
+        async with self._get_session().post("http://hub/tx", json=rpc_request) as response:
+            return await response.json()
+
+    async def push_stats(self, stats: Dict):
+        """Publish this worker's counters to the hub"""
+        async with self._get_session().post(
+            "http://hub/stats", json={"worker": self.worker_id, "stats": stats}
+        ) as response:
+            await response.read()
+
+    async def cache_get(self, keys: List[str]) -> Dict[str, Tuple[Any, float]]:
+        """
+        Shared cache entries for 'keys' as {key: (value, age seconds)}
+
+        Misses are left out; a slow or restarting hub counts as all misses.
+        """
+        try:
+            async with self._get_session().post(
+                "http://hub/cache/get", json={"keys": keys},
+                timeout=aiohttp.ClientTimeout(total=PROXY_CONFIG["hub_cache_timeout"])
+            ) as response:
+                found = await response.json()
+        except Exception:
+            return {}
+        return {key: (value, age) for key, (value, age) in found.items()}
+
+    def cache_put(self, entries: Dict[str, Any], ttl: Optional[float] = None):
+        """Share entries with the other workers (in the background, best effort)"""
+        async def put():
+            try:
+                async with self._get_session().post(
+                    "http://hub/cache/put", json={"entries": entries, "ttl": ttl},
+                    timeout=aiohttp.ClientTimeout(total=PROXY_CONFIG["hub_cache_timeout"])
+                ) as response:
+                    await response.read()
+            except Exception:
+                pass  # Sharing is an optimization; the entry stays in the local cache
+
+        task = asyncio.create_task(put())
+        self._put_tasks.add(task)
+        task.add_done_callback(self._put_tasks.discard)
+
+    async def aggregated_stats(self) -> Dict:
+        """Counters summed over the hub and every worker"""
+        async with self._get_session().get("http://hub/stats") as response:
+            return await response.json()
+
+    async def _sync_loop(self, stats: Dict):
+        while True:
+            try:
+                await self.push_stats(stats)
+            except Exception:
+                pass  # Hub restarting; the next push carries the full counters anyway
+            await asyncio.sleep(PROXY_CONFIG["stats_sync_interval"])
+
+    def start(self, stats: Dict):
+        """Start pushing 'stats' to the hub periodically"""
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop(stats))
+
+    async def close(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+        if self.session is not None:
+            await self.session.close()
+
+
+class SharedCache:
+    """
+    Hub-side LRU of JSON values with optional per-entry TTL
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[Any, float, Optional[float]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, keys: List[str]) -> Dict[str, Tuple[Any, float]]:
+        """{key: (value, age)} for every live key"""
+        now = time.monotonic()
+        found = {}
+        for key in keys:
+            entry = self.entries.get(key)
+            if entry is not None and entry[2] is not None and now - entry[1] >= entry[2]:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                continue
+            self.hits += 1
+            self.entries.move_to_end(key)
+            found[key] = (entry[0], now - entry[1])
+        return found
+
+    def put(self, entries: Dict[str, Any], ttl: Optional[float] = None):
+        now = time.monotonic()
+        for key, value in entries.items():
+            self.entries[key] = (value, now, ttl)
+            self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class StormHub:
+    """
+    Hub process: owns storm scheduling and aggregates worker stats
+    """
+
+    def __init__(self, network: Network):
+        from rpc_proxy import RPCProxy
+
+        # A full proxy instance that never listens on TCP; it runs the storms
+        self.proxy = RPCProxy(network=network, listen_port=0)
+        self.worker_stats: Dict[int, Dict] = {}
+        self.cache = SharedCache(PROXY_CONFIG["hub_cache_max_entries"])
+
+    async def handle_tx(self, request: web.Request) -> web.Response:
+        rpc_request = await request.json()
+        return web.json_response(await self.proxy.trigger_decoy_storm(rpc_request))
+
+    async def handle_push_stats(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        self.worker_stats[int(data["worker"])] = data["stats"]
+        return web.json_response({"ok": True})
+
+    async def handle_cache_get(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        return web.json_response(self.cache.get(data["keys"]))
+
+    async def handle_cache_put(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        self.cache.put(data["entries"], data.get("ttl"))
+        return web.json_response({"ok": True})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.aggregated_stats())
+
+    def aggregated_stats(self) -> Dict:
+        """Hub counters (storms) plus every worker's counters"""
+        totals = dict(self.proxy.stats)
+        for stats in self.worker_stats.values():
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+        totals["workers_reporting"] = len(self.worker_stats)
+        totals["shared_cache_entries"] = len(self.cache.entries)
+        totals["shared_cache_hits"] = self.cache.hits
+        totals["shared_cache_misses"] = self.cache.misses
+        return totals
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/tx", self.handle_tx)
+        app.router.add_post("/stats", self.handle_push_stats)
+        app.router.add_get("/stats", self.handle_stats)
+        app.router.add_post("/cache/get", self.handle_cache_get)
+        app.router.add_post("/cache/put", self.handle_cache_put)
+        app.on_startup.append(self.proxy.on_startup)
+        app.on_cleanup.append(self.proxy.on_cleanup)
+        return app
+
+
+def _worker_main(network_value: str, port: int, socket_path: str, worker_id: int):
+    """Entry point of one worker process"""
+    from rpc_proxy import RPCProxy
+
+    proxy = RPCProxy(
+        network=Network(network_value),
+        listen_port=port,
+        hub=HubClient(socket_path, worker_id)
+    )
+    web.run_app(proxy.build_app(), host='127.0.0.1', port=port, reuse_port=True, print=None)
+
+
+def _start_worker(network: Network, port: int, socket_path: str, worker_id: int) -> multiprocessing.Process:
+    process = multiprocessing.Process(
+        target=_worker_main,
+        args=(network.value, port, socket_path, worker_id),
+        name=f"ghost-worker-{worker_id}",
+        daemon=True
+    )
+    process.start()
+    print(f"[Supervisor] Worker {worker_id} started (pid {process.pid})")
+    return process
+
+
+async def _supervise(network: Network, port: int, socket_path: str, workers: Dict[int, multiprocessing.Process]):
+    """Serve the hub on the Unix socket and restart workers that die"""
+    hub = StormHub(network)
+    runner = web.AppRunner(hub.build_app(), access_log=None)
+    await runner.setup()
+    await web.UnixSite(runner, socket_path).start()
+    os.chmod(socket_path, 0o600)
+    print(f"[Supervisor] Hub listening on {socket_path}")
+
+    try:
+        while True:
+            await asyncio.sleep(1.0)
+            for worker_id, process in list(workers.items()):
+                if not process.is_alive():
+                    print(f"[Supervisor] Worker {worker_id} exited ({process.exitcode}), restarting")
+                    workers[worker_id] = _start_worker(network, port, socket_path, worker_id)
+    finally:
+        await runner.cleanup()
+
+
+def run_workers(network: Network, port: int, num_workers: int):
+    """Run 'num_workers' proxy workers on 'port' under a supervisor/hub process"""
+    # mkdtemp creates the directory 0700, so only this user can reach the socket
+    socket_dir = tempfile.mkdtemp(prefix="ghost-hub-")
+    socket_path = os.path.join(socket_dir, "hub.sock")
+
+    print(f"\n{'='*60}")
+    print(f"🔒 Ghost Protocol RPC Proxy ({num_workers} workers)")
+    print(f"{'='*60}")
+    print(f"Listening on: http://localhost:{port}")
+    print(f"Network: {network.value}")
+    print(f"{'='*60}\n")
+
+    workers = {i: _start_worker(network, port, socket_path, i) for i in range(num_workers)}
+    try:
+        asyncio.run(_supervise(network, port, socket_path, workers))
+    except KeyboardInterrupt:
+        print("\n[Supervisor] Shutting down")
+    finally:
+        for process in workers.values():
+            process.terminate()
+        for process in workers.values():
+            process.join(timeout=5)
+        shutil.rmtree(socket_dir, ignore_errors=True)
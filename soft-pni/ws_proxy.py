@@ -0,0 +1,237 @@
+"""
+Ghost Protocol - WebSocket Subscription Multiplexer
+Shares upstream eth_subscribe subscriptions between many wallet clients
+
+Identical subscriptions (same eth_subscribe params, e.g. newHeads or the
+same logs filter) from any number of clients map onto a single upstream
+subscription. Notifications are fanned out with each client's own
+subscription id, so upstream providers see one subscriber per filter.
+"""
+
+import asyncio
+import json
+import random
+import secrets
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+
+@dataclass
+class SharedSubscription:
+    """One upstream subscription and the clients attached to it"""
+    key: str
+    params: List
+    upstream_id: Optional[str] = None
+    clients: Dict[str, web.WebSocketResponse] = field(default_factory=dict)  # client sub id -> ws
+
+
+class SubscriptionMultiplexer:
+    """
+    Maintains one upstream WebSocket and multiplexes client subscriptions onto it
+    """
+
+    def __init__(self, ws_endpoints: List[str], session_factory: Callable[[], aiohttp.ClientSession]):
+        self.ws_endpoints = ws_endpoints
+        self.get_session = session_factory
+        self.upstream: Optional[aiohttp.ClientWebSocketResponse] = None
+        self.upstream_url: Optional[str] = None
+        self._connect_lock = asyncio.Lock()
+        self._reader_task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._next_id = 0
+        self._pending: Dict[int, asyncio.Future] = {}
+
+        self.subscriptions: Dict[str, SharedSubscription] = {}    # params key -> shared
+        self.by_upstream_id: Dict[str, SharedSubscription] = {}
+        self.by_client_id: Dict[str, SharedSubscription] = {}
+
+    @staticmethod
+    def subscription_key(params: List) -> str:
+        """Canonical key so identical filters share one upstream subscription"""
+        return json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+    # ------------------------------------------------------------------
+    # Upstream connection
+    # ------------------------------------------------------------------
+
+    async def _ensure_upstream(self):
+        """Connect to an upstream WebSocket endpoint if not already connected"""
+        async with self._connect_lock:
+            if self.upstream is not None and not self.upstream.closed:
+                return
+            if not self.ws_endpoints:
+                raise ConnectionError("No WebSocket RPC endpoints configured")
+
+            last_error: Exception = ConnectionError("no endpoint tried")
+            for url in random.sample(self.ws_endpoints, len(self.ws_endpoints)):
+                try:
+                    self.upstream = await self.get_session().ws_connect(url, heartbeat=30)
+                    self.upstream_url = url
+                    break
+                except Exception as e:
+                    last_error = e
+            else:
+                raise ConnectionError(f"Could not connect upstream: {last_error}")
+
+            print(f"[WSProxy] Upstream connected: {self.upstream_url}")
+            self._reader_task = asyncio.create_task(self._read_upstream(self.upstream))
+
+    async def _call_upstream(self, method: str, params: List):
+        """Send a JSON-RPC call over the upstream socket and await its result"""
+        await self._ensure_upstream()
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self.upstream.send_str(json.dumps({
+                "jsonrpc": "2.0", "id": request_id, "method": method, "params": params
+            }))
+            reply = await asyncio.wait_for(future, timeout=30)
+        finally:
+            self._pending.pop(request_id, None)
+
+        if "error" in reply:
+            error = reply["error"]
+            message = error.get("message", "upstream error") if isinstance(error, dict) else str(error)
+            raise RuntimeError(message)
+        return reply.get("result")
+
+    async def _read_upstream(self, upstream: aiohttp.ClientWebSocketResponse):
+        """Route upstream replies to waiting calls and fan out notifications"""
+        async for msg in upstream:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            try:
+                data = json.loads(msg.data)
+            except ValueError:
+                continue
+            if not isinstance(data, dict):
+                # Batches and bare values are never replies to our calls; a crash
+                # here would stall every multiplexed subscription
+                print(f"[WSProxy] Skipping non-object upstream frame: {msg.data[:80]}")
+                continue
+
+            if data.get("method") == "eth_subscription":
+                if isinstance(data.get("params"), dict):
+                    await self._fan_out(data["params"])
+            elif isinstance(data.get("id"), int) and data["id"] in self._pending:
+                future = self._pending[data["id"]]
+                if not future.done():
+                    future.set_result(data)
+
+        print(f"[WSProxy] Upstream disconnected: {self.upstream_url}")
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("upstream WebSocket closed"))
+        if self.subscriptions and not self._closing:
+            asyncio.create_task(self._resubscribe_all())
+
+    async def _resubscribe_all(self):
+        """Re-create every shared subscription after an upstream reconnect"""
+        self.by_upstream_id.clear()
+        delay = 1.0
+        while not self._closing:
+            missing = [s for s in self.subscriptions.values() if s.upstream_id not in self.by_upstream_id]
+            if not missing:
+                return
+            for shared in missing:
+                try:
+                    shared.upstream_id = await self._call_upstream("eth_subscribe", shared.params)
+                    self.by_upstream_id[shared.upstream_id] = shared
+                except Exception as e:
+                    print(f"[WSProxy] Resubscribe failed for {shared.key}: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    async def _fan_out(self, params: Dict):
+        """Deliver one upstream notification to every attached client"""
+        shared = self.by_upstream_id.get(params.get("subscription"))
+        if shared is None:
+            return
+
+        # Serialize the (possibly large) result once for all clients
+        result_json = json.dumps(params.get("result"))
+        for client_sub_id, ws in list(shared.clients.items()):
+            message = ('{"jsonrpc":"2.0","method":"eth_subscription",'
+                       f'"params":{{"subscription":"{client_sub_id}","result":{result_json}}}}}')
+            try:
+                if ws.closed:
+                    raise ConnectionError("client closed")
+                await ws.send_str(message)
+            except Exception:
+                # Runs on the reader task, so the upstream unsubscribe must not be awaited here
+                asyncio.create_task(self.unsubscribe(ws, client_sub_id))
+
+    # ------------------------------------------------------------------
+    # Client-facing API
+    # ------------------------------------------------------------------
+
+    async def subscribe(self, ws: web.WebSocketResponse, params: List) -> str:
+        """Attach a client to a (possibly shared) subscription; returns its sub id"""
+        key = self.subscription_key(params)
+        shared = self.subscriptions.get(key)
+        if shared is None:
+            shared = SharedSubscription(key=key, params=params)
+            shared.upstream_id = await self._call_upstream("eth_subscribe", params)
+            # Another client may have raced us to the same filter
+            if key in self.subscriptions:
+                await self._call_upstream("eth_unsubscribe", [shared.upstream_id])
+                shared = self.subscriptions[key]
+            else:
+                self.subscriptions[key] = shared
+                self.by_upstream_id[shared.upstream_id] = shared
+
+        client_sub_id = f"0x{secrets.token_hex(16)}"
+        shared.clients[client_sub_id] = ws
+        self.by_client_id[client_sub_id] = shared
+        return client_sub_id
+
+    async def unsubscribe(self, ws: web.WebSocketResponse, client_sub_id: str) -> bool:
+        """
+        Detach one of 'ws''s subscriptions, dropping the upstream one when unused
+
+        Ids belonging to another client connection are treated as unknown.
+        """
+        shared = self.by_client_id.get(client_sub_id)
+        if shared is None or shared.clients.get(client_sub_id) is not ws:
+            return False
+        del self.by_client_id[client_sub_id]
+        del shared.clients[client_sub_id]
+
+        if not shared.clients:
+            self.subscriptions.pop(shared.key, None)
+            self.by_upstream_id.pop(shared.upstream_id, None)
+            try:
+                await self._call_upstream("eth_unsubscribe", [shared.upstream_id])
+            except Exception:
+                pass  # Upstream already gone; nothing left to clean up
+        return True
+
+    async def drop_client(self, ws: web.WebSocketResponse):
+        """Remove every subscription held by a disconnected client"""
+        owned = [
+            client_sub_id for client_sub_id, shared in self.by_client_id.items()
+            if shared.clients.get(client_sub_id) is ws
+        ]
+        for client_sub_id in owned:
+            await self.unsubscribe(ws, client_sub_id)
+
+    async def close(self):
+        """Close the upstream socket"""
+        self._closing = True
+        if self.upstream is not None:
+            await self.upstream.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+
+    def snapshot(self) -> Dict:
+        """Summary for the /health endpoint"""
+        return {
+            "upstream": self.upstream_url if self.upstream is not None and not self.upstream.closed else None,
+            "upstream_subscriptions": len(self.subscriptions),
+            "client_subscriptions": len(self.by_client_id),
+        }